@@ -0,0 +1,158 @@
+# scripts/dialect_report.py
+"""
+Compare the dialect-specific (anchored) mapping against the generic `//` mapping
+over a corpus: field-level equivalence of the raw values and the final JobSpec,
+plus evaluation time of each plan on the already-parsed trees.
+
+    python scripts/dialect_report.py -m config/xml_map.yml samples/
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import math
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List
+
+from lxml import etree as ET
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if SRC.exists() and str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from prepress_helper.mapping_plan import MappingPlan, load_mapping_plan  # noqa: E402
+from prepress_helper.xml_adapter import load_jobspec_from_xml  # noqa: E402
+from prepress_helper.xml_stream import select_plan_for_root  # noqa: E402
+
+
+def _empty(v: Any) -> bool:
+    return v is None or v == "" or (isinstance(v, float) and math.isnan(v))
+
+
+def _same(a: Any, b: Any) -> bool:
+    # an unmapped field and one that matched nothing are equivalent
+    return (_empty(a) and _empty(b)) or a == b
+
+
+def _flatten(d: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for k, v in d.items():
+        if isinstance(v, dict):
+            out.update(_flatten(v, f"{prefix}{k}."))
+        else:
+            out[f"{prefix}{k}"] = v
+    return out
+
+
+def _jobspec(xml: Path, plan: MappingPlan) -> Dict[str, Any] | str:
+    try:
+        return _flatten(load_jobspec_from_xml(str(xml), plan).model_dump())
+    except Exception as e:  # both plans must fail the same way too
+        return type(e).__name__
+
+
+def _time(plan: MappingPlan, trees: List[Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for tree in trees:
+            plan.evaluate(tree)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def report(map_path: str, xml_files: List[Path], repeat: int = 5) -> Dict[str, Any]:
+    plan = load_mapping_plan(map_path)
+    generic = dataclasses.replace(plan, dialects=())
+
+    dialect_hits: Counter = Counter()
+    raw_diffs: Counter = Counter()
+    spec_diffs: Counter = Counter()
+    examples: List[Dict[str, Any]] = []
+    groups: Dict[str, List[Any]] = {}
+
+    for xml in xml_files:
+        tree = ET.parse(str(xml))
+        chosen = select_plan_for_root(plan, tree.getroot())
+        name = next((d.name for d in plan.dialects if chosen.source == d.mapping), "generic")
+        dialect_hits[name] += 1
+        groups.setdefault(name, []).append((tree, chosen))
+        if chosen is plan:
+            continue
+
+        want, got = generic.evaluate(tree), chosen.evaluate(tree)
+        for target in sorted(set(want) | set(got)):
+            if not _same(want.get(target), got.get(target)):
+                raw_diffs[target] += 1
+        js_want, js_got = _jobspec(xml, generic), _jobspec(xml, chosen)
+        if isinstance(js_want, str) or isinstance(js_got, str):
+            fields = [] if js_want == js_got else ["<error>"]
+        else:
+            fields = [k for k in sorted(set(js_want) | set(js_got)) if not _same(js_want.get(k), js_got.get(k))]
+        for k in fields:
+            spec_diffs[k] += 1
+            if len(examples) < 10:
+                pick = lambda js: js if isinstance(js, str) else js.get(k)  # noqa: E731
+                examples.append({"xml": xml.name, "field": k, "generic": pick(js_want), "dialect": pick(js_got)})
+
+    timings: Dict[str, Dict[str, float]] = {}
+    for name, items in groups.items():
+        if name == "generic":
+            continue
+        trees = [t for t, _ in items]
+        chosen = items[0][1]
+        t_generic, t_dialect = _time(generic, trees, repeat), _time(chosen, trees, repeat)
+        timings[name] = {
+            "files": len(trees),
+            "generic_ms": round(t_generic * 1000, 2),
+            "dialect_ms": round(t_dialect * 1000, 2),
+            "speedup": round(t_generic / t_dialect, 2) if t_dialect else float("inf"),
+        }
+
+    return {
+        "map": map_path,
+        "files": len(xml_files),
+        "dialects": dict(dialect_hits),
+        "raw_value_diffs": dict(raw_diffs),
+        "jobspec_field_diffs": dict(spec_diffs),
+        "examples": examples,
+        "evaluate_timings": timings,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Dialect mapping vs generic mapping: equivalence and speed.")
+    ap.add_argument("paths", nargs="+", help="XML files or directories")
+    ap.add_argument("-m", "--map", default="config/xml_map.yml", help="generic mapping with a dialects: block")
+    ap.add_argument("-r", "--repeat", type=int, default=5, help="timing repetitions (best is reported)")
+    ap.add_argument("--json", action="store_true", help="emit machine-friendly JSON")
+    args = ap.parse_args()
+
+    files: List[Path] = []
+    for p in map(Path, args.paths):
+        files.extend(sorted(p.glob("*.xml")) if p.is_dir() else [p])
+    rep = report(args.map, files, args.repeat)
+
+    if args.json:
+        print(json.dumps(rep, indent=2, ensure_ascii=False, default=str))
+        return
+    print(f"\nMAP: {rep['map']}  files: {rep['files']}")
+    print(f"dialects: {rep['dialects']}")
+    print(f"raw value diffs:      {rep['raw_value_diffs'] or 'none'}")
+    print(f"jobspec field diffs:  {rep['jobspec_field_diffs'] or 'none'}")
+    for name, t in rep["evaluate_timings"].items():
+        print(
+            f"[{name}] {t['files']} files  generic {t['generic_ms']} ms  dialect {t['dialect_ms']} ms"
+            f"  speedup x{t['speedup']}"
+        )
+    for ex in rep["examples"]:
+        print(f"  {ex['xml']} {ex['field']}: generic={ex['generic']!r} dialect={ex['dialect']!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,6 @@ import sys
 from pathlib import Path
 from typing import Any, Dict, List
 
-import yaml
 from lxml import etree as ET
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -15,7 +14,9 @@ SRC = ROOT / "src"
 if SRC.exists() and str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
+from prepress_helper.mapping_plan import load_mapping_plan  # noqa: E402
 from prepress_helper.xml_adapter import load_jobspec_from_xml  # noqa: E402
+from prepress_helper.xml_stream import select_plan_for_root  # noqa: E402
 
 
 def _get_dotted(d: Dict[str, Any], dotted: str) -> Any:
@@ -41,20 +42,21 @@ def _textify_list(val):
 
 def inspect(xml_path: str, map_path: str, only: List[str] | None = None) -> Dict[str, Any]:
     tree = ET.parse(xml_path)
-    with open(map_path, "r", encoding="utf-8") as f:
-        mapping: Dict[str, str] = yaml.safe_load(f) or {}
+    # rows show the rules that actually ran (a dialect map when the signature matches)
+    plan = select_plan_for_root(load_mapping_plan(map_path), tree.getroot())
 
-    js = load_jobspec_from_xml(xml_path, map_path)
+    js = load_jobspec_from_xml(xml_path, plan)
     jsd = js.model_dump()
 
-    report: Dict[str, Any] = {"xml": xml_path, "map": map_path, "rows": []}
+    report: Dict[str, Any] = {"xml": xml_path, "map": plan.source, "rows": []}
 
-    for target, xp in mapping.items():
+    for rule in plan.rules:
+        target = rule.target
         if only and target not in only:
             continue
-        row: Dict[str, Any] = {"target": target, "xpath": xp}
+        row: Dict[str, Any] = {"target": target, "xpath": rule.expr}
         try:
-            val = tree.xpath(xp)
+            val = rule.xpath(tree)
             if isinstance(val, list):
                 raw_texts = _textify_list(val)
                 row["raw_values"] = raw_texts
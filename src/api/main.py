@@ -1,83 +1,76 @@
 from __future__ import annotations
 
-import os
-import tempfile
+import asyncio
+import json
+from typing import Literal
 
-from fastapi import FastAPI, File, Form, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
-from prepress_helper.config_loader import apply_shop_config, load_shop_config
+from prepress_helper.advise_cache import advise_cache_from_env
+from prepress_helper.capacity import capacity_report
+from prepress_helper.config_loader import (
+    ShopConfig,
+    apply_shop_config,
+    current_shop_config,
+)
+from prepress_helper.gang_planner import plan_gang
 from prepress_helper.jobspec import JobSpec
-from prepress_helper.router import (
-    detect_intents,
-    fold_preferences_from_message,
-    set_shop_cfg,
+from prepress_helper.nesting import METHODS, nest_jobs, placement_jsx
+from prepress_helper.parse_cache import parse_cache_from_env
+from prepress_helper.pipeline import AdvisePipeline
+from prepress_helper.router import set_shop_cfg
+from prepress_helper.script_store import script_store_from_env
+from prepress_helper.xml_adapter import (
+    JobSpecFeedParser,
+    load_jobspec_from_bytes,
+    load_jobspec_sections_from_bytes,
 )
-from prepress_helper.skills import doc_setup
-from prepress_helper.xml_adapter import load_jobspec_from_xml
-
-
-# add near the top
-def _normalize_ascii(s: str) -> str:
-    if not isinstance(s, str):
-        return s
-    table = {
-        "≤": "<=",
-        "≥": ">=",
-        "×": "x",
-        "–": "-",
-        "—": "-",
-        "“": '"',
-        "”": '"',
-        "‘": "'",
-        "’": "'",
-        "\u00a0": " ",
-    }
-    for k, v in table.items():
-        s = s.replace(k, v)
-    return s
-
-
-# ... inside advise(), right before you build `out`
-seen = set()
-tips2 = []
-for t in tips2:
-    t = _normalize_ascii(t)
-    if t not in seen:
-        tips2.append(t)
-        seen.add(t)
-
-
-# Optional skills
-try:
-    from prepress_helper.skills import policy_enforcer  # type: ignore
-except Exception:
-    policy_enforcer = None  # type: ignore
-
-try:
-    from prepress_helper.skills import fold_math  # type: ignore
-except Exception:
-    fold_math = None  # type: ignore
-try:
-    from prepress_helper.skills import color_policy  # type: ignore
-except Exception:
-    color_policy = None  # type: ignore
-
-try:
-    from prepress_helper.skills import wide_format  # type: ignore
-except Exception:
-    wide_format = None  # type: ignore
+from prepress_helper.xml_parsers import XMLTooLargeError, get_parser_config
 
 app = FastAPI(title="Printssistant API", version="0.0.1")
-SHOP_CFG = load_shop_config("config")
-set_shop_cfg(SHOP_CFG)
+UPLOAD_CHUNK = 64 * 1024
+PARSE_CACHE = parse_cache_from_env()
+ADVISE_CACHE = advise_cache_from_env()
+SCRIPT_STORE = script_store_from_env()
+DISCONNECT_POLL_S = 0.05
+_ROUTER_CFG_VERSION: str | None = None
+
+
+def _shop_cfg() -> ShopConfig:
+    """Current shop-config snapshot; the router is re-pointed only when the version changes."""
+    global _ROUTER_CFG_VERSION
+    snap = current_shop_config("config")
+    if snap.version != _ROUTER_CFG_VERSION:
+        set_shop_cfg(snap.data)
+        _ROUTER_CFG_VERSION = snap.version
+    return snap
 
 
 class AdviseRequest(BaseModel):
     jobspec: JobSpec
     message: str | None = None
     debug_ml: bool = False
+    timings: bool = False
+    # no rendering (default), full bodies, or descriptors served by this worker's script store
+    scripts: Literal["none", "inline", "ref"] = "none"
+
+
+class NestRequest(BaseModel):
+    jobspecs: list[JobSpec]
+    press: str
+    method: Literal["skyline", "guillotine"] | None = None  # default: best of both
+
+
+class GangRequest(BaseModel):
+    jobspecs: list[JobSpec]
+    make_ready: int | None = None  # sheets per form; default: tickets' MRSheets, else policy
+
+
+class CapacityRequest(BaseModel):
+    jobspecs: list[JobSpec]
+    hours_per_day: float | None = None  # default per machine; presses / policy machines keep theirs
 
 
 @app.get("/")
@@ -91,58 +84,156 @@ def healthz():
 
 
 @app.post("/parse_xml")
-async def parse_xml(xml: UploadFile = File(...), mapping_path: str = Form(...)):
-    with tempfile.TemporaryDirectory() as td:
-        xml_path = os.path.join(td, xml.filename)
-        with open(xml_path, "wb") as f:
-            f.write(await xml.read())
-        js = load_jobspec_from_xml(xml_path, mapping_path)
-        js = apply_shop_config(js, SHOP_CFG)
-        return JSONResponse(js.model_dump())
+async def parse_xml(
+    xml: UploadFile = File(...),
+    mapping_path: str = Form(...),
+    sections: bool = Form(False),
+    inline_shop: bool = Form(False),
+):
+    shop = _shop_cfg()
+    too_large = xml.size is not None and get_parser_config().too_large(xml.size)
+    if sections:
+        # One JobSpec per Section; needs the whole tree, so there is nothing to stream.
+        if too_large:
+            raise HTTPException(status_code=413, detail="XML too large for section extraction")
+        specs = load_jobspec_sections_from_bytes(await xml.read(), mapping_path)
+        return JSONResponse([apply_shop_config(js, shop, inline=inline_shop).model_dump() for js in specs])
+    if PARSE_CACHE is not None and not too_large:
+        # The cache key is the hash of the whole document, so read it in one go.
+        js = load_jobspec_from_bytes(await xml.read(), mapping_path, cache=PARSE_CACHE)
+    else:
+        # Feed the upload to the parser chunk by chunk; no temp file, no second full copy.
+        parser = JobSpecFeedParser(mapping_path)
+        while chunk := await xml.read(UPLOAD_CHUNK):
+            parser.feed(chunk)
+        js = parser.close()
+    js = apply_shop_config(js, shop, inline=inline_shop)
+    return JSONResponse(js.model_dump())
+
+
+@app.exception_handler(XMLTooLargeError)
+async def _xml_too_large(request, exc: XMLTooLargeError):
+    return JSONResponse(status_code=413, content={"detail": str(exc)})
+
+
+@app.get("/parse_cache/stats")
+def parse_cache_stats():
+    if PARSE_CACHE is None:
+        return {"enabled": False}
+    return {"enabled": True, **PARSE_CACHE.stats()}
+
+
+@app.get("/advise_cache/stats")
+def advise_cache_stats():
+    if ADVISE_CACHE is None:
+        return {"enabled": False}
+    return {"enabled": True, **ADVISE_CACHE.stats()}
+
+
+async def _cancel_on_disconnect(request: Request, work: asyncio.Task, poll_s: float = DISCONNECT_POLL_S):
+    """Await `work`, cancelling it if the client goes away first. Returns None on disconnect."""
+    while True:
+        done, _ = await asyncio.wait({work}, timeout=poll_s)
+        if done:
+            return work.result()
+        if await request.is_disconnected():
+            work.cancel()
+            return None
 
 
 @app.post("/advise")
-async def advise(req: AdviseRequest):
-    js = apply_shop_config(req.jobspec, SHOP_CFG)
-    intents = detect_intents(js, req.message or "")
-    tips = doc_setup.tips(js)
-    scripts = doc_setup.scripts(js)
-
-    if "fold_math" in intents and fold_math:
-        style, fin = fold_preferences_from_message(req.message or "")
-        tips += fold_math.tips(js, style=style, fold_in=fin)  # type: ignore
-        scripts.update(fold_math.scripts(js, style=style, fold_in=fin))  # type: ignore
-
-    if "color_policy" in intents and color_policy:
-        tips += color_policy.tips(js)  # type: ignore
-        scripts.update(color_policy.scripts(js))  # type: ignore
-
-    if policy_enforcer:
-        tips += policy_enforcer.tips(js, req.message or "")
-        scripts.update(policy_enforcer.scripts(js, req.message or ""))
-
-    if "wide_format" in intents and wide_format:
-        tips += wide_format.tips(js)  # type:ignore
-        scripts.update(wide_format.scripts(js))  # type: ignore
-
-    seen = set()
-    tips2 = []
-    for t in tips:
-        if t not in seen:
-            tips2.append(t)
-            seen.add(t)
-
-    out = {"intents": intents, "tips": tips2, "scripts": scripts}
-
-    # optional ML debug
-    try:
-        from prepress_helper.ml.product_classifier import predict_label  # type: ignore
+async def advise(req: AdviseRequest, request: Request):
+    work = asyncio.ensure_future(
+        AdvisePipeline(cache=ADVISE_CACHE).run_async(
+            req.jobspec,
+            req.message,
+            shop=_shop_cfg(),
+            debug_ml=req.debug_ml,
+            timings=req.timings,
+            render_scripts=req.scripts != "none",
+        )
+    )
+    result = await _cancel_on_disconnect(request, work)
+    if result is None:
+        return JSONResponse(status_code=499, content={"detail": "client disconnected"})
+    out = result.to_dict()
+    if req.scripts == "ref":
+        out["scripts"] = SCRIPT_STORE.describe(result.scripts)
+    return out
 
-        if req.debug_ml:
-            pred = predict_label(js, req.message or "")
-            if pred:
-                out["meta"] = {"ml_prediction": pred[0], "prob": round(pred[1], 4)}
-    except Exception:
-        pass
 
+def _ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+@app.post("/advise/stream")
+async def advise_stream(req: AdviseRequest, request: Request, format: Literal["ndjson", "sse"] | None = None):
+    """
+    /advise as a stream of events (intents, then each skill as it finishes, then done);
+    see AdvisePipeline.stream. NDJSON by default, SSE with ?format=sse or
+    Accept: text/event-stream.
+    """
+    sse = format == "sse" or (format is None and "text/event-stream" in request.headers.get("accept", ""))
+    encode = _sse if sse else _ndjson
+    events = AdvisePipeline().stream(
+        req.jobspec,
+        req.message,
+        shop=_shop_cfg(),
+        debug_ml=req.debug_ml,
+        render_scripts=req.scripts != "none",
+    )
+
+    async def body():
+        try:
+            async for event in events:
+                if event["event"] == "skill" and "scripts" in event and req.scripts == "ref":
+                    event["scripts"] = SCRIPT_STORE.describe(event["scripts"])
+                if event["event"] == "done" and not req.timings:
+                    event.pop("timings_ms")
+                yield encode(event)
+        finally:
+            await events.aclose()
+
+    media = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media, headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/nest")
+def nest(req: NestRequest):
+    shop = _shop_cfg()
+    try:
+        layout = nest_jobs(req.jobspecs, req.press, shop=shop.data, methods=[req.method] if req.method else METHODS)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    out = layout.to_dict()
+    out["scripts"] = SCRIPT_STORE.describe({"illustrator_jsx_nest_placement": placement_jsx(layout)})
     return out
+
+
+@app.post("/gang")
+def gang(req: GangRequest):
+    return plan_gang(req.jobspecs, shop=_shop_cfg().data, make_ready=req.make_ready).to_dict()
+
+
+@app.post("/capacity")
+def capacity(req: CapacityRequest):
+    return capacity_report(req.jobspecs, shop=_shop_cfg().data, hours_per_day=req.hours_per_day).to_dict()
+
+
+@app.get("/scripts/{script_id}")
+def get_script(script_id: str, request: Request):
+    item = SCRIPT_STORE.get(script_id)
+    if item is None:
+        # ids live in this process's script store only (see script_store)
+        raise HTTPException(
+            status_code=404, detail="Unknown script id (evicted, restarted or another worker); re-run /advise"
+        )
+    desc, body = item
+    headers = {"ETag": desc.etag, "Cache-Control": "private, max-age=86400, immutable"}
+    if desc.etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/javascript; charset=utf-8", headers=headers)
@@ -1 +1,3 @@
-__all__ = []
+__version__ = "0.0.1"
+
+__all__ = ["__version__"]
@@ -0,0 +1,152 @@
+# src/prepress_helper/advise_cache.py
+"""
+In-process LRU/TTL memo of advise results, with single-flight coalescing.
+
+Key = sha256 over canonical JSON of
+  - the JobSpec minus volatile fields (due_at; shop attachment / adjustments, which are
+    recomputed from the config)
+  - the normalized message (lower-cased, whitespace collapsed; skills match case-insensitively)
+  - the shop-config version and the intent-rules version
+  - the skill fingerprint (names, versions, budgets) and the run options
+
+Concurrent identical requests wait on the first one's computation instead of running
+the skills again. Only results where every skill finished ok are stored.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple
+
+from prepress_helper.jobspec import JobSpec
+
+ENV_ADVISE_CACHE = "PRINTSSISTANT_ADVISE_CACHE"  # max entries; 0 disables
+ENV_ADVISE_CACHE_TTL = "PRINTSSISTANT_ADVISE_CACHE_TTL"
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL_S = 300.0
+
+VOLATILE_FIELDS = frozenset({"due_at"})
+VOLATILE_SPECIAL = frozenset({"shop", "shop_version", "adjustments"})
+
+
+def normalize_message(message: Optional[str]) -> str:
+    return re.sub(r"\s+", " ", (message or "").strip().lower())
+
+
+def jobspec_fingerprint(js: JobSpec) -> Dict[str, Any]:
+    data = js.model_dump(exclude=set(VOLATILE_FIELDS))
+    data["special"] = {k: v for k, v in (data.get("special") or {}).items() if k not in VOLATILE_SPECIAL}
+    return data
+
+
+def advise_key(js: JobSpec, message: Optional[str], **parts: Any) -> str:
+    payload = {"job": jobspec_fingerprint(js), "msg": normalize_message(message), **parts}
+    raw = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class Abandoned(Exception):
+    """The request computing a key was cancelled; waiters should compute it themselves."""
+
+
+class AdviseCache:
+    """Thread-safe. Futures from `claim()` are concurrent.futures; async callers wrap them."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_s: float = DEFAULT_TTL_S) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            return self._get_locked(key)
+
+    def _get_locked(self, key: str) -> Any:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def claim(self, key: str) -> Tuple[Optional[Any], Optional[Future], bool]:
+        """
+        One lookup for the single-flight protocol: (cached value, None, False) on a hit,
+        (None, future, False) when someone else is computing it (wait on the future),
+        (None, future, True) when the caller must compute and then `resolve()` it.
+        """
+        with self._lock:
+            value = self._get_locked(key)
+            if value is not None:
+                self.hits += 1
+                return value, None, False
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                return None, fut, False
+            self.misses += 1
+            fut = self._inflight[key] = Future()
+            return None, fut, True
+
+    def resolve(
+        self, key: str, fut: Future, value: Any = None, error: Optional[BaseException] = None, store: bool = True
+    ) -> None:
+        """Finish a claimed computation: wake the waiters and (if `store`) cache the value."""
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is None and store:
+            self.put(key, value)
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.coalesced = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+                "inflight": len(self._inflight),
+            }
+
+
+def advise_cache_from_env() -> Optional[AdviseCache]:
+    """AdviseCache sized by $PRINTSSISTANT_ADVISE_CACHE (default 512 entries; 0 disables)."""
+    raw = os.environ.get(ENV_ADVISE_CACHE, "").strip()
+    max_entries = int(raw) if raw else DEFAULT_MAX_ENTRIES
+    if max_entries <= 0:
+        return None
+    ttl = os.environ.get(ENV_ADVISE_CACHE_TTL, "").strip()
+    return AdviseCache(max_entries=max_entries, ttl_s=float(ttl) if ttl else DEFAULT_TTL_S)
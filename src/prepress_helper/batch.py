@@ -0,0 +1,214 @@
+# src/prepress_helper/batch.py
+"""
+Batch ingest: many XML tickets -> one JSONL file, fanned out over a process pool.
+
+Workers are started once and pre-warmed (compiled mapping plan incl. dialect plans,
+shop config, this process's pooled parser), so per-file cost is the parse itself.
+Records are written as they complete; a failing file becomes an `ok: false` record
+instead of stopping the run. With resume=True, inputs already recorded (by source)
+are not submitted and results for job numbers already recorded are not written again.
+"""
+from __future__ import annotations
+
+import glob
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from prepress_helper import xml_parsers
+from prepress_helper.config_loader import apply_shop_config, current_shop_config
+from prepress_helper.mapping_plan import MappingPlan, load_mapping_plan
+from prepress_helper.xml_adapter import load_jobspec_and_values_from_bytes
+
+ZIP_SEP = "!/"  # "archive.zip!/path/in/zip.xml"
+
+
+# ----------------------------
+# Inputs
+# ----------------------------
+
+
+def _zip_members(path: str) -> Iterator[str]:
+    with zipfile.ZipFile(path) as zf:
+        for name in zf.namelist():
+            if name.lower().endswith(".xml") and not name.endswith("/"):
+                yield f"{path}{ZIP_SEP}{name}"
+
+
+def iter_sources(inputs: Iterable[str]) -> Iterator[str]:
+    """Expand directories (recursive *.xml), glob patterns and .zip archives into source ids."""
+    seen: Set[str] = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            found = sorted(glob.glob(os.path.join(item, "**", "*.xml"), recursive=True))
+        elif glob.has_magic(item):
+            found = sorted(glob.glob(item, recursive=True))
+        else:
+            found = [item]
+        for path in found:
+            for src in _zip_members(path) if path.lower().endswith(".zip") else [path]:
+                if src not in seen:
+                    seen.add(src)
+                    yield src
+
+
+def read_source(src: str) -> bytes:
+    if ZIP_SEP in src:
+        archive, member = src.split(ZIP_SEP, 1)
+        with zipfile.ZipFile(archive) as zf:
+            return zf.read(member)
+    with open(src, "rb") as f:
+        return f.read()
+
+
+# ----------------------------
+# Worker side
+# ----------------------------
+
+_WORKER: Dict[str, Any] = {}
+
+
+def init_worker(map_path: str, config_dir: str, stream: bool, inline_shop: bool = False) -> None:
+    """Process-pool initializer: compile everything once per worker."""
+    plan = load_mapping_plan(map_path)
+    plan.compile_all()
+    _WORKER.update(plan=plan, shop=current_shop_config(config_dir), stream=stream, inline_shop=inline_shop)
+    xml_parsers.tree_parser()
+
+
+def parse_source(src: str) -> Dict[str, Any]:
+    """Parse one ticket into a JSONL record. Never raises: errors are part of the record."""
+    t0 = time.perf_counter()
+    rec: Dict[str, Any] = {"source": src}
+    try:
+        plan: MappingPlan = _WORKER["plan"]
+        js, values = load_jobspec_and_values_from_bytes(read_source(src), plan, stream=_WORKER["stream"])
+        js = apply_shop_config(js, _WORKER["shop"], inline=_WORKER["inline_shop"])
+        job_number = values.get("job_number")
+        rec.update(
+            ok=True,
+            job_number=job_number.strip() if isinstance(job_number, str) and job_number.strip() else None,
+            jobspec=js.model_dump(),
+        )
+    except Exception as e:
+        rec.update(ok=False, error=f"{type(e).__name__}: {e}")
+    rec["ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    return rec
+
+
+# ----------------------------
+# Driver
+# ----------------------------
+
+
+@dataclass
+class BatchStats:
+    written: int = 0
+    errors: int = 0
+    skipped_sources: int = 0
+    skipped_jobs: int = 0
+    seconds: float = 0.0
+
+
+def load_done(out_path: str) -> Tuple[Set[str], Set[str]]:
+    """(sources, job numbers) of successful records already in an output file."""
+    sources: Set[str] = set()
+    jobs: Set[str] = set()
+    if not os.path.exists(out_path):
+        return sources, jobs
+    with open(out_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # torn last line from an interrupted run
+            if isinstance(rec, dict) and rec.get("ok"):
+                sources.add(rec.get("source"))
+                if rec.get("job_number"):
+                    jobs.add(rec["job_number"])
+    return sources, jobs
+
+
+def run_batch(
+    inputs: Iterable[str],
+    out_path: str,
+    map_path: str,
+    *,
+    config_dir: str = "config",
+    workers: Optional[int] = None,
+    resume: bool = False,
+    stream: bool = False,
+    max_pending: int = 256,
+    inline_shop: bool = False,
+) -> BatchStats:
+    """
+    Parse every input into `out_path` (JSONL, completion order). workers=1 runs in-process.
+    At most `max_pending` files are in flight, so huge input lists do not pile up futures.
+    """
+    t0 = time.perf_counter()
+    stats = BatchStats()
+    done_sources, done_jobs = load_done(out_path) if resume else (set(), set())
+
+    def todo() -> Iterator[str]:
+        for src in iter_sources(inputs):
+            if src in done_sources:
+                stats.skipped_sources += 1
+            else:
+                yield src
+
+    if resume and os.path.exists(out_path):
+        _ensure_trailing_newline(out_path)
+    with open(out_path, "a" if resume else "w", encoding="utf-8") as out:
+
+        def emit(rec: Dict[str, Any]) -> None:
+            if rec.get("ok"):
+                jn = rec.get("job_number")
+                if jn and jn in done_jobs:
+                    stats.skipped_jobs += 1
+                    return
+                if jn:
+                    done_jobs.add(jn)
+            else:
+                stats.errors += 1
+            out.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+            out.flush()
+            stats.written += 1
+
+        if workers == 1:
+            init_worker(map_path, config_dir, stream, inline_shop)
+            for src in todo():
+                emit(parse_source(src))
+        else:
+            _run_pool(todo(), emit, (map_path, config_dir, stream, inline_shop), workers, max_pending)
+
+    stats.seconds = round(time.perf_counter() - t0, 3)
+    return stats
+
+
+def _run_pool(sources, emit, initargs, workers, max_pending) -> None:
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as pool:
+        pending: Set[Future] = set()
+        for src in sources:
+            pending.add(pool.submit(parse_source, src))
+            if len(pending) >= max_pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    emit(fut.result())
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                emit(fut.result())
+
+
+def _ensure_trailing_newline(path: str) -> None:
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
@@ -0,0 +1,224 @@
+# src/prepress_helper/capacity.py
+"""
+Machine-load report: make-ready and run hours per machine per due date.
+
+Operations come from special.operations, mapped from the ticket's Operation and
+Printing records in the same parse pass (xml_map.yml `operations:`). A batch is
+flattened once into columns (machine code, day code, job code, MR hours, run hours)
+and summed per machine x day cell with numpy.bincount when NumPy is installed, else
+in one pass over the columns, so a week of tickets summarizes in milliseconds.
+
+Capacity is hours per machine per day: press_capabilities `hours_per_day` for presses
+the press index resolves, else policies.capacity.machines[name], else
+policies.capacity.hours_per_day. Machines listed in policies.capacity.ignore_machines
+("No Machine") carry no load. Tickets without a due date land on day "unscheduled",
+which is reported but never flagged.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from prepress_helper.config_loader import resolve_shop
+from prepress_helper.press_index import resolve_press
+
+try:  # optional: vectorized sums for large batches
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is not a dependency
+    np = None
+
+UNSCHEDULED = "unscheduled"
+_RE_DAY = re.compile(r"^\s*(\d{4}-\d{2}-\d{2})")
+
+
+@dataclass
+class OperationsTable:
+    """Column-oriented operations of a batch; `machines`/`days`/`jobs` decode the *_ix columns."""
+
+    machines: List[str] = field(default_factory=list)
+    days: List[str] = field(default_factory=list)
+    jobs: List[str] = field(default_factory=list)
+    machine_ix: List[int] = field(default_factory=list)
+    day_ix: List[int] = field(default_factory=list)
+    job_ix: List[int] = field(default_factory=list)
+    mr_h: List[float] = field(default_factory=list)
+    run_h: List[float] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.mr_h)
+
+    @classmethod
+    def from_jobs(cls, jobs: Iterable[Any], ignore: Iterable[str] = ()) -> "OperationsTable":
+        """
+        `jobs` are JobSpecs or (job id, JobSpec) pairs; without an id, special.job_number
+        names the ticket. An OperationKey is counted once per ticket, so the per-section
+        specs of one ticket do not double its load.
+        """
+        t = cls()
+        codes: Tuple[Dict[str, int], Dict[str, int], Dict[str, int]] = ({}, {}, {})
+        skip = {m.strip().lower() for m in ignore}
+        seen: set[Tuple[str, str]] = set()
+
+        def code(k: int, names: List[str], value: str) -> int:
+            ix = codes[k].get(value)
+            if ix is None:
+                ix = codes[k][value] = len(names)
+                names.append(value)
+            return ix
+
+        for i, item in enumerate(jobs):
+            job_id, js = item if isinstance(item, tuple) else (None, item)
+            job_id = str(job_id or (js.special or {}).get("job_number") or f"job{i + 1}")
+            m = _RE_DAY.match(js.due_at or "")
+            day = m.group(1) if m else UNSCHEDULED
+            for op in (js.special or {}).get("operations") or ():
+                machine = str(op.get("machine") or "").strip()
+                if not machine or machine.lower() in skip:
+                    continue
+                key = str(op.get("key") or "")
+                if key:
+                    if (job_id, key) in seen:
+                        continue
+                    seen.add((job_id, key))
+                t.machine_ix.append(code(0, t.machines, machine))
+                t.day_ix.append(code(1, t.days, day))
+                t.job_ix.append(code(2, t.jobs, job_id))
+                t.mr_h.append(float(op.get("mr_h") or 0.0))
+                t.run_h.append(float(op.get("run_h") or 0.0))
+        return t
+
+    def sums(self) -> Tuple[List[float], List[float], List[int], List[int]]:
+        """(MR hours, run hours, operations, distinct jobs) per cell, cell = machine * len(days) + day."""
+        n_days, n_jobs = len(self.days), len(self.jobs)
+        size = len(self.machines) * n_days
+        if np is not None:
+            cell = np.asarray(self.machine_ix, dtype=np.int64) * n_days + np.asarray(self.day_ix, dtype=np.int64)
+            mr = np.bincount(cell, weights=np.asarray(self.mr_h, dtype=float), minlength=size)
+            run = np.bincount(cell, weights=np.asarray(self.run_h, dtype=float), minlength=size)
+            ops = np.bincount(cell, minlength=size)
+            pairs = np.unique(cell * n_jobs + np.asarray(self.job_ix, dtype=np.int64))
+            jobs = np.bincount(pairs // max(n_jobs, 1), minlength=size)
+            return mr.tolist(), run.tolist(), ops.tolist(), jobs.tolist()
+        mr_l, run_l, ops_l, jobs_l = [0.0] * size, [0.0] * size, [0] * size, [0] * size
+        pairs_seen: set[Tuple[int, int]] = set()
+        for m, d, j, a, b in zip(self.machine_ix, self.day_ix, self.job_ix, self.mr_h, self.run_h):
+            c = m * n_days + d
+            mr_l[c] += a
+            run_l[c] += b
+            ops_l[c] += 1
+            if (c, j) not in pairs_seen:
+                pairs_seen.add((c, j))
+                jobs_l[c] += 1
+        return mr_l, run_l, ops_l, jobs_l
+
+
+@dataclass(frozen=True)
+class MachineLoad:
+    machine: str
+    day: str
+    jobs: int
+    operations: int
+    mr_h: float
+    run_h: float
+    capacity_h: float
+
+    @property
+    def total_h(self) -> float:
+        return self.mr_h + self.run_h
+
+    @property
+    def load(self) -> float:
+        return self.total_h / self.capacity_h if self.capacity_h else 0.0
+
+    @property
+    def over(self) -> bool:
+        return self.day != UNSCHEDULED and self.total_h > self.capacity_h + 1e-9
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "machine": self.machine,
+            "due": self.day,
+            "jobs": self.jobs,
+            "operations": self.operations,
+            "mr_h": round(self.mr_h, 3),
+            "run_h": round(self.run_h, 3),
+            "total_h": round(self.total_h, 3),
+            "capacity_h": self.capacity_h,
+            "load": round(self.load, 3),
+            "over": self.over,
+        }
+
+
+@dataclass(frozen=True)
+class CapacityReport:
+    loads: Tuple[MachineLoad, ...]  # machine, then day
+
+    @property
+    def over_capacity(self) -> Tuple[MachineLoad, ...]:
+        return tuple(x for x in self.loads if x.over)
+
+    def machines(self) -> Dict[str, Dict[str, float]]:
+        out: Dict[str, Dict[str, float]] = {}
+        for x in self.loads:
+            m = out.setdefault(x.machine, {"mr_h": 0.0, "run_h": 0.0, "total_h": 0.0})
+            m["mr_h"] += x.mr_h
+            m["run_h"] += x.run_h
+            m["total_h"] += x.total_h
+        return {name: {k: round(v, 3) for k, v in m.items()} for name, m in out.items()}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "machines": len({x.machine for x in self.loads}),
+            "days": len({x.day for x in self.loads}),
+            "operations": sum(x.operations for x in self.loads),
+            "mr_h": round(sum(x.mr_h for x in self.loads), 3),
+            "run_h": round(sum(x.run_h for x in self.loads), 3),
+            "over_capacity": len(self.over_capacity),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "summary": self.summary(),
+            "machines": self.machines(),
+            "loads": [x.to_dict() for x in self.loads],
+            "over_capacity": [x.to_dict() for x in self.over_capacity],
+        }
+
+
+def machine_capacity(shop: Mapping[str, Any], machine: str, hours_per_day: Optional[float] = None) -> float:
+    """Hours per day for `machine`; `hours_per_day` replaces the policy default only."""
+    rec = resolve_press(shop, machine)
+    if rec is not None and rec.meta.get("hours_per_day"):
+        return float(rec.meta["hours_per_day"])
+    pol = (shop.get("policies") or {}).get("capacity") or {}
+    per_machine = {str(k).strip().lower(): v for k, v in (pol.get("machines") or {}).items()}
+    if per_machine.get(machine.strip().lower()):
+        return float(per_machine[machine.strip().lower()])
+    return float(hours_per_day if hours_per_day is not None else pol.get("hours_per_day") or 8)
+
+
+def capacity_report(
+    jobs: Iterable[Any], shop: Optional[Mapping[str, Any]] = None, hours_per_day: Optional[float] = None
+) -> CapacityReport:
+    """Make-ready and run hours per machine per due date for a batch, flagged against capacity."""
+    jobs = list(jobs)
+    if shop is None:
+        first = jobs[0] if jobs else None
+        shop = resolve_shop(first[1] if isinstance(first, tuple) else first) if first is not None else {}
+    pol = (shop.get("policies") or {}).get("capacity") or {}
+    table = OperationsTable.from_jobs(jobs, ignore=pol.get("ignore_machines") or ())
+    if not len(table):
+        return CapacityReport(())
+    mr, run, ops, njobs = table.sums()
+    n_days = len(table.days)
+    caps = [machine_capacity(shop, m, hours_per_day) for m in table.machines]
+    loads = [
+        MachineLoad(machine, day, njobs[c], ops[c], mr[c], run[c], caps[mi])
+        for mi, machine in enumerate(table.machines)
+        for di, day in enumerate(table.days)
+        for c in (mi * n_days + di,)
+        if ops[c]
+    ]
+    loads.sort(key=lambda x: (x.machine.lower(), x.day))
+    return CapacityReport(tuple(loads))
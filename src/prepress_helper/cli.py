@@ -1,50 +1,24 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Dict, List, Optional
+from typing import Any, List, Optional
 
 import typer
 
-from prepress_helper.config_loader import apply_shop_config, load_shop_config
+from prepress_helper.batch import run_batch
+from prepress_helper.capacity import capacity_report
+from prepress_helper.config_loader import apply_shop_config, current_shop_config
+from prepress_helper.gang_planner import plan_gang
 from prepress_helper.jobspec import JobSpec
-from prepress_helper.router import detect_intents, fold_preferences_from_message
-from prepress_helper.skills import doc_setup
-from prepress_helper.xml_adapter import load_jobspec_from_xml
-
-# Optional skills
-try:
-    from prepress_helper.skills import policy_enforcer  # type: ignore
-except Exception:
-    policy_enforcer = None  # type: ignore
-
-try:
-    from prepress_helper.skills import fold_math  # type: ignore
-except Exception:
-    fold_math = None  # type: ignore
-
-try:
-    from prepress_helper.skills import color_policy  # type: ignore
-except Exception:
-    color_policy = None  # type: ignore
-
-# Optional ML (for debug meta only)
-try:
-    from prepress_helper.ml.product_classifier import predict_label  # type: ignore
-except Exception:
-    predict_label = None  # type: ignore
+from prepress_helper.nesting import METHODS, nest_jobs, placement_jsx
+from prepress_helper.parse_cache import ENV_CACHE_DIR, ParseCache
+from prepress_helper.pipeline import AdvisePipeline, dedupe_nags, dedupe_tips
+from prepress_helper.xml_adapter import (
+    load_jobspec_from_xml,
+    load_jobspec_sections_from_xml,
+)
 
 app = typer.Typer(add_completion=False, help="Printssistant CLI")
-SHOP_CFG = load_shop_config("config")
-
-
-def _uniq(seq: List[str]) -> List[str]:
-    seen: set[str] = set()
-    out: List[str] = []
-    for s in seq:
-        if s not in seen:
-            out.append(s)
-            seen.add(s)
-    return out
 
 
 def _read_json_auto(path: str) -> Any:
@@ -60,58 +34,9 @@ def _read_json_auto(path: str) -> Any:
     return json.loads(text)
 
 
-def _dedupe_nags(lines: List[str]) -> List[str]:
-    seen = set()
-    out: List[str] = []
-    for s in lines:
-        norm = s.strip().lower()
-        if norm not in seen:
-            out.append(s)
-            seen.add(norm)
-    return out
-
-
-def _dedupe_tips(tips: List[str]) -> List[str]:
-    """
-    De-duplicate tips and apply preferred phrasing:
-      - Prefer 'Set document to ...' over 'Create a document at ...'
-      - Prefer 'RGB assets allowed...' over CMYK admonitions
-      - Prefer 'Use shop rich black...' over generic 'Rich black ...'
-      - Collapse duplicate CMYK admonitions (e.g. 'Use CMYK...' vs 'Work in CMYK...')
-    """
-    lower = [t.strip().lower() for t in tips]
-    has_set_document = any("set document to" in t for t in lower)
-    has_rgb_allowed = any("rgb assets allowed" in t for t in lower)
-    has_shop_rich = any("use shop rich black" in t for t in lower)
-
-    out: List[str] = []
-    seen: set[str] = set()
-    seen_rgb_admon = False  # collapse variations that contain 'avoid placing rgb assets directly'
-
-    for s in tips:
-        key = s.strip().lower()
-        if key in seen:
-            continue
-
-        if has_set_document and "create a document at" in key:
-            continue
-
-        if "avoid placing rgb assets directly" in key:
-            if has_rgb_allowed:
-                # If RGB is allowed, drop admonitions entirely
-                continue
-            # Otherwise, keep only the first admonition we encounter
-            if seen_rgb_admon:
-                continue
-            seen_rgb_admon = True
-
-        if has_shop_rich and ("rich black" in key) and ("use shop rich black" not in key):
-            continue
-
-        out.append(s)
-        seen.add(key)
-
-    return out
+# kept importable from here for existing callers/tests
+_dedupe_nags = dedupe_nags
+_dedupe_tips = dedupe_tips
 
 
 @app.command()
@@ -123,11 +48,30 @@ def parse_xml(
         "--out",
         help="Write UTF-8 JSON to this path (avoids shell redirection encoding issues).",
     ),
+    stream: bool = typer.Option(False, "--stream", help="Single-pass iterparse extraction (flat memory on big XML)."),
+    cache_dir: Optional[str] = typer.Option(
+        None,
+        "--cache-dir",
+        envvar=ENV_CACHE_DIR,
+        help="Reuse parsed JobSpecs keyed by XML bytes + mapping + version.",
+    ),
+    sections: bool = typer.Option(
+        False, "--sections", help="Emit a JSON list with one JobSpec per Section (cover, text, ...)."
+    ),
+    inline_shop: bool = typer.Option(
+        False, "--inline-shop", help="Embed the full shop config in special.shop (legacy consumers)."
+    ),
 ):
     """Parse XML into a normalized JobSpec and print JSON (or write to --out)."""
-    js = load_jobspec_from_xml(xml, map)
-    js = apply_shop_config(js, SHOP_CFG)
-    payload = json.dumps(js.model_dump(), indent=2)
+    shop = current_shop_config("config")
+    if sections:
+        specs = [apply_shop_config(js, shop, inline=inline_shop) for js in load_jobspec_sections_from_xml(xml, map)]
+        payload = json.dumps([js.model_dump() for js in specs], indent=2)
+    else:
+        cache = ParseCache(cache_dir) if cache_dir else None
+        js = load_jobspec_from_xml(xml, map, stream=stream, cache=cache)
+        js = apply_shop_config(js, shop, inline=inline_shop)
+        payload = json.dumps(js.model_dump(), indent=2)
 
     if out:
         with open(out, "w", encoding="utf-8") as fh:
@@ -136,64 +80,140 @@ def parse_xml(
         typer.echo(payload)
 
 
+@app.command("parse-batch")
+def parse_batch(
+    inputs: List[str] = typer.Argument(..., help="XML files, directories, glob patterns or .zip archives."),
+    out: str = typer.Option(..., "--out", help="JSONL output (one record per file, completion order)."),
+    map: str = typer.Option("config/xml_map.yml", "--map", help="Mapping YAML."),
+    jobs: int = typer.Option(0, "--jobs", "-j", help="Worker processes (0 = CPU count, 1 = in-process)."),
+    resume: bool = typer.Option(
+        False, "--resume", help="Append to --out, skipping sources and job numbers it already holds."
+    ),
+    stream: bool = typer.Option(False, "--stream", help="Single-pass iterparse extraction in the workers."),
+    inline_shop: bool = typer.Option(
+        False, "--inline-shop", help="Embed the full shop config in every record (legacy consumers)."
+    ),
+):
+    """Parse many XML tickets into JSONL over a pre-warmed process pool."""
+    stats = run_batch(inputs, out, map, workers=jobs or None, resume=resume, stream=stream, inline_shop=inline_shop)
+    typer.echo(
+        f"wrote {stats.written} record(s) ({stats.errors} error(s)); skipped {stats.skipped_sources} done "
+        f"source(s), {stats.skipped_jobs} duplicate job number(s); {stats.seconds}s",
+        err=True,
+    )
+    if stats.errors:
+        raise typer.Exit(code=1)
+
+
 @app.command()
 def advise(
     jobspec: str,
     msg: Optional[str] = typer.Option(None, "--msg", help="Free text hint like 'trifold roll fold'"),
-    fold: Optional[str] = typer.Option(None, "--fold", help="Override fold style: roll|z"),
+    fold: Optional[str] = typer.Option(
+        None, "--fold", help="Override fold style: roll|z|gate|double_gate|double_parallel|french"
+    ),
     fold_in: Optional[str] = typer.Option(None, "--fold-in", help="Override which panel folds in: left|right"),
     debug_ml: bool = typer.Option(False, "--debug-ml", help="Include ML prediction/confidence when available"),
+    timings: bool = typer.Option(False, "--timings", help="Include per-stage timings (ms)"),
 ):
     """Given a JobSpec JSON file and options, print tips & scripts."""
     raw = _read_json_auto(jobspec)
-    js = JobSpec(**raw)
-    js = apply_shop_config(js, SHOP_CFG)
-
-    intents = detect_intents(js, msg or "")
-    tips: List[str] = []
-    scripts: Dict[str, str] = {}
-    nags: List[str] = []
-
-    # Always include basic doc setup
-    tips += doc_setup.tips(js)
-    scripts.update(doc_setup.scripts(js))
-
-    # Fold math
-    if "fold_math" in intents and fold_math:
-        inf_style, inf_in = fold_preferences_from_message(msg or "")
-        use_style = (fold or inf_style or "roll").lower()
-        use_in = (fold_in or inf_in or "right").lower()
-        tips += fold_math.tips(js, style=use_style, fold_in=use_in)  # type: ignore
-        scripts.update(fold_math.scripts(js, style=use_style, fold_in=use_in))  # type: ignore
-
-    # Color policy
-    if "color_policy" in intents and color_policy:
-        tips += color_policy.tips(js)  # type: ignore
-        scripts.update(color_policy.scripts(js))  # type: ignore
-
-    # Soft nags
-    if policy_enforcer and hasattr(policy_enforcer, "soft_nags"):
-        try:
-            extra = policy_enforcer.soft_nags(js) or []  # type: ignore[attr-defined]
-            nags.extend(extra)
-        except Exception:
-            pass
-
-    # Apply de-dupers
-    tips = _dedupe_tips(tips)
-    nags = _dedupe_nags(nags)
-
-    out: Dict[str, Any] = {"intents": intents, "tips": tips, "scripts": scripts}
-    if nags:
-        out["nags"] = nags
-
-    if debug_ml and predict_label:
-        pred = predict_label(js, msg or "")
-        if pred:
-            label, prob = pred
-            out["meta"] = {"ml_prediction": label, "prob": round(prob, 4)}
-
-    typer.echo(json.dumps(out, indent=2))
+    result = AdvisePipeline().run(JobSpec(**raw), msg, fold=fold, fold_in=fold_in, debug_ml=debug_ml, timings=timings)
+    typer.echo(json.dumps(result.to_dict(), indent=2))
+
+
+def _read_jobs(path: str) -> List[Any]:
+    """JobSpecs from a JobSpec JSON (object or list) or parse-batch JSONL (ok records)."""
+    if path.lower().endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8-sig") as f:
+            recs = [json.loads(line) for line in f if line.strip()]
+        return [(r.get("job_number"), JobSpec(**r["jobspec"])) for r in recs if r.get("ok")]
+    raw = _read_json_auto(path)
+    return [JobSpec(**r) for r in (raw if isinstance(raw, list) else [raw])]
+
+
+@app.command()
+def nest(
+    inputs: List[str] = typer.Argument(..., help="JobSpec JSON files (object or list) or parse-batch JSONL."),
+    press: str = typer.Option(..., "--press", help="Roll or flatbed printer, e.g. hp_latex_570 or trufire_x2."),
+    method: Optional[str] = typer.Option(None, "--method", help="skyline|guillotine (default: best of both)."),
+    out: Optional[str] = typer.Option(None, "--out", help="Write the layout JSON here instead of stdout."),
+    jsx: Optional[str] = typer.Option(None, "--jsx", help="Also write an Illustrator placement JSX."),
+):
+    """Gang wide-format jobs onto a roll or flatbed; print media length, waste and placements."""
+    jobs: List[Any] = []
+    for path in inputs:
+        jobs += _read_jobs(path)
+    shop = current_shop_config("config").data
+    layout = nest_jobs(jobs, press, shop=shop, methods=[method] if method else METHODS)
+    payload = json.dumps(layout.to_dict(), indent=2)
+    if out:
+        with open(out, "w", encoding="utf-8") as fh:
+            fh.write(payload)
+    else:
+        typer.echo(payload)
+    if jsx:
+        with open(jsx, "w", encoding="utf-8") as fh:
+            fh.write(placement_jsx(layout))
+    typer.echo(
+        f"{layout.to_dict()['pieces']} piece(s) on {press}: {layout.media_length:.1f} in of media "
+        f"({layout.beds} bed(s)), {layout.waste:.0%} waste, {len(layout.unplaced)} unplaced",
+        err=True,
+    )
+
+
+@app.command()
+def gang(
+    inputs: List[str] = typer.Argument(..., help="JobSpec JSON files (object or list) or parse-batch JSONL."),
+    make_ready: Optional[int] = typer.Option(
+        None, "--make-ready", help="Make-ready sheets per form (default: tickets' MRSheets, else policy)."
+    ),
+    out: Optional[str] = typer.Option(None, "--out", help="Write the plan JSON here instead of stdout."),
+):
+    """Group sheet-fed tickets by stock/colors/press and gang them onto shared sheets."""
+    jobs: List[Any] = []
+    for path in inputs:
+        jobs += _read_jobs(path)
+    plan = plan_gang(jobs, shop=current_shop_config("config").data, make_ready=make_ready)
+    payload = json.dumps(plan.to_dict(), indent=2)
+    if out:
+        with open(out, "w", encoding="utf-8") as fh:
+            fh.write(payload)
+    else:
+        typer.echo(payload)
+    s = plan.summary()
+    typer.echo(
+        f"{s['jobs']} job(s) in {s['groups']} group(s) on {s['forms']} form(s): {s['total_sheets']} sheets vs "
+        f"{s['solo_sheets']} run separately ({s['saved_sheets']} saved); {s['unplanned']} unplanned",
+        err=True,
+    )
+
+
+@app.command()
+def capacity(
+    inputs: List[str] = typer.Argument(..., help="JobSpec JSON files (object or list) or parse-batch JSONL."),
+    hours_per_day: Optional[float] = typer.Option(
+        None, "--hours-per-day", help="Default hours per machine per day (presses and policy machines keep theirs)."
+    ),
+    out: Optional[str] = typer.Option(None, "--out", help="Write the report JSON here instead of stdout."),
+):
+    """Sum make-ready and run hours per machine per due date and flag machines over capacity."""
+    jobs: List[Any] = []
+    for path in inputs:
+        jobs += _read_jobs(path)
+    report = capacity_report(jobs, shop=current_shop_config("config").data, hours_per_day=hours_per_day)
+    payload = json.dumps(report.to_dict(), indent=2)
+    if out:
+        with open(out, "w", encoding="utf-8") as fh:
+            fh.write(payload)
+    else:
+        typer.echo(payload)
+    s = report.summary()
+    typer.echo(
+        f"{s['operations']} operation(s) on {s['machines']} machine(s) over {s['days']} day(s): "
+        f"{s['mr_h']:.1f} h make-ready, {s['run_h']:.1f} h run; {s['over_capacity']} machine-day(s) over capacity",
+        err=True,
+    )
 
 
 if __name__ == "__main__":
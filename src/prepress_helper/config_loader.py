@@ -1,8 +1,15 @@
 # src/prepress_helper/config_loader.py
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple, Union
 
 import yaml
 
@@ -19,6 +26,10 @@ from .jobspec import JobSpec
 # ----------------------------
 
 _EXPECTED_FILES = ("policies.yml", "product_presets.yml", "press_capabilities.yml")
+_SNAPSHOT_FILES = _EXPECTED_FILES + ("stock_rules.yml",)  # optional extras still count toward the version
+
+# libyaml's C loader is several times faster; same safe-loading semantics.
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 def _num(val: Any, default: float) -> float:
@@ -31,28 +42,23 @@ def _num(val: Any, default: float) -> float:
         return default
 
 
-def _read_yaml_path(path: Path) -> Dict[str, Any]:
-    if not path.is_file():
-        return {}
-    with path.open("r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
+def _parse_yaml(raw: bytes) -> Dict[str, Any]:
+    data = yaml.load(raw, Loader=_YAML_LOADER) or {}
     return data if isinstance(data, dict) else {}
 
 
-def _read_yaml_pkg(package: str, resource_name: str) -> Dict[str, Any]:
-    """Read a YAML file packaged inside a Python package via importlib.resources."""
+def _read_raw(base: Optional[Path], name: str) -> bytes:
+    """Raw bytes of a config file from `base`, else from packaged 'prepress_helper/config'."""
+    if base is not None:
+        path = base / name
+        return path.read_bytes() if path.is_file() else b""
     if resources is None:
-        return {}
+        return b""
     try:
-        base = resources.files(package)  # type: ignore[attr-defined]
-        file = base.joinpath(resource_name)
-        if not file.is_file():
-            return {}
-        with file.open("rb") as f:  # .open() yields a binary handle
-            data = yaml.safe_load(f) or {}
-        return data if isinstance(data, dict) else {}
+        file = resources.files("prepress_helper.config").joinpath(name)  # type: ignore[attr-defined]
+        return file.read_bytes() if file.is_file() else b""
     except Exception:
-        return {}
+        return b""
 
 
 def _looks_like_cfg_dir(d: Path) -> bool:
@@ -92,6 +98,160 @@ def _resolve_cfg_dir(cfg_dir: Optional[str]) -> Optional[Path]:
 # ----------------------------
 
 
+def _normalize_presses(presses_raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten press capability groups into a single name -> meta dict."""
+    presses: Dict[str, Any] = {}
+    if isinstance(presses_raw.get("presses"), dict):
+        presses.update(presses_raw["presses"])
+    for group in ("roll_printers", "flatbed_printers", "sheetfed_presses", "digital_presses", "offset_presses"):
+        if isinstance(presses_raw.get(group), dict):
+            presses.update(presses_raw[group])
+    return presses
+
+
+@dataclass(frozen=True)
+class ShopConfig:
+    """
+    One immutable snapshot of the shop YAML.
+
+    `version` is a content hash of the files it was built from, so two snapshots with
+    the same version hold the same policies. Treat `data` as read-only: it is shared by
+    every request that picked up this snapshot.
+    """
+
+    data: Dict[str, Any]
+    version: str
+    root: Optional[str] = None
+    stamps: Tuple[Tuple[str, int, int], ...] = field(default=(), compare=False)  # (file, mtime_ns, size)
+
+
+def _stamps(base: Path) -> Tuple[Tuple[str, int, int], ...]:
+    out = []
+    for name in _SNAPSHOT_FILES:
+        try:
+            st = (base / name).stat()
+            out.append((name, st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append((name, 0, -1))
+    return tuple(out)
+
+
+def _build_snapshot(base: Optional[Path]) -> ShopConfig:
+    stamps = _stamps(base) if base is not None else ()  # before reading: an edit mid-read re-triggers
+    raw = {name: _read_raw(base, name) for name in _SNAPSHOT_FILES}
+
+    h = hashlib.sha1()
+    for name in _SNAPSHOT_FILES:
+        h.update(name.encode("utf-8") + b"\0" + raw[name] + b"\0")
+
+    press_caps = _parse_yaml(raw["press_capabilities.yml"])
+    data = {
+        "policies": _parse_yaml(raw["policies.yml"]),
+        "products": _parse_yaml(raw["product_presets.yml"]),
+        "presses": _normalize_presses(press_caps),
+        "press_capabilities": press_caps,  # grouped as written; press_index derives the press class
+        "stocks": _parse_yaml(raw["stock_rules.yml"]).get("stocks") or [],
+    }
+    snap = ShopConfig(data=data, version=h.hexdigest()[:12], root=str(base) if base else None, stamps=stamps)
+    return register_shop_config(snap)
+
+
+# ----------------------------
+# Snapshot registry (version id -> snapshot)
+# ----------------------------
+
+_REGISTRY_SIZE = 32
+_REGISTRY: "OrderedDict[str, ShopConfig]" = OrderedDict()
+_REGISTRY_LOCK = threading.Lock()
+
+
+def register_shop_config(cfg: Union[ShopConfig, Dict[str, Any]]) -> ShopConfig:
+    """
+    Make a snapshot resolvable by its version id. A plain dict gets a version from its
+    canonical JSON. The most recent `_REGISTRY_SIZE` versions are kept.
+    """
+    if not isinstance(cfg, ShopConfig):
+        canon = json.dumps(cfg, sort_keys=True, default=str, separators=(",", ":")).encode("utf-8")
+        cfg = ShopConfig(data=cfg, version="d" + hashlib.sha1(canon).hexdigest()[:11])
+    with _REGISTRY_LOCK:
+        _REGISTRY[cfg.version] = cfg
+        _REGISTRY.move_to_end(cfg.version)
+        while len(_REGISTRY) > _REGISTRY_SIZE:
+            _REGISTRY.popitem(last=False)
+    return cfg
+
+
+def shop_config_by_version(version: Optional[str]) -> Optional[ShopConfig]:
+    if not version:
+        return None
+    with _REGISTRY_LOCK:
+        return _REGISTRY.get(version)
+
+
+class ShopConfigStore:
+    """
+    Holds the current ShopConfig for one config directory and hot-reloads it.
+
+    `current()` re-stats the YAML files at most every `poll_interval` seconds and, when
+    one changed, builds a new snapshot and swaps it in with a single reference
+    assignment. Callers keep whatever snapshot they already hold, so in-flight work
+    finishes on the old policies. A reload that fails to parse keeps the old snapshot
+    (the error is kept in `last_error`).
+    """
+
+    def __init__(self, cfg_dir: Optional[str] = None, poll_interval: float = 2.0) -> None:
+        self.base = _resolve_cfg_dir(cfg_dir)
+        self.poll_interval = poll_interval
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._snapshot = _build_snapshot(self.base)
+        self._checked = time.monotonic()
+
+    def current(self) -> ShopConfig:
+        snap = self._snapshot
+        if self.base is None or time.monotonic() - self._checked < self.poll_interval:
+            return snap
+        return self.reload()
+
+    def reload(self, force: bool = False) -> ShopConfig:
+        with self._lock:
+            self._checked = time.monotonic()
+            snap = self._snapshot
+            if self.base is None or (not force and _stamps(self.base) == snap.stamps):
+                return snap
+            try:
+                fresh = _build_snapshot(self.base)
+            except (OSError, yaml.YAMLError) as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                return snap
+            self.last_error = None
+            if fresh.version == snap.version:
+                fresh = ShopConfig(data=snap.data, version=snap.version, root=snap.root, stamps=fresh.stamps)
+            self._snapshot = fresh
+            return fresh
+
+
+_STORES: Dict[str, ShopConfigStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def shop_config_store(cfg_dir: Optional[str] = "config") -> ShopConfigStore:
+    """The process-wide store for a config directory (created on first use)."""
+    base = _resolve_cfg_dir(cfg_dir)
+    key = os.path.abspath(base) if base is not None else f"<package:{cfg_dir}>"
+    store = _STORES.get(key)
+    if store is None:
+        with _STORES_LOCK:
+            store = _STORES.get(key)
+            if store is None:
+                store = _STORES[key] = ShopConfigStore(cfg_dir)
+    return store
+
+
+def current_shop_config(cfg_dir: Optional[str] = "config") -> ShopConfig:
+    return shop_config_store(cfg_dir).current()
+
+
 def load_shop_config(cfg_dir: Optional[str] = None) -> Dict[str, Any]:
     """
     Load shop config from YAML. Works when launched from any working directory and when frozen.
@@ -101,33 +261,37 @@ def load_shop_config(cfg_dir: Optional[str] = None) -> Dict[str, Any]:
     - cwd/cfg_dir
     - project_root/cfg_dir
     - packaged 'prepress_helper/config' (if present)
+
+    Returns the data of the current (shared, hot-reloaded) snapshot; do not mutate it.
     """
-    # Resolve a filesystem directory first
-    base = _resolve_cfg_dir(cfg_dir)
+    return current_shop_config(cfg_dir).data
 
-    if base:
-        policies = _read_yaml_path(base / "policies.yml")
-        products = _read_yaml_path(base / "product_presets.yml")
-        presses_raw = _read_yaml_path(base / "press_capabilities.yml")
-    else:
-        # Fallback to packaged resources (requires files under prepress_helper/config in the wheel)
-        policies = _read_yaml_pkg("prepress_helper.config", "policies.yml")
-        products = _read_yaml_pkg("prepress_helper.config", "product_presets.yml")
-        presses_raw = _read_yaml_pkg("prepress_helper.config", "press_capabilities.yml")
 
-    # Normalize press capabilities into a single dict
-    presses: Dict[str, Any] = {}
-    if isinstance(presses_raw.get("presses"), dict):
-        presses.update(presses_raw["presses"])
-    for group in ("roll_printers", "sheetfed_presses", "digital_presses", "offset_presses"):
-        if isinstance(presses_raw.get(group), dict):
-            presses.update(presses_raw[group])
+def resolve_shop(js: JobSpec, cfg_dir: Optional[str] = "config") -> Dict[str, Any]:
+    """
+    The shop config a JobSpec was prepared with, for skills to read.
 
-    return {"policies": policies or {}, "products": products or {}, "presses": presses or {}}
+    Order: an inline `special["shop"]` (legacy / inline=True), the snapshot named by
+    `special["shop_version"]`, else the current config (unknown or expired version).
+    """
+    special = getattr(js, "special", None) or {}
+    if not isinstance(special, dict):
+        return current_shop_config(cfg_dir).data
+    inline = special.get("shop")
+    if isinstance(inline, dict):
+        return inline
+    snap = shop_config_by_version(special.get("shop_version"))
+    return snap.data if snap is not None else current_shop_config(cfg_dir).data
 
 
-def apply_shop_config(js: JobSpec, shop_cfg: Dict[str, Any]) -> JobSpec:
-    policies = shop_cfg.get("policies", {}) or {}
+def apply_shop_config(js: JobSpec, shop_cfg: Union[ShopConfig, Dict[str, Any]], *, inline: bool = False) -> JobSpec:
+    """
+    Enforce policy minimums on `js` and attach the config by reference:
+    `special["shop_version"]` names the snapshot (see resolve_shop). With inline=True
+    the whole config is also copied into `special["shop"]` for clients that read it there.
+    """
+    snap = register_shop_config(shop_cfg)
+    policies = snap.data.get("policies", {}) or {}
 
     # accept both naming styles: min_bleed_in / bleed_min_in ; min_safety_in / safety_min_in
     min_bleed = _num(policies.get("min_bleed_in", policies.get("bleed_min_in", 0.125)), 0.125)
@@ -152,6 +316,10 @@ def apply_shop_config(js: JobSpec, shop_cfg: Dict[str, Any]) -> JobSpec:
     js.safety_in = new_safety
 
     special["adjustments"] = adjustments
-    special["shop"] = shop_cfg
+    special["shop_version"] = snap.version
+    if inline:
+        special["shop"] = snap.data
+    else:
+        special.pop("shop", None)
     js.special = special
     return js
@@ -0,0 +1,217 @@
+# src/prepress_helper/fold_solver.py
+"""
+Panel widths and fold positions for common folds.
+
+Each style is a panel pattern: panel i is `weight[i] * unit - depth[i] * offset`, where
+`depth` is how many folds the panel sits inside (each nesting level is `offset` shorter
+so it clears the fold) and `unit` is solved so the panels add up to the flat length.
+
+    half                two equal panels (bifold)
+    roll (N)            outer, outer, inner, inner-2, ...  (fold-in panels step down)
+    z / accordion (N)   equal panels
+    gate                flap, center (2 units), flap; flaps fold in to meet
+    double_gate         flap, panel, panel, flap; flaps fold in, then in half
+    double_parallel     panel, panel, inner, inner; in half, then in half again
+    french              half fold along the length, then half across (right-angle)
+
+Panels are listed from the left edge with the fold-in side on the right; fold_in="left"
+mirrors them. The fold-in offset comes from the job (special.fold_in_offset_in), the
+shop's stock rules (config/stock_rules.yml, via stock_index), the stock caliper, else 1/16".
+
+`solve()` is memoized per (length, style, panels, fold_in, offset); `solve_many()` lays
+out a batch, grouping jobs by those inputs so each distinct layout is solved once and
+shared by every job in the group.
+"""
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from prepress_helper.config_loader import resolve_shop
+from prepress_helper.jobspec import JobSpec
+from prepress_helper.stock_index import resolve_stock
+
+DEFAULT_OFFSET_IN = 1.0 / 16.0
+CALIPER_FACTOR = 4.0  # fold-in allowance per nesting level ~ 4x sheet thickness
+OFFSET_STEP_IN = 1.0 / 64.0  # caliper-derived offsets are rounded up to this
+
+STYLE_ALIASES = {
+    "tri": "roll",
+    "letter": "roll",
+    "accordion": "z",
+    "zig-zag": "z",
+    "bifold": "half",
+    "bi fold": "half",
+    "bi-fold": "half",
+    "double gate": "double_gate",
+    "double-gate": "double_gate",
+    "double parallel": "double_parallel",
+    "double-parallel": "double_parallel",
+    "right angle": "french",
+}
+DEFAULT_PANELS = {"half": 2, "roll": 3, "z": 3, "gate": 3, "double_gate": 4, "double_parallel": 4, "french": 2}
+FIXED_PANELS = {"half", "gate", "double_gate", "double_parallel", "french"}
+LABELS = {
+    "half": "Half fold",
+    "gate": "Gate fold",
+    "double_gate": "Double-gate fold",
+    "double_parallel": "Double-parallel fold",
+    "french": "French fold",
+}
+
+
+@dataclass(frozen=True)
+class FoldLayout:
+    style: str
+    length: float  # flat size along the folding axis, inches
+    panels: Tuple[float, ...]  # panel widths from the left edge
+    positions: Tuple[float, ...]  # fold lines from the left edge
+    offset: float  # fold-in allowance per nesting level
+    cross_positions: Tuple[float, ...] = ()  # folds across the other axis (french), from the top edge
+
+    @property
+    def label(self) -> str:
+        if self.style in LABELS:
+            return LABELS[self.style]
+        n = len(self.panels)
+        if n == 3:
+            return f"Tri-fold ({self.style})"
+        if n == 2:
+            return "Half fold"
+        return f"{n}-panel {'roll' if self.style == 'roll' else 'accordion'} fold"
+
+
+def normalize_style(style: Optional[str]) -> str:
+    s = re.sub(r"[\s_]+", " ", (style or "roll").strip().lower())
+    if s not in STYLE_ALIASES:
+        s = re.sub(r"(?<=\w)[\s-]*fold(ed)?$", "", s)  # "half fold", "z-fold" -> "half", "z"
+    s = STYLE_ALIASES.get(s, s).replace(" ", "_")
+    if s not in DEFAULT_PANELS:
+        raise ValueError(f"Unknown fold style {style!r}; expected one of {sorted(DEFAULT_PANELS)}")
+    return s
+
+
+def _pattern(style: str, n: int) -> Tuple[List[float], List[int]]:
+    """(weights, depths) for `n` panels, fold-in side on the right."""
+    if style == "roll":
+        return [1.0] * n, [0, 0] + list(range(1, n - 1)) if n > 2 else [0] * n
+    if style == "gate":
+        return [1.0, 2.0, 1.0], [1, 0, 1]
+    if style == "double_gate":
+        return [1.0] * 4, [1, 0, 0, 1]
+    if style == "double_parallel":
+        return [1.0] * 4, [0, 0, 1, 1]
+    return [1.0] * n, [0] * n  # half / z / accordion / french
+
+
+@lru_cache(maxsize=4096)
+def solve(
+    length: float,
+    style: str = "roll",
+    panels: Optional[int] = None,
+    fold_in: str = "right",
+    offset: float = DEFAULT_OFFSET_IN,
+    cross_length: Optional[float] = None,
+) -> FoldLayout:
+    style = normalize_style(style)
+    n = DEFAULT_PANELS[style] if style in FIXED_PANELS or not panels else int(panels)
+    if n < 2:
+        raise ValueError(f"A {style} fold needs at least 2 panels, got {n}")
+    weights, depths = _pattern(style, n)
+    unit = (length + offset * sum(depths)) / sum(weights)
+    widths = [round(w * unit - d * offset, 4) for w, d in zip(weights, depths)]
+    if (fold_in or "right").lower() == "left":
+        widths.reverse()
+    positions = tuple(round(sum(widths[: i + 1]), 4) for i in range(len(widths) - 1))
+    cross = (round(cross_length / 2.0, 4),) if style == "french" and cross_length else ()
+    return FoldLayout(style, length, tuple(widths), positions, offset, cross)
+
+
+# ----------------------------
+# Offsets from the job / stock
+# ----------------------------
+
+
+def _caliper_in(js: JobSpec) -> Optional[float]:
+    special = js.special or {}
+    for key in ("caliper_in", "stock_caliper_in"):
+        if special.get(key):
+            try:
+                return float(special[key])
+            except (TypeError, ValueError):
+                pass
+    m = re.search(r"(\d+(?:\.\d+)?)\s*pt\b", (js.stock or "").lower())  # "14pt C2S" = 0.014"
+    return float(m.group(1)) / 1000.0 if m else None
+
+
+def fold_offset(js: JobSpec, shop: Optional[Dict[str, Any]] = None) -> float:
+    """Fold-in allowance: job override > shop stock rule > stock caliper > 1/16"."""
+    special = js.special or {}
+    if special.get("fold_in_offset_in") is not None:
+        try:
+            return float(special["fold_in_offset_in"])
+        except (TypeError, ValueError):
+            pass
+    shop = shop if shop is not None else resolve_shop(js)
+    match = resolve_stock(shop, js)
+    if match is not None and match.rule.fold_in_offset_in is not None:
+        return match.rule.fold_in_offset_in
+    caliper = _caliper_in(js) or (match.rule.caliper_in if match is not None else None)
+    if caliper:
+        raw = max(caliper * CALIPER_FACTOR, DEFAULT_OFFSET_IN)
+        return math.ceil(raw / OFFSET_STEP_IN - 1e-9) * OFFSET_STEP_IN
+    return DEFAULT_OFFSET_IN
+
+
+def layout_for(
+    js: JobSpec,
+    style: Optional[str] = None,
+    fold_in: str = "right",
+    panels: Optional[int] = None,
+    shop: Optional[Dict[str, Any]] = None,
+) -> FoldLayout:
+    """Fold along the long edge of the trim (11 x 8.5 if the job has none)."""
+    return solve(*_solve_args(js, style, fold_in, panels, shop))
+
+
+def _solve_args(
+    js: JobSpec, style: Optional[str], fold_in: str, panels: Optional[int], shop: Optional[Dict[str, Any]]
+) -> Tuple[float, str, Optional[int], str, float, float]:
+    w, h = (js.trim_size.w_in, js.trim_size.h_in) if js.trim_size else (11.0, 8.5)
+    special = js.special or {}
+    style = style or special.get("fold_style") or "roll"
+    panels = panels or special.get("fold_panels")
+    return (
+        float(max(w, h)),
+        normalize_style(style),
+        int(panels) if panels else None,
+        (fold_in or "right").lower(),
+        fold_offset(js, shop),
+        float(min(w, h)),
+    )
+
+
+def solve_many(
+    jobs: Iterable[JobSpec],
+    style: Optional[str] = None,
+    fold_in: str = "right",
+    shop: Optional[Dict[str, Any]] = None,
+) -> List[FoldLayout]:
+    """
+    Layouts for many jobs. Jobs are grouped by their solve() inputs (length, style, panels,
+    fold_in, offset); each group is solved once and its layout shared, whatever solve()'s
+    memo still holds.
+    """
+    style = normalize_style(style) if style else None
+    groups: Dict[Tuple[Any, ...], FoldLayout] = {}
+    out: List[FoldLayout] = []
+    for js in jobs:
+        args = _solve_args(js, style, fold_in, None, shop)
+        layout = groups.get(args)
+        if layout is None:
+            layout = groups[args] = solve(*args)
+        out.append(layout)
+    return out
@@ -0,0 +1,28 @@
+# src/prepress_helper/grommets.py
+"""
+Grommet spacing along a banner edge, shared by the wide-format skill (guide and hole
+scripts) and nesting (grommet counts per piece).
+
+Positions are an arithmetic progression (start, step, count), so callers expand them in
+closed form (start + i*step) without accumulated drift, and the JSX scripts loop over
+them instead of listing every position.
+"""
+from __future__ import annotations
+
+import math
+from typing import Tuple
+
+
+def grommet_progression(
+    length: float, margin: float, spacing: float, corners_only: bool = False
+) -> Tuple[float, float, int]:
+    """
+    Grommet positions along one edge as (start, step, count): start + i*step for i < count,
+    from `margin` up to `length - margin` inclusive (a single grommet if the edge is too short).
+    corners_only keeps just the two end positions.
+    """
+    end = max(margin, length - margin)
+    if corners_only or spacing <= 0:
+        span = end - margin
+        return margin, span, 2 if span > 1e-6 else 1
+    return margin, spacing, int(math.floor((end - margin) / spacing + 1e-6)) + 1
@@ -0,0 +1,214 @@
+# src/prepress_helper/imposition_solver.py
+"""
+Best N-up of a trim on a press sheet.
+
+A cell is the trim plus bleed on every side; cells are `gutter` apart inside the
+printable area (the ticket's PrintableX/Y, else the sheet minus grippers / margins).
+Candidates are every split of the area into a block of cells in one orientation and a
+block of rotated cells beside (or below) it, for both starting orientations:
+
+    k columns upright + j columns rotated, j = floor((W + g - k*(cw+g)) / (ch+g))
+
+All k are scored at once (NumPy when installed, else a plain loop) and the largest
+count wins; ties prefer a single orientation. `best_nup()` is memoized per
+(cell, area, gutter), so a day's batch of mostly repeating products costs one search
+per distinct size; `plan_many()` reports on a list of jobs and `cell_positions()` lays
+the cells out for a placement file.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from prepress_helper.config_loader import resolve_shop
+from prepress_helper.jobspec import JobSpec
+
+try:  # optional: vectorizes the candidate search
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is not a dependency
+    np = None
+
+DEFAULT_SHEET_IN = (13.0, 19.0)
+DEFAULT_GRIPPER_IN = 0.375
+DEFAULT_MARGIN_IN = 0.125
+_EPS = 1e-9
+
+
+@dataclass(frozen=True)
+class NUpLayout:
+    n: int
+    across: int  # main block, cells as given
+    down: int
+    rot_across: int  # block of cells rotated 90 degrees
+    rot_down: int
+    cell_w: float
+    cell_h: float
+    split: str = "cols"  # rotated block beside the main one (cols) or below it (rows)
+
+    @property
+    def label(self) -> str:
+        main = f"{self.across}x{self.down}" if self.across and self.down else ""
+        rot = f"{self.rot_across}x{self.rot_down} rotated" if self.rot_across and self.rot_down else ""
+        return " + ".join(p for p in (main, rot) if p) or "0"
+
+
+def _fit(length: float, cell: float, gutter: float) -> int:
+    return max(int(math.floor((length + gutter) / (cell + gutter) + _EPS)), 0) if cell > 0 else 0
+
+
+def _split(cw: float, ch: float, W: float, H: float, g: float) -> Tuple[int, int, int]:
+    """Best (count, k, j): k upright columns of cw x ch, then j rotated columns (ch x cw)."""
+    down_up, down_rot = _fit(H, ch, g), _fit(H, cw, g)
+    kmax = _fit(W, cw, g)
+    if np is not None:
+        k = np.arange(kmax + 1)
+        j = np.maximum(np.floor((W + g - k * (cw + g)) / (ch + g) + _EPS), 0).astype(int)
+        counts = k * down_up + j * down_rot
+        i = int(np.argmax(counts))
+        return int(counts[i]), int(k[i]), int(j[i])
+    best = (-1, 0, 0)
+    for k in range(kmax + 1):
+        j = max(int(math.floor((W + g - k * (cw + g)) / (ch + g) + _EPS)), 0)
+        count = k * down_up + j * down_rot
+        if count > best[0]:
+            best = (count, k, j)
+    return best
+
+
+@lru_cache(maxsize=8192)
+def best_nup(cell_w: float, cell_h: float, area_w: float, area_h: float, gutter: float = 0.0) -> NUpLayout:
+    """Most cells of cell_w x cell_h in area_w x area_h, mixing orientations if that fits more."""
+    cands: List[NUpLayout] = []
+    for cw, ch, rotated in ((cell_w, cell_h, False), (cell_h, cell_w, True)):
+        # column split: k columns of (cw x ch), j columns of (ch x cw)
+        n, k, j = _split(cw, ch, area_w, area_h, gutter)
+        down, rdown = _fit(area_h, ch, gutter), _fit(area_h, cw, gutter)
+        cands.append(_layout(n, (k, down), (j, rdown), rotated, cell_w, cell_h, "cols"))
+        # row split: same search with the axes swapped
+        n, k, j = _split(ch, cw, area_h, area_w, gutter)
+        across, racross = _fit(area_w, cw, gutter), _fit(area_w, ch, gutter)
+        cands.append(_layout(n, (across, k), (racross, j), rotated, cell_w, cell_h, "rows"))
+    # most cells, then a single orientation, then cells as given
+    return min(cands, key=lambda lay: (-lay.n, bool(lay.across and lay.rot_across), lay.across == 0))
+
+
+def _layout(n, main, rot, rotated, cell_w, cell_h, split) -> NUpLayout:
+    main = main if main[0] and main[1] else (0, 0)
+    rot = rot if rot[0] and rot[1] else (0, 0)
+    if rotated:  # the "upright" block was the rotated cell; report relative to the given cell
+        main, rot = rot, main
+    return NUpLayout(n, main[0], main[1], rot[0], rot[1], cell_w, cell_h, split)
+
+
+def cell_positions(layout: NUpLayout, gutter: float = 0.0) -> List[Tuple[float, float, bool]]:
+    """(x, y, rotated) of every cell from the printable area's corner, row by row per block."""
+    cw, ch, g = layout.cell_w, layout.cell_h, gutter
+    out = [(a * (cw + g), d * (ch + g), False) for d in range(layout.down) for a in range(layout.across)]
+    if layout.split == "cols":
+        ox, oy = layout.across * (cw + g), 0.0
+    else:
+        ox, oy = 0.0, layout.down * (ch + g)
+    out += [
+        (ox + a * (ch + g), oy + d * (cw + g), True) for d in range(layout.rot_down) for a in range(layout.rot_across)
+    ]
+    return out
+
+
+# ----------------------------
+# Jobs
+# ----------------------------
+
+
+@dataclass(frozen=True)
+class ImpositionPlan:
+    layout: NUpLayout
+    sheet: Tuple[float, float]
+    area: Tuple[float, float]
+    trim: Tuple[float, float]
+    gutter: float
+    ticket_n: Optional[int] = None
+    ticket_label: Optional[str] = None
+    sheets_required: Optional[int] = None
+    overhead_sheets: Optional[int] = None  # make-ready + spoils
+    total_sheets: Optional[int] = None
+
+    @property
+    def waste(self) -> float:
+        """Fraction of the sheet that is not finished product."""
+        used = self.layout.n * self.trim[0] * self.trim[1]
+        return max(0.0, 1.0 - used / (self.sheet[0] * self.sheet[1]))
+
+    @property
+    def sheets_at_best(self) -> Optional[int]:
+        if not (self.sheets_required and self.ticket_n and self.layout.n):
+            return None
+        return math.ceil(self.sheets_required * self.ticket_n / self.layout.n)
+
+
+def _num(v: Any) -> Optional[float]:
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return None
+    return f if math.isfinite(f) else None
+
+
+def _int(v: Any) -> Optional[int]:
+    f = _num(v)
+    return int(f) if f is not None and f > 0 else None
+
+
+def plan_for(js: JobSpec, shop: Optional[Mapping[str, Any]] = None) -> Optional[ImpositionPlan]:
+    """
+    N-up plan for a job on its press sheet (special.press_sheet from the ticket, else the
+    shop's policies.imposition.default_sheet_in). None without a trim size.
+    """
+    if not js.trim_size:
+        return None
+    special = js.special or {}
+    ps: Dict[str, Any] = special.get("press_sheet") or {}
+    shop = shop if shop is not None else resolve_shop(js)
+    pol = (shop.get("policies") or {}).get("imposition") or {}
+
+    default_sheet = pol.get("default_sheet_in") or DEFAULT_SHEET_IN
+    sheet_w = _num(ps.get("sheet_w")) or float(default_sheet[0])
+    sheet_h = _num(ps.get("sheet_h")) or float(default_sheet[1])
+    if ps.get("printable_w") and ps.get("printable_h"):
+        area_w, area_h = float(ps["printable_w"]), float(ps["printable_h"])
+    elif any(k in ps for k in ("grip_left", "grip_right", "grip_top", "grip_bottom")):
+        area_w = sheet_w - (_num(ps.get("grip_left")) or 0.0) - (_num(ps.get("grip_right")) or 0.0)
+        area_h = sheet_h - (_num(ps.get("grip_top")) or 0.0) - (_num(ps.get("grip_bottom")) or 0.0)
+    else:
+        margin = _num(pol.get("margin_in")) or DEFAULT_MARGIN_IN
+        gripper = _num(pol.get("gripper_in")) or DEFAULT_GRIPPER_IN
+        area_w, area_h = sheet_w - 2 * margin, sheet_h - gripper - margin
+
+    bleed = js.bleed_in or 0.0
+    trim_w, trim_h = float(js.trim_size.w_in), float(js.trim_size.h_in)
+    gutter = _num(special.get("gutter_in"))
+    if gutter is None:
+        gutter = _num(ps.get("gap_x")) or _num(pol.get("gutter_in")) or 0.0
+    layout = best_nup(round(trim_w + 2 * bleed, 4), round(trim_h + 2 * bleed, 4), area_w, area_h, gutter)
+
+    ax, ay = _int(ps.get("across_x")), _int(ps.get("across_y"))
+    ticket_n = _int(ps.get("number_up")) or (ax * ay if ax and ay else None)
+    overhead = (_int(ps.get("mr_sheets")) or 0) + (_int(ps.get("spoils")) or 0)
+    return ImpositionPlan(
+        layout=layout,
+        sheet=(sheet_w, sheet_h),
+        area=(area_w, area_h),
+        trim=(trim_w, trim_h),
+        gutter=gutter,
+        ticket_n=ticket_n,
+        ticket_label=f"{ax}x{ay}" if ax and ay else None,
+        sheets_required=_int(ps.get("sheets_required")),
+        overhead_sheets=overhead or None,
+        total_sheets=_int(ps.get("total_sheets")),
+    )
+
+
+def plan_many(jobs: Iterable[JobSpec], shop: Optional[Mapping[str, Any]] = None) -> List[Optional[ImpositionPlan]]:
+    """Plans for a batch; repeated (cell, area, gutter) combinations are searched once."""
+    return [plan_for(js, shop) for js in jobs]
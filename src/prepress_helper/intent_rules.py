@@ -0,0 +1,179 @@
+# src/prepress_helper/intent_rules.py
+"""
+Declarative keyword intents (config/intent_rules.yml) compiled into one matcher.
+
+All keywords that scan a field are merged into a single trie-shaped regex, so one pass
+over the text finds every keyword (overlaps included: the pattern is a lookahead tried
+at each position and each match also credits the shorter keywords it contains). Cost per
+position depends on keyword length, not on how many keywords or rules there are.
+
+The compiled matcher is cached per rule file and rebuilt when the file changes; its
+`version` is a hash of the rule file, and per-field scans are memoized on the matcher.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+import yaml
+
+from prepress_helper.config_loader import _resolve_cfg_dir
+
+FIELDS = ("message", "product", "stock", "machine")
+RULES_FILE = "intent_rules.yml"
+
+
+@dataclass(frozen=True)
+class IntentRule:
+    name: str
+    intent: Optional[str]
+    fields: Tuple[str, ...]
+    keywords: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class IntentMatch:
+    intents: Tuple[str, ...]
+    hits: Mapping[str, FrozenSet[str]]  # rule name -> keywords found
+
+    def hit(self, rule: str) -> bool:
+        return bool(self.hits.get(rule))
+
+
+def _trie_pattern(words: List[str]) -> str:
+    trie: Dict[str, Any] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body  # greedy: longest keyword first
+
+    return build(trie)
+
+
+class _FieldScanner:
+    def __init__(self, rules: List[IntentRule], field: str) -> None:
+        owners: Dict[str, List[str]] = {}
+        for r in rules:
+            if field in r.fields:
+                for kw in r.keywords:
+                    owners.setdefault(kw, []).append(r.name)
+        # a match of "white spot" also means "spot" occurred
+        self.credits: Dict[str, Tuple[Tuple[str, str], ...]] = {
+            kw: tuple((rule, sub) for sub, names in owners.items() if sub in kw for rule in names) for kw in owners
+        }
+        self.regex = re.compile(f"(?=({_trie_pattern(list(owners))}))") if owners else None
+
+    def scan(self, text: str) -> Dict[str, FrozenSet[str]]:
+        if self.regex is None or not text:
+            return {}
+        found: Dict[str, set] = {}
+        for kw in {m.group(1) for m in self.regex.finditer(text)}:
+            for rule, sub in self.credits[kw]:
+                found.setdefault(rule, set()).add(sub)
+        return {rule: frozenset(kws) for rule, kws in found.items()}
+
+
+class IntentMatcher:
+    def __init__(self, rules: List[IntentRule], version: str = "") -> None:
+        self.rules = tuple(rules)
+        self.version = version
+        self.intent_order = tuple(dict.fromkeys(r.intent for r in rules if r.intent))
+        self._intent_of = {r.name: r.intent for r in rules}
+        self._scanners = {f: _FieldScanner(rules, f) for f in FIELDS}
+        self.scan_field = lru_cache(maxsize=1024)(self._scan_field)
+
+    def _scan_field(self, field: str, text: str) -> Mapping[str, FrozenSet[str]]:
+        return self._scanners[field].scan(text.strip().lower())
+
+    def match(self, **fields: Optional[str]) -> IntentMatch:
+        """Scan each given field once; unknown field names are an error."""
+        hits: Dict[str, FrozenSet[str]] = {}
+        for field, text in fields.items():
+            if field not in self._scanners:
+                raise ValueError(f"Unknown intent field {field!r}; expected one of {FIELDS}")
+            for rule, kws in self.scan_field(field, text or "").items():
+                hits[rule] = hits.get(rule, frozenset()) | kws
+        fired = {self._intent_of[r] for r in hits if self._intent_of[r]}
+        return IntentMatch(intents=tuple(i for i in self.intent_order if i in fired), hits=hits)
+
+
+def _as_list(v: Any) -> List[str]:
+    if isinstance(v, str):
+        return [v]
+    return [str(x) for x in v] if isinstance(v, (list, tuple)) else []
+
+
+def compile_rules(doc: Any, source: str = "<rules>", version: str = "") -> IntentMatcher:
+    if not isinstance(doc, dict) or not isinstance(doc.get("rules", {}), dict):
+        raise ValueError(f"Intent rules {source} must be {{rules: {{name: {{intent, fields, keywords}}}}}}")
+    errors: List[str] = []
+    rules: List[IntentRule] = []
+    for name, spec in (doc.get("rules") or {}).items():
+        if not isinstance(spec, dict):
+            errors.append(f"{name}: must be a mapping")
+            continue
+        fields = tuple(_as_list(spec.get("fields", ["message"])))
+        keywords = tuple(dict.fromkeys(k.strip().lower() for k in _as_list(spec.get("keywords")) if k.strip()))
+        bad = [f for f in fields if f not in FIELDS]
+        if bad:
+            errors.append(f"{name}: unknown field(s) {bad}; expected {list(FIELDS)}")
+        if not keywords:
+            errors.append(f"{name}: no keywords")
+        rules.append(IntentRule(str(name), spec.get("intent") or None, fields, keywords))
+    if errors:
+        raise ValueError(f"Invalid intent rules in {source}:\n  " + "\n  ".join(errors))
+    return IntentMatcher(rules, version=version)
+
+
+_MATCHER_CACHE: Dict[str, Tuple[Tuple[int, int], IntentMatcher]] = {}
+_MATCHER_LOCK = threading.Lock()
+_DEFAULT_PATH: Optional[str] = None
+_EMPTY = IntentMatcher([], version="empty")
+
+
+def default_rules_path() -> Optional[str]:
+    global _DEFAULT_PATH
+    if _DEFAULT_PATH is None:
+        base = _resolve_cfg_dir("config")
+        path = Path(base) / RULES_FILE if base is not None else None
+        _DEFAULT_PATH = str(path) if path is not None and path.is_file() else ""
+    return _DEFAULT_PATH or None
+
+
+def load_intent_rules(path: Optional[str] = None) -> IntentMatcher:
+    """
+    Compiled matcher for a rules file (default: config/intent_rules.yml), reused until the
+    file changes. No rules file means no keyword intents.
+    """
+    path = path or default_rules_path()
+    if not path:
+        return _EMPTY
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+
+    cached = _MATCHER_CACHE.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    matcher = compile_rules(yaml.safe_load(raw) or {}, source=path, version=hashlib.sha1(raw).hexdigest()[:12])
+
+    with _MATCHER_LOCK:
+        _MATCHER_CACHE[path] = (stamp, matcher)
+    return matcher
@@ -0,0 +1,390 @@
+# src/prepress_helper/mapping_plan.py
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import yaml
+from lxml import etree as ET
+
+# A location path reduced to (axis, name) steps: "//Printing//Machine" -> (("//", "Printing"), ("//", "Machine"))
+PathSteps = Tuple[Tuple[str, str], ...]
+
+
+@dataclass(frozen=True)
+class StreamRule:
+    """
+    Streamable shape of a mapping expression: `func(first node of union)`.
+    `func` is "string", "number" or "normalize" (normalize-space(string(...))).
+    """
+
+    func: str
+    paths: Tuple[PathSteps, ...]
+
+
+@dataclass(frozen=True)
+class MappingRule:
+    """One `target: xpath` entry, compiled once."""
+
+    target: str
+    parts: Tuple[str, ...]  # dotted target already split, e.g. ("special", "machine")
+    expr: str
+    xpath: ET.XPath
+    stream: Optional[StreamRule] = None  # None when the expression needs a full tree
+
+
+def _evaluate(rules: Tuple[MappingRule, ...], node: Any) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for rule in rules:
+        try:
+            raw = rule.xpath(node)
+        except ET.XPathEvalError:
+            continue
+        out[rule.target] = _first_value(raw)
+    return out
+
+
+@dataclass(frozen=True)
+class SectionPlan:
+    """
+    The optional `sections:` block: an XPath selecting one element per job component
+    (cover, text, ...) and rules evaluated relative to each of those elements.
+    Targets under `section.` label the component; the rest override job-level fields.
+    """
+
+    expr: str
+    xpath: ET.XPath
+    rules: Tuple[MappingRule, ...]
+
+    def evaluate(self, section: Any) -> Dict[str, Any]:
+        return _evaluate(self.rules, section)
+
+
+@dataclass(frozen=True)
+class RecordPlan:
+    """
+    The optional `operations:` block: one record per element selected by `xpath`, with
+    rules relative to that element (Machine, EstMRTimeHHMM, ...). Records are resolved in
+    the job's own parse pass, tree or stream; `paths` is the streaming form of the selector.
+    """
+
+    expr: str
+    xpath: ET.XPath
+    rules: Tuple[MappingRule, ...]
+    paths: Optional[Tuple[PathSteps, ...]] = None  # None when the selector needs a full tree
+
+    @property
+    def streamable(self) -> bool:
+        return self.paths is not None and all(rule.stream is not None for rule in self.rules)
+
+    def evaluate(self, node: Any) -> List[Dict[str, Any]]:
+        """Raw values per record, in document order; `element` is the record's local name."""
+        try:
+            found = self.xpath(node)
+        except ET.XPathEvalError:
+            return []
+        els = [el for el in found if isinstance(el, ET._Element)] if isinstance(found, list) else []
+        return [{"element": ET.QName(el).localname, **_evaluate(self.rules, el)} for el in els]
+
+
+@dataclass(frozen=True)
+class Dialect:
+    """
+    A known XML producer, recognised from the root tag and its first child elements
+    (local names). Matching documents use `mapping` instead of the generic plan.
+    """
+
+    name: str
+    root: str
+    children: Tuple[str, ...]
+    mapping: str  # path to the dialect's own mapping YAML
+
+    def matches(self, root: str, children: Sequence[str]) -> bool:
+        return root == self.root and tuple(children[: len(self.children)]) == self.children
+
+
+@dataclass(frozen=True)
+class MappingPlan:
+    """
+    Compiled form of an xml_map.yml file.
+
+    Build it with `load_mapping_plan(path)` (cached by path + mtime) or
+    `compile_mapping(dict)` for ad-hoc mappings.
+    """
+
+    source: str
+    digest: str  # sha1 of the mapping content; changes whenever the YAML does
+    rules: Tuple[MappingRule, ...]
+    sections: Optional[SectionPlan] = None
+    dialects: Tuple[Dialect, ...] = ()
+    operations: Optional[RecordPlan] = None
+
+    @property
+    def streamable(self) -> bool:
+        """True when every rule (and every dialect plan) can be resolved in a single forward pass."""
+        if not all(rule.stream is not None for rule in self.rules):
+            return False
+        if self.operations is not None and not self.operations.streamable:
+            return False
+        return all(load_mapping_plan(d.mapping).streamable for d in self.dialects)
+
+    def compile_all(self) -> Tuple["MappingPlan", ...]:
+        """This plan and every dialect plan it may select, loading and compiling them now."""
+        return (self, *(load_mapping_plan(d.mapping) for d in self.dialects))
+
+    @property
+    def signature_depth(self) -> int:
+        """How many leading child elements of the root the dialect signatures look at."""
+        return max((len(d.children) for d in self.dialects), default=0)
+
+    def select(self, root: str, children: Sequence[str]) -> "MappingPlan":
+        """The plan to use for a document with this root/first-children signature."""
+        for d in self.dialects:
+            if d.matches(root, children):
+                return load_mapping_plan(d.mapping)
+        return self
+
+    def fingerprint(self) -> str:
+        """Digest covering this plan and every dialect plan it may select (for cache keys)."""
+        if not self.dialects:
+            return self.digest
+        h = hashlib.sha1(self.digest.encode("ascii"))
+        for d in self.dialects:
+            h.update(load_mapping_plan(d.mapping).digest.encode("ascii"))
+        return h.hexdigest()
+
+    def evaluate(self, node: Any) -> Dict[str, Any]:
+        """
+        Run every rule against a tree/element and return the raw values keyed by target.
+        Rules that fail at evaluation time are left out (same as an unmapped field).
+        Operation records, when mapped, come back as a list under `operations`.
+        """
+        out = _evaluate(self.rules, node)
+        if self.operations is not None:
+            out["operations"] = self.operations.evaluate(node)
+        return out
+
+
+def _first_value(raw: Any) -> Any:
+    """First non-empty value from an XPath result (node-sets yield their first non-blank item)."""
+    if isinstance(raw, list):
+        for v in raw:
+            if isinstance(v, ET._Element):
+                t = "".join(v.itertext()).strip()
+                if t != "":
+                    return t
+            elif isinstance(v, bytes):
+                t = v.decode("utf-8", "ignore").strip()
+                if t != "":
+                    return t
+            elif isinstance(v, str):
+                t = v.strip()
+                if t != "":
+                    return t
+            elif isinstance(v, (int, float, bool)):
+                return v
+        return None
+    if isinstance(raw, (int, float, bool, str)):
+        return raw
+    return None
+
+
+# ----------------------------
+# Streamable expression analysis
+# ----------------------------
+
+_NAME = r"[A-Za-z_][\w.\-]*"
+_RE_PATH = re.compile(rf"^(?:(?://|/){_NAME})+$")
+_RE_STEP = re.compile(rf"(//|/)({_NAME})")
+_RE_FUNC = re.compile(r"^(string|number|normalize-space)\((.*)\)$", re.S)
+
+
+def _parse_union(arg: str, relative: bool = False) -> Optional[Tuple[PathSteps, ...]]:
+    """
+    '(//A | //B)[1]', '(//A | //B)', '//A | //B' or '//A//B' -> tuple of step tuples.
+    relative=True also takes 'A/B' (child steps from a record element, read as '/A/B').
+    """
+    s = arg.strip()
+    if s.endswith("[1]"):
+        s = s[:-3].rstrip()
+        if not (s.startswith("(") and s.endswith(")")):
+            return None
+    if s.startswith("(") and s.endswith(")"):
+        s = s[1:-1]
+    paths = []
+    for part in s.split("|"):
+        p = re.sub(r"\s+", "", part)
+        if relative and not p.startswith("/"):
+            p = "/" + p
+        if not _RE_PATH.match(p):
+            return None
+        paths.append(tuple((axis, name) for axis, name in _RE_STEP.findall(p)))
+    return tuple(paths) if paths else None
+
+
+def analyze_stream_expr(expr: str, relative: bool = False) -> Optional[StreamRule]:
+    """
+    Return a StreamRule when `expr` is one of the shapes used by xml_map.yml:
+      string(U), number(U), normalize-space(string(U)), normalize-space(U)
+    where U is a union of plain '/'- or '//'-step paths, optionally wrapped as '(U)[1]'.
+    Anything else (predicates, functions inside paths, axes) returns None.
+    """
+    m = _RE_FUNC.match(expr.strip())
+    if not m:
+        return None
+    func, arg = m.group(1), m.group(2)
+    if func == "normalize-space":
+        inner = _RE_FUNC.match(arg.strip())
+        if inner:
+            if inner.group(1) != "string":
+                return None
+            arg = inner.group(2)
+        func = "normalize"
+    paths = _parse_union(arg, relative)
+    if paths is None:
+        return None
+    return StreamRule(func=func, paths=paths)
+
+
+def _is_rule_dict(mapping: Any) -> bool:
+    return isinstance(mapping, dict) and all(isinstance(k, str) and isinstance(v, str) for k, v in mapping.items())
+
+
+def _compile_rules(
+    mapping: Dict[str, str], errors: List[str], prefix: str = "", relative: bool = False
+) -> Tuple[MappingRule, ...]:
+    rules = []
+    for target, expr in mapping.items():
+        if not expr:
+            continue
+        try:
+            compiled = ET.XPath(expr)
+        except ET.XPathSyntaxError as e:
+            errors.append(f"{prefix}{target}: {expr!r} ({e})")
+            continue
+        rules.append(
+            MappingRule(
+                target=target,
+                parts=tuple(target.split(".")),
+                expr=expr,
+                xpath=compiled,
+                stream=analyze_stream_expr(expr, relative),
+            )
+        )
+    return tuple(rules)
+
+
+def _compile_sections(block: Any, source: str, errors: List[str]) -> Optional[SectionPlan]:
+    if not isinstance(block, dict) or not isinstance(block.get("xpath"), str) or not _is_rule_dict(block.get("fields")):
+        raise ValueError(f"'sections' in mapping {source} must be {{xpath: str, fields: {{target: xpath}}}}")
+    rules = _compile_rules(block["fields"], errors, prefix="sections.fields.")
+    try:
+        compiled = ET.XPath(block["xpath"])
+    except ET.XPathSyntaxError as e:
+        errors.append(f"sections.xpath: {block['xpath']!r} ({e})")
+        return None
+    return SectionPlan(expr=block["xpath"], xpath=compiled, rules=rules)
+
+
+def _compile_records(block: Any, source: str, errors: List[str]) -> Optional[RecordPlan]:
+    if not isinstance(block, dict) or not isinstance(block.get("xpath"), str) or not _is_rule_dict(block.get("fields")):
+        raise ValueError(f"'operations' in mapping {source} must be {{xpath: str, fields: {{target: xpath}}}}")
+    rules = _compile_rules(block["fields"], errors, prefix="operations.fields.", relative=True)
+    try:
+        compiled = ET.XPath(block["xpath"])
+    except ET.XPathSyntaxError as e:
+        errors.append(f"operations.xpath: {block['xpath']!r} ({e})")
+        return None
+    return RecordPlan(expr=block["xpath"], xpath=compiled, rules=rules, paths=_parse_union(block["xpath"]))
+
+
+def _compile_dialects(block: Any, source: str) -> Tuple[Dialect, ...]:
+    """`dialects: {name: {match: {root, children}, mapping}}`; mapping paths are relative to `source`."""
+    if not isinstance(block, dict):
+        raise ValueError(f"'dialects' in mapping {source} must be a dict of name -> {{match, mapping}}")
+    base = os.path.dirname(os.path.abspath(source)) if source != "<inline>" else os.getcwd()
+    out = []
+    for name, spec in block.items():
+        match = spec.get("match") if isinstance(spec, dict) else None
+        if not isinstance(match, dict) or not isinstance(match.get("root"), str) or not spec.get("mapping"):
+            raise ValueError(f"Dialect {name!r} in mapping {source} needs match.root and mapping")
+        out.append(
+            Dialect(
+                name=str(name),
+                root=match["root"],
+                children=tuple(str(c) for c in match.get("children") or ()),
+                mapping=os.path.join(base, spec["mapping"]),
+            )
+        )
+    return tuple(out)
+
+
+def compile_mapping(mapping: Any, source: str = "<inline>") -> MappingPlan:
+    """
+    Compile a `{target: xpath}` dict into a MappingPlan.
+    Reserved keys: `sections:` holds a {xpath, fields} block (see SectionPlan),
+    `operations:` a {xpath, fields} block of repeated records (see RecordPlan),
+    `dialects:` lists producer-specific mappings (see Dialect).
+    All invalid expressions are reported together in a single ValueError.
+    """
+    fields = dict(mapping) if isinstance(mapping, dict) else mapping
+    sections_block = fields.pop("sections", None) if isinstance(fields, dict) else None
+    dialects_block = fields.pop("dialects", None) if isinstance(fields, dict) else None
+    operations_block = fields.pop("operations", None) if isinstance(fields, dict) else None
+    if not _is_rule_dict(fields):
+        raise ValueError(f"Mapping YAML must be a dict of 'target: xpath'. Got: {type(mapping).__name__}")
+
+    errors: List[str] = []
+    rules = _compile_rules(fields, errors)
+    sections = _compile_sections(sections_block, source, errors) if sections_block is not None else None
+    operations = _compile_records(operations_block, source, errors) if operations_block is not None else None
+
+    if errors:
+        raise ValueError(f"Invalid XPath in mapping {source}:\n  " + "\n  ".join(errors))
+
+    dialects = _compile_dialects(dialects_block, source) if dialects_block is not None else ()
+
+    canon = yaml.safe_dump(mapping, sort_keys=True, allow_unicode=True)
+    digest = hashlib.sha1(canon.encode("utf-8")).hexdigest()
+    return MappingPlan(
+        source=source, digest=digest, rules=rules, sections=sections, dialects=dialects, operations=operations
+    )
+
+
+# ----------------------------
+# Plan cache (path + mtime)
+# ----------------------------
+
+_PLAN_CACHE: Dict[str, Tuple[Tuple[int, int], MappingPlan]] = {}
+_PLAN_LOCK = threading.Lock()
+
+
+def load_mapping_plan(map_yaml_path: str) -> MappingPlan:
+    """
+    Load and compile a mapping YAML, reusing the compiled plan until the file changes.
+    Safe to call per job: the cost on a cache hit is one stat().
+    """
+    path = os.path.abspath(map_yaml_path)
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+
+    cached = _PLAN_CACHE.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        mapping = yaml.safe_load(f) or {}
+    plan = compile_mapping(mapping, source=map_yaml_path)
+
+    with _PLAN_LOCK:
+        _PLAN_CACHE[path] = (stamp, plan)
+    return plan
+
+
+def clear_plan_cache() -> None:
+    with _PLAN_LOCK:
+        _PLAN_CACHE.clear()
@@ -0,0 +1,436 @@
+# src/prepress_helper/nesting.py
+"""
+Gang nesting of wide-format jobs onto a roll or a flatbed bed.
+
+Each job becomes `quantity` pieces (special.quantity, default 1). A piece's footprint
+is the trim plus bleed plus the preset's hems (finishing.hems: all_sides or per side);
+grommet margin / spacing give the per-piece grommet count for finishing. Pieces are
+`gap` apart and `edge` in from the media edges (policies.nesting, per-press overrides
+`nest_gap_in` / `nest_edge_in` in press_capabilities.yml).
+
+Two packers, both with 90-degree rotation (special.nest_rotate: false pins a piece):
+
+    skyline      bottom-left over a skyline of segments; dense, free-form cuts
+    guillotine   free rectangles split edge to edge; every piece comes off with
+                 straight through cuts (rotary trimmer / shear)
+
+`nest()` runs each packer over a few orderings (tallest, widest, largest first) and
+keeps the layout with the least media. Gaps are handled by inflating pieces and the
+area by `gap`, so the packers only ever test rectangles against rectangles. A roll is
+one bin of unbounded length; a flatbed opens a new bed when nothing fits.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from prepress_helper.config_loader import resolve_shop
+from prepress_helper.grommets import grommet_progression
+from prepress_helper.jobspec import JobSpec
+from prepress_helper.press_index import resolve_press
+
+DEFAULT_GAP_IN = 0.25
+DEFAULT_EDGE_IN = 0.5
+METHODS = ("skyline", "guillotine")
+ILLUSTRATOR_MAX_IN = 227.0  # canvas limit; longer layouts are drawn at 1/10 scale
+_EPS = 1e-6
+
+
+@dataclass(frozen=True)
+class Bed:
+    key: str
+    kind: str  # roll | flatbed
+    width: float
+    depth: Optional[float] = None  # None: roll, unbounded length
+    gap: float = DEFAULT_GAP_IN
+    edge: float = DEFAULT_EDGE_IN
+
+    @property
+    def usable(self) -> Tuple[float, Optional[float]]:
+        depth = self.depth - 2 * self.edge if self.depth else None
+        return self.width - 2 * self.edge, depth
+
+
+@dataclass(frozen=True)
+class Piece:
+    id: str
+    w: float  # footprint: trim + bleed + hems
+    h: float
+    trim: Tuple[float, float] = (0.0, 0.0)
+    grommets: int = 0
+    rotate: bool = True
+
+    @property
+    def area(self) -> float:
+        return self.w * self.h
+
+
+@dataclass(frozen=True)
+class Placement:
+    piece: Piece
+    bed: int  # 0-based bed (flatbed) index; always 0 on a roll
+    x: float  # footprint corner from the media's left edge, inches
+    y: float  # ... and from its lead edge
+    w: float  # footprint as placed
+    h: float
+    rotated: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.piece.id,
+            "bed": self.bed,
+            "x_in": round(self.x, 4),
+            "y_in": round(self.y, 4),
+            "w_in": round(self.w, 4),
+            "h_in": round(self.h, 4),
+            "rotated": self.rotated,
+            "trim_in": list(self.piece.trim),
+            "grommets": self.piece.grommets,
+        }
+
+
+@dataclass(frozen=True)
+class NestLayout:
+    bed: Bed
+    method: str
+    placements: Tuple[Placement, ...]
+    lengths: Tuple[float, ...]  # media used per bed along the feed, edges included
+    unplaced: Tuple[Piece, ...] = ()
+    order: str = field(default="", compare=False)
+
+    @property
+    def beds(self) -> int:
+        return len(self.lengths)
+
+    @property
+    def media_length(self) -> float:
+        return sum(self.lengths)
+
+    @property
+    def media_area(self) -> float:
+        return self.bed.width * self.media_length
+
+    @property
+    def used_area(self) -> float:
+        return sum(p.piece.area for p in self.placements)
+
+    @property
+    def waste(self) -> float:
+        """Fraction of the media consumed that is not piece footprint."""
+        return max(0.0, 1.0 - self.used_area / self.media_area) if self.media_area else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "press": self.bed.key,
+            "kind": self.bed.kind,
+            "method": self.method,
+            "media_width_in": self.bed.width,
+            "bed_depth_in": self.bed.depth,
+            "gap_in": self.bed.gap,
+            "edge_in": self.bed.edge,
+            "beds": self.beds,
+            "lengths_in": [round(x, 4) for x in self.lengths],
+            "media_length_in": round(self.media_length, 4),
+            "media_area_sqft": round(self.media_area / 144.0, 3),
+            "used_area_sqft": round(self.used_area / 144.0, 3),
+            "waste": round(self.waste, 4),
+            "pieces": len(self.placements),
+            "grommets": sum(p.piece.grommets for p in self.placements),
+            "placements": [p.to_dict() for p in self.placements],
+            "unplaced": [p.id for p in self.unplaced],
+        }
+
+
+# ----------------------------
+# Packers (inflated sizes; x/y from the usable area's corner)
+# ----------------------------
+
+
+class _Skyline:
+    """Bottom-left skyline over [0, width); segments are [x, y, w]."""
+
+    def __init__(self, width: float, depth: Optional[float]) -> None:
+        self.width, self.depth = width, depth
+        self.segs: List[List[float]] = [[0.0, 0.0, width]]
+        self.top = 0.0
+
+    def find(self, w: float, h: float) -> Optional[Tuple[float, float, float, int]]:
+        """(top, x, y, segment index) of the lowest-then-leftmost spot for w x h, or None."""
+        best = None
+        segs = self.segs
+        for i, (x, _, _) in enumerate(segs):
+            if x + w > self.width + _EPS:
+                break
+            y, j, reach = 0.0, i, x + w
+            while reach > segs[j][0] + _EPS:
+                y = max(y, segs[j][1])
+                j += 1
+                if j == len(segs):
+                    break
+            if self.depth is not None and y + h > self.depth + _EPS:
+                continue
+            if best is None or (y + h, x) < (best[0], best[1]):
+                best = (y + h, x, y, i)
+        return best
+
+    def place(self, x: float, y: float, w: float, h: float, i: int) -> None:
+        segs, right = self.segs, x + w
+        new = [x, y + h, w]
+        j = i
+        while j < len(segs) and segs[j][0] < right - _EPS:
+            sx, sy, sw = segs[j]
+            if sx + sw > right + _EPS:  # keep the part of the last segment past the piece
+                segs[j] = [right, sy, sx + sw - right]
+                break
+            j += 1
+        segs[i:j] = [new]
+        # merge equal-height neighbours
+        k = max(i - 1, 0)
+        while k < len(segs) - 1 and k <= i + 1:
+            if abs(segs[k][1] - segs[k + 1][1]) < _EPS:
+                segs[k][2] += segs[k + 1][2]
+                del segs[k + 1]
+            else:
+                k += 1
+        self.top = max(self.top, y + h)
+
+
+class _Guillotine:
+    """Free rectangles [x, y, w, h]; each placement splits its rectangle along the shorter leftover."""
+
+    def __init__(self, width: float, depth: Optional[float]) -> None:
+        self.width, self.depth = width, depth
+        self.free: List[List[float]] = [[0.0, 0.0, width, depth if depth is not None else math.inf]]
+        self.top = 0.0
+
+    def find(self, w: float, h: float) -> Optional[Tuple[float, float, float, int]]:
+        best = None
+        for i, (x, y, fw, fh) in enumerate(self.free):
+            if w <= fw + _EPS and h <= fh + _EPS and (best is None or (y + h, x) < (best[0], best[1])):
+                best = (y + h, x, y, i)
+        return best
+
+    def place(self, x: float, y: float, w: float, h: float, i: int) -> None:
+        fx, fy, fw, fh = self.free[i]
+        rw, rh = fw - w, fh - h
+        if rw < rh:  # shorter leftover across: the right part stays piece-high
+            right, below = [x + w, fy, rw, h], [fx, fy + h, fw, rh]
+        else:
+            right, below = [x + w, fy, rw, fh], [fx, fy + h, w, rh]
+        self.free[i : i + 1] = [r for r in (right, below) if r[2] > _EPS and r[3] > _EPS]
+        self.top = max(self.top, y + h)
+
+
+_PACKERS = {"skyline": _Skyline, "guillotine": _Guillotine}
+_ORDERS = {
+    "height": lambda p: (-max(p.w, p.h), -min(p.w, p.h)),
+    "width": lambda p: (-min(p.w, p.h), -max(p.w, p.h)),
+    "area": lambda p: (-p.area, -max(p.w, p.h)),
+}
+
+
+def _pack(pieces: Sequence[Piece], bed: Bed, method: str, order: str) -> NestLayout:
+    g = bed.gap
+    uw, ud = bed.usable
+    width, depth = uw + g, (ud + g if ud is not None else None)
+    bins: List[Any] = []
+    placed: List[Placement] = []
+    unplaced: List[Piece] = []
+    for piece in sorted(pieces, key=_ORDERS[order]):
+        shapes = [(piece.w + g, piece.h + g, False)]
+        if piece.rotate and abs(piece.w - piece.h) > _EPS:
+            shapes.append((piece.h + g, piece.w + g, True))
+        spot = None
+        for b, packer in enumerate(bins):
+            for w, h, rot in shapes:
+                hit = packer.find(w, h)
+                if hit is not None and (spot is None or hit[:2] < spot[0][:2]):
+                    spot = (hit, w, h, rot, b)
+            if spot is not None:
+                break  # first bed that takes it
+        if spot is None:
+            packer = _PACKERS[method](width, depth)
+            for w, h, rot in shapes:
+                hit = packer.find(w, h)
+                if hit is not None and (spot is None or hit[:2] < spot[0][:2]):
+                    spot = (hit, w, h, rot, len(bins))
+            if spot is None:
+                unplaced.append(piece)
+                continue
+            bins.append(packer)
+        (_, x, y, i), w, h, rot, b = spot
+        bins[b].place(x, y, w, h, i)
+        placed.append(Placement(piece, b, x + bed.edge, y + bed.edge, w - g, h - g, rot))
+    lengths = tuple(
+        (bed.depth if bed.depth is not None else packer.top - g + 2 * bed.edge) for packer in bins if packer.top > 0
+    )
+    return NestLayout(bed, method, tuple(placed), lengths, tuple(unplaced), order)
+
+
+def nest(pieces: Sequence[Piece], bed: Bed, methods: Iterable[str] = METHODS) -> NestLayout:
+    """Best layout over the given packers and orderings: most pieces placed, then least media."""
+    candidates = []
+    for method in methods:
+        if method not in _PACKERS:
+            raise ValueError(f"Unknown nesting method {method!r}; expected one of {list(METHODS)}")
+        candidates += [_pack(pieces, bed, method, order) for order in _ORDERS]
+    if not candidates:
+        raise ValueError("No nesting method given")
+    return min(candidates, key=lambda lay: (len(lay.unplaced), lay.beds, lay.media_length, lay.method != "guillotine"))
+
+
+# ----------------------------
+# Jobs -> pieces, press -> bed
+# ----------------------------
+
+
+def _num(v: Any) -> Optional[float]:
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return None
+    return f if math.isfinite(f) else None
+
+
+def _preset(js: JobSpec, shop: Mapping[str, Any]) -> Mapping[str, Any]:
+    """special.product_preset (a dict, or a products key), else the preset named in the product."""
+    products = shop.get("products") or {}
+    preset = (js.special or {}).get("product_preset")
+    if isinstance(preset, dict):
+        return preset
+    if isinstance(preset, str) and isinstance(products.get(preset), dict):
+        return products[preset]
+    product = (js.product or "").lower()
+    for key, meta in products.items():
+        if isinstance(meta, dict) and str(key).replace("_", " ") in product:
+            return meta
+    return {}
+
+
+def _hems(preset: Mapping[str, Any]) -> Tuple[float, float, float, float]:
+    """(left, right, top, bottom) hem allowance in inches."""
+    hems = (preset.get("finishing") or {}).get("hems") or {}
+    if not isinstance(hems, dict):
+        return 0.0, 0.0, 0.0, 0.0
+    every = _num(hems.get("all_sides")) or 0.0
+    return tuple(_num(hems.get(side)) or every for side in ("left", "right", "top", "bottom"))  # type: ignore
+
+
+def _grommet_count(w: float, h: float, preset: Mapping[str, Any]) -> int:
+    margin, spacing = _num(preset.get("grommet_margin_in")), _num(preset.get("grommet_spacing_in"))
+    spec = (preset.get("finishing") or {}).get("grommet") or {}
+    corners = bool(spec.get("corners_only")) if isinstance(spec, dict) else False
+    if margin is None or not (spacing or corners):
+        return 0
+    nx = grommet_progression(w, margin, spacing or 0.0, corners)[2]
+    ny = grommet_progression(h, margin, spacing or 0.0, corners)[2]
+    return 2 * nx + 2 * ny - 4 if nx > 1 and ny > 1 else max(nx, ny)
+
+
+def pieces_for(js: JobSpec, shop: Optional[Mapping[str, Any]] = None, job_id: Optional[str] = None) -> List[Piece]:
+    """special.quantity pieces of the job's footprint; none without a trim size."""
+    if not js.trim_size:
+        return []
+    shop = shop if shop is not None else resolve_shop(js)
+    special = js.special or {}
+    preset = _preset(js, shop)
+    w, h = float(js.trim_size.w_in), float(js.trim_size.h_in)
+    bleed = js.bleed_in if js.bleed_in is not None else (_num(preset.get("bleed_in")) or 0.0)
+    left, right, top, bottom = _hems(preset)
+    fw, fh = round(w + 2 * bleed + left + right, 4), round(h + 2 * bleed + top + bottom, 4)
+    qty = max(int(_num(special.get("quantity")) or 1), 1)
+    base = job_id or special.get("job_number") or js.product or "job"
+    piece = Piece(
+        id=str(base),
+        w=fw,
+        h=fh,
+        trim=(w, h),
+        grommets=_grommet_count(w, h, preset),
+        rotate=special.get("nest_rotate", True) is not False,
+    )
+    if qty == 1:
+        return [piece]
+    return [Piece(f"{base}#{i + 1}", fw, fh, piece.trim, piece.grommets, piece.rotate) for i in range(qty)]
+
+
+def bed_for(shop: Mapping[str, Any], press: Optional[str]) -> Bed:
+    """Roll or flatbed from press_capabilities.yml; gap/edge from policies.nesting unless the press sets them."""
+    rec = resolve_press(shop, press)
+    if rec is None or not rec.max_width_in:
+        raise ValueError(f"Unknown press {press!r}, or it has no max_width_in")
+    if rec.press_class not in ("roll", "flatbed"):
+        raise ValueError(f"{rec.key} is a {rec.press_class} press; nesting needs a roll or flatbed printer")
+    pol = (shop.get("policies") or {}).get("nesting") or {}
+
+    def setting(key: str, default: float) -> float:
+        for v in (rec.meta.get(f"nest_{key}"), pol.get(key)):
+            if _num(v) is not None:
+                return float(v)
+        return default
+
+    return Bed(
+        key=rec.key,
+        kind="roll" if rec.press_class == "roll" or not rec.max_depth_in else "flatbed",
+        width=rec.max_width_in,
+        depth=rec.max_depth_in if rec.press_class == "flatbed" else None,
+        gap=setting("gap_in", DEFAULT_GAP_IN),
+        edge=setting("edge_in", DEFAULT_EDGE_IN),
+    )
+
+
+def nest_jobs(
+    jobs: Iterable[Any],
+    press: str,
+    shop: Optional[Mapping[str, Any]] = None,
+    methods: Iterable[str] = METHODS,
+) -> NestLayout:
+    """
+    Nest a batch onto `press`. `jobs` are JobSpecs or (job_id, JobSpec) pairs; the shop
+    comes from the first job when not given.
+    """
+    pairs = [j if isinstance(j, tuple) else (None, j) for j in jobs]
+    if shop is None:
+        shop = resolve_shop(pairs[0][1]) if pairs else {}
+    pieces: List[Piece] = []
+    for i, (job_id, js) in enumerate(pairs):
+        pieces += pieces_for(js, shop, job_id or (js.special or {}).get("job_number") or f"job{i + 1}")
+    return nest(pieces, bed_for(shop, press), methods)
+
+
+# ----------------------------
+# Placement file
+# ----------------------------
+
+
+def placement_jsx(layout: NestLayout) -> str:
+    """Illustrator JSX: one artboard per bed, footprints as outlined rectangles labelled by job."""
+    scale = 0.1 if max(layout.lengths or (0.0,)) > ILLUSTRATOR_MAX_IN or layout.bed.width > ILLUSTRATOR_MAX_IN else 1.0
+    rows = ",\n    ".join(
+        f'[{p.bed}, {round(p.x, 4)}, {round(p.y, 4)}, {round(p.w, 4)}, {round(p.h, 4)}, "{p.piece.id}"]'
+        for p in layout.placements
+    )
+    lengths = ", ".join(str(round(x, 4)) for x in layout.lengths)
+    return f"""
+// nest_placement.jsx ({layout.bed.key}, {layout.method}; {len(layout.placements)} pieces)
+(function(){{
+  var s = {72 * scale};  // points per inch{" (1/10 scale: layout exceeds the canvas)" if scale < 1 else ""}
+  var W = {layout.bed.width}, lengths = [{lengths}];
+  var P = [
+    {rows}
+  ];
+  var doc = app.documents.add(DocumentColorSpace.CMYK, W*s, lengths[0]*s);
+  var layer = doc.layers[0]; layer.name = "Nest";
+  var top = 0, tops = [];
+  for (var b=0;b<lengths.length;b++){{
+    if (b > 0) doc.artboards.add([0, -top, W*s, -(top + lengths[b]*s)]);
+    tops.push(top); top += lengths[b]*s + 72;
+  }}
+  for (var i=0;i<P.length;i++){{
+    var p = P[i], y0 = tops[p[0]] + p[2]*s;
+    var r = layer.pathItems.rectangle(-y0, p[1]*s, p[3]*s, p[4]*s);
+    r.filled = false; r.stroked = true; r.strokeWidth = 0.5;
+    var t = layer.textFrames.add(); t.contents = p[5]; t.position = [p[1]*s + 4, -y0 - 4];
+  }}
+}})();
+"""
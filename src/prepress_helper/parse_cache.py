@@ -0,0 +1,159 @@
+# src/prepress_helper/parse_cache.py
+"""
+Content-addressed on-disk cache of parsed JobSpecs.
+
+Key = sha256(XML bytes) + mapping-plan fingerprint + PARSE_SCHEMA_VERSION + package version,
+so any change to the ticket, the xml_map.yml (or a dialect map) or the JobSpec the adapter
+builds from them misses. Entries are compact JSON files under
+`<root>/<key[:2]>/<key>.json`; file mtime is the LRU clock. A write that takes the
+directory over `max_bytes` trims it to LOW_WATERMARK of the cap, so the directory is
+rescanned once per ~10% of the cap written rather than on every put past it.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from prepress_helper import __version__
+from prepress_helper.jobspec import JobSpec
+from prepress_helper.mapping_plan import MappingPlan
+
+ENV_CACHE_DIR = "PRINTSSISTANT_PARSE_CACHE"
+ENV_CACHE_MAX_BYTES = "PRINTSSISTANT_PARSE_CACHE_MAX_BYTES"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+LOW_WATERMARK = 0.9  # eviction trims to this fraction of max_bytes
+
+# Bump whenever xml_adapter / xml_stream produce a different JobSpec for the same XML and
+# mapping (new `special` keys, changed normalization, ...): older entries then miss.
+# 2: special.stock_code / stock_weight / caliper_in; 3: special.press_sheet;
+# 4: special.quantity; 5: special.operations; 6: special.job_number.
+PARSE_SCHEMA_VERSION = 6
+
+
+class ParseCache:
+    """Size-bounded LRU directory of JobSpec JSON. Safe to share between threads."""
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._total = sum(size for _, size, _ in self._entries())
+
+    # -- keys ----------------------------------------------------------------
+    @staticmethod
+    def key(data: bytes, plan: MappingPlan) -> str:
+        h = hashlib.sha256(data)
+        h.update(b"\0" + plan.fingerprint().encode("ascii"))
+        h.update(b"\0%d" % PARSE_SCHEMA_VERSION)
+        h.update(b"\0" + __version__.encode("ascii"))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    # -- lookups -------------------------------------------------------------
+    def get(self, key: str) -> Optional[JobSpec]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                payload = f.read()
+            js = JobSpec.model_validate_json(payload)
+        except (OSError, ValueError):  # missing, evicted meanwhile, or a torn/corrupt entry
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)  # bump LRU position
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return js
+
+    def put(self, key: str, js: JobSpec) -> None:
+        path = self._path(key)
+        payload = js.model_dump_json().encode("utf-8")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            try:
+                old = os.path.getsize(path)
+            except OSError:
+                old = 0
+            os.replace(tmp, path)  # readers never see a partial file
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        with self._lock:
+            self._total += len(payload) - old
+            over = self._total > self.max_bytes
+        if over:
+            self._evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        out = []
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                p = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                out.append((st.st_mtime, st.st_size, p))
+        return out
+
+    def _evict(self) -> None:
+        """Drop least-recently-used entries until the directory is under the low watermark."""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            low = self.max_bytes * LOW_WATERMARK
+            for _, size, p in entries:
+                if total <= low:
+                    break
+                try:
+                    os.unlink(p)
+                except OSError:
+                    continue
+                total -= size
+            self._total = total
+
+    def clear(self) -> None:
+        with self._lock:
+            for _, _, p in self._entries():
+                try:
+                    os.unlink(p)
+                except OSError:
+                    pass
+            self._total = 0
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int | str]:
+        with self._lock:
+            return {
+                "dir": self.root,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def parse_cache_from_env() -> Optional[ParseCache]:
+    """ParseCache at $PRINTSSISTANT_PARSE_CACHE, or None when the variable is unset."""
+    root = os.environ.get(ENV_CACHE_DIR, "").strip()
+    if not root:
+        return None
+    max_bytes = int(os.environ.get(ENV_CACHE_MAX_BYTES, DEFAULT_MAX_BYTES))
+    return ParseCache(root, max_bytes=max_bytes)
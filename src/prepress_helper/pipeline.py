@@ -0,0 +1,719 @@
+# src/prepress_helper/pipeline.py
+"""
+The advise pipeline shared by the CLI, the API and the UI.
+
+A Skill names the intents that trigger it (none = always runs) and how its tips /
+scripts / nags functions are called: `args` and `kwargs` name AdviseContext attributes,
+since the skill modules do not share one signature. Skills are registered in merge order;
+a built-in skill module that fails to import is an import error of the pipeline, not a
+silently missing section (optional dependencies are guarded inside the skill). Triggered skills run
+concurrently, each within a time budget, and report a per-skill status.
+
+    result = AdvisePipeline().run(js, "trifold roll fold", timings=True)
+    result.to_dict()  # {"intents", "tips", "scripts", "status", ["nags"], ["meta"], ["timings_ms"], ["errors"]}
+"""
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import importlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
+from prepress_helper import __version__
+from prepress_helper.advise_cache import Abandoned, AdviseCache, advise_key
+from prepress_helper.config_loader import (
+    ShopConfig,
+    apply_shop_config,
+    current_shop_config,
+    register_shop_config,
+    resolve_shop,
+)
+from prepress_helper.intent_rules import load_intent_rules
+from prepress_helper.jobspec import JobSpec
+from prepress_helper.router import detect_intents, fold_preferences_from_message
+
+# ----------------------------
+# Context / result
+# ----------------------------
+
+
+@dataclass
+class AdviseContext:
+    js: JobSpec
+    message: str
+    intents: List[str]
+    fold_style: str = "roll"
+    fold_in: str = "right"
+    render_scripts: bool = True
+
+
+@dataclass
+class AdviseResult:
+    intents: List[str]
+    tips: List[str]
+    scripts: Dict[str, str]
+    nags: List[str] = field(default_factory=list)
+    status: Dict[str, str] = field(default_factory=dict)  # skill -> ok | error | timeout
+    meta: Dict[str, Any] = field(default_factory=dict)
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    jobspec: Optional[JobSpec] = field(default=None, repr=False)  # after shop config; not serialized
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"intents": self.intents, "tips": self.tips, "scripts": self.scripts}
+        for key in ("nags", "status", "meta", "timings_ms", "errors"):
+            if getattr(self, key):
+                out[key] = getattr(self, key)
+        return out
+
+
+# ----------------------------
+# Skill registry
+# ----------------------------
+
+
+@dataclass(frozen=True)
+class Skill:
+    name: str
+    intents: Tuple[str, ...] = ()  # any of these triggers the skill; empty = always
+    tips: Optional[Callable[..., List[str]]] = None
+    scripts: Optional[Callable[..., Dict[str, str]]] = None
+    nags: Optional[Callable[..., List[str]]] = None
+    args: Tuple[str, ...] = ("js",)  # AdviseContext attributes, positional
+    kwargs: Tuple[Tuple[str, str], ...] = ()  # (parameter, AdviseContext attribute)
+    nag_args: Tuple[str, ...] = ("js",)
+    timeout_s: Optional[float] = None  # budget; None = the pipeline's default
+    version: str = ""  # bump when output changes for the same input (advise cache key)
+
+    def triggered(self, intents: List[str]) -> bool:
+        return not self.intents or any(i in intents for i in self.intents)
+
+    def call(self, fn: Callable[..., Any], ctx: AdviseContext, args: Optional[Tuple[str, ...]] = None) -> Any:
+        pos = [getattr(ctx, a) for a in (self.args if args is None else args)]
+        kw = {} if args is not None else {p: getattr(ctx, a) for p, a in self.kwargs}
+        return fn(*pos, **kw)
+
+
+SKILLS: Dict[str, Skill] = {}
+
+
+def register_skill(skill: Skill) -> Skill:
+    """Add (or replace) a skill; new names run after the existing ones."""
+    SKILLS[skill.name] = skill
+    return skill
+
+
+def _register_module(name: str, module: str, **spec: Any) -> None:
+    mod = importlib.import_module(f"prepress_helper.skills.{module}")  # errors propagate
+    fns = {kind: getattr(mod, attr, None) for kind, attr in spec.pop("functions").items()}
+    register_skill(Skill(name=name, **fns, **spec))
+
+
+_FOLD_KW = (("style", "fold_style"), ("fold_in", "fold_in"))
+_register_module("doc_setup", "doc_setup", functions={"tips": "tips", "scripts": "scripts"})
+_register_module(
+    "fold_math", "fold_math", intents=("fold_math",), kwargs=_FOLD_KW, functions={"tips": "tips", "scripts": "scripts"}
+)
+_register_module(
+    "color_policy", "color_policy", intents=("color_policy",), functions={"tips": "tips", "scripts": "scripts"}
+)
+_register_module(
+    "policy_enforcer",
+    "policy_enforcer",
+    args=("js", "message"),
+    functions={"tips": "tips", "scripts": "scripts", "nags": "soft_nags"},
+)
+_register_module(
+    "wide_format", "wide_format", intents=("wide_format",), functions={"tips": "tips", "scripts": "scripts"}
+)
+_register_module("imposition", "imposition", intents=("imposition",), functions={"tips": "tips", "scripts": "scripts"})
+_register_module(
+    "spot_policy",
+    "spot_policy",
+    intents=("spot",),
+    args=("js", "intents", "message"),
+    functions={"tips": "tips", "scripts": "scripts"},
+)
+_register_module(
+    "min_specs",
+    "min_specs",
+    intents=("min_specs",),
+    args=("js", "message", "intents"),
+    functions={"tips": "tips", "scripts": "scripts"},
+)
+
+
+# ----------------------------
+# De-duplication
+# ----------------------------
+
+
+def dedupe_nags(lines: List[str]) -> List[str]:
+    seen = set()
+    out: List[str] = []
+    for s in lines:
+        norm = s.strip().lower()
+        if norm not in seen:
+            out.append(s)
+            seen.add(norm)
+    return out
+
+
+def dedupe_tips(tips: List[str]) -> List[str]:
+    """
+    De-duplicate tips and apply preferred phrasing:
+      - Prefer 'Set document to ...' over 'Create a document at ...'
+      - Prefer 'RGB assets allowed...' over CMYK admonitions
+      - Prefer 'Use shop rich black...' over generic 'Rich black ...'
+      - Collapse duplicate CMYK admonitions (e.g. 'Use CMYK...' vs 'Work in CMYK...')
+    """
+    lower = [t.strip().lower() for t in tips]
+    has_set_document = any("set document to" in t for t in lower)
+    has_rgb_allowed = any("rgb assets allowed" in t for t in lower)
+    has_shop_rich = any("use shop rich black" in t for t in lower)
+
+    out: List[str] = []
+    seen: set[str] = set()
+    seen_rgb_admon = False  # collapse variations that contain 'avoid placing rgb assets directly'
+
+    for s in tips:
+        key = s.strip().lower()
+        if key in seen:
+            continue
+
+        if has_set_document and "create a document at" in key:
+            continue
+
+        if "avoid placing rgb assets directly" in key:
+            if has_rgb_allowed:
+                # If RGB is allowed, drop admonitions entirely
+                continue
+            # Otherwise, keep only the first admonition we encounter
+            if seen_rgb_admon:
+                continue
+            seen_rgb_admon = True
+
+        if has_shop_rich and ("rich black" in key) and ("use shop rich black" not in key):
+            continue
+
+        out.append(s)
+        seen.add(key)
+
+    return out
+
+
+_ASCII = {
+    "≤": "<=",
+    "≥": ">=",
+    "×": "x",
+    "–": "-",
+    "—": "-",
+    "“": '"',
+    "”": '"',
+    "‘": "'",
+    "’": "'",
+    "\u00a0": " ",
+}
+
+
+def normalize_ascii(s: str) -> str:
+    if not isinstance(s, str):
+        return s
+    for k, v in _ASCII.items():
+        s = s.replace(k, v)
+    return s
+
+
+# ----------------------------
+# Pipeline
+# ----------------------------
+
+ENV_SKILL_TIMEOUT = "PRINTSSISTANT_SKILL_TIMEOUT"
+ENV_SKILL_WORKERS = "PRINTSSISTANT_SKILL_WORKERS"
+DEFAULT_SKILL_TIMEOUT = 2.0
+DEFAULT_SKILL_WORKERS = 8
+
+_POOL: Optional[ThreadPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def skill_pool() -> ThreadPoolExecutor:
+    """Process-wide bounded pool the skills run on (size: $PRINTSSISTANT_SKILL_WORKERS)."""
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                workers = int(os.environ.get(ENV_SKILL_WORKERS) or DEFAULT_SKILL_WORKERS)
+                _POOL = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="skill")
+    return _POOL
+
+
+class SkillTimeout(Exception):
+    """A skill did not finish within its time budget."""
+
+
+@dataclass
+class _Outcome:
+    tips: List[str]
+    scripts: Dict[str, str]
+    nags: List[str]
+    ms: float
+
+
+def _run_skill(skill: Skill, ctx: AdviseContext) -> _Outcome:
+    t0 = time.perf_counter()
+    tips = list(skill.call(skill.tips, ctx) or []) if skill.tips else []
+    scripts = dict(skill.call(skill.scripts, ctx) or {}) if skill.scripts and ctx.render_scripts else {}
+    nags = list(skill.call(skill.nags, ctx, skill.nag_args) or []) if skill.nags else []
+    return _Outcome(tips, scripts, nags, round((time.perf_counter() - t0) * 1000, 3))
+
+
+class AdvisePipeline:
+    """
+    JobSpec + message -> intents, tips, scripts and nags, with per-skill status and timings.
+
+    Triggered skills run concurrently on `skill_pool()`, each within its budget
+    (`Skill.timeout_s`, else the pipeline's `timeout_s`). A skill that raises or runs out
+    of time is left out of the merged result and reported in `status` / `errors`; the
+    others are merged in registry order, so output does not depend on completion order.
+    With strict=True the first failure propagates instead. concurrent=False runs the
+    skills inline, one after another (no budgets).
+
+    With an AdviseCache, identical requests (see advise_cache for the key) are answered
+    from memory and concurrent identical ones are computed once. debug_ml bypasses it.
+    """
+
+    def __init__(
+        self,
+        skills: Optional[List[Skill]] = None,
+        *,
+        strict: bool = False,
+        timeout_s: Optional[float] = None,
+        concurrent: bool = True,
+        cache: Optional[AdviseCache] = None,
+    ) -> None:
+        self._skills = skills
+        self.strict = strict
+        self.cache = cache
+        self.timeout_s = timeout_s if timeout_s is not None else _env_timeout()
+        self.concurrent = concurrent
+
+    @property
+    def skills(self) -> List[Skill]:
+        return list(SKILLS.values()) if self._skills is None else list(self._skills)
+
+    def _budget(self, skill: Skill) -> float:
+        return skill.timeout_s if skill.timeout_s is not None else self.timeout_s
+
+    def _prepare(self, js, message, shop, fold, fold_in, render_scripts, lap) -> AdviseContext:
+        msg = message or ""
+        t0 = time.perf_counter()
+        js = apply_shop_config(js, shop if shop is not None else current_shop_config("config"))
+        lap("shop_config", t0)
+
+        t0 = time.perf_counter()
+        intents = detect_intents(js, msg, shop=resolve_shop(js))
+        inferred_style, _ = fold_preferences_from_message(msg)
+        ctx = AdviseContext(
+            js=js,
+            message=msg,
+            intents=intents,
+            fold_style=(fold or inferred_style or "roll").lower(),
+            fold_in=(fold_in or "right").lower(),
+            render_scripts=render_scripts,
+        )
+        lap("intents", t0)
+        return ctx
+
+    def _run(
+        self,
+        js: JobSpec,
+        message: Optional[str] = None,
+        *,
+        shop: Union[ShopConfig, Dict[str, Any], None] = None,
+        fold: Optional[str] = None,
+        fold_in: Optional[str] = None,
+        ascii: bool = False,
+        debug_ml: bool = False,
+        timings: bool = False,
+        render_scripts: bool = True,
+    ) -> AdviseResult:
+        t_start, stages, lap = _stopwatch()
+        ctx = self._prepare(js, message, shop, fold, fold_in, render_scripts, lap)
+        active = [s for s in self.skills if s.triggered(ctx.intents)]
+
+        outcomes: Dict[str, Union[_Outcome, Exception]] = {}
+        if not self.concurrent:
+            for skill in active:
+                try:
+                    outcomes[skill.name] = _run_skill(skill, ctx)
+                except Exception as e:
+                    outcomes[skill.name] = e
+        else:
+            started = time.monotonic()
+            futures = [(skill, skill_pool().submit(_run_skill, skill, ctx)) for skill in active]
+            for skill, fut in futures:
+                remaining = self._budget(skill) - (time.monotonic() - started)
+                try:
+                    outcomes[skill.name] = fut.result(timeout=max(remaining, 0.0))
+                except FutureTimeout:
+                    fut.cancel()
+                    outcomes[skill.name] = SkillTimeout(f"no result within {self._budget(skill)}s")
+                except Exception as e:
+                    outcomes[skill.name] = e
+        return self._finish(ctx, active, outcomes, ascii, debug_ml, timings, t_start, stages, lap)
+
+    async def _run_async(
+        self,
+        js: JobSpec,
+        message: Optional[str] = None,
+        *,
+        shop: Union[ShopConfig, Dict[str, Any], None] = None,
+        fold: Optional[str] = None,
+        fold_in: Optional[str] = None,
+        ascii: bool = False,
+        debug_ml: bool = False,
+        timings: bool = False,
+        render_scripts: bool = True,
+    ) -> AdviseResult:
+        t_start, stages, lap = _stopwatch()
+        ctx = self._prepare(js, message, shop, fold, fold_in, render_scripts, lap)
+        active = [s for s in self.skills if s.triggered(ctx.intents)]
+
+        async def one(skill: Skill) -> Union[_Outcome, Exception]:
+            fut = skill_pool().submit(_run_skill, skill, ctx)
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(fut), self._budget(skill))
+            except asyncio.TimeoutError:
+                return SkillTimeout(f"no result within {self._budget(skill)}s")
+            except asyncio.CancelledError:
+                fut.cancel()
+                raise
+            except Exception as e:
+                return e
+
+        results = await asyncio.gather(*(one(skill) for skill in active))
+        outcomes = {skill.name: res for skill, res in zip(active, results)}
+        return self._finish(ctx, active, outcomes, ascii, debug_ml, timings, t_start, stages, lap)
+
+    # -- public entry points (cache in front of _run / _run_async) --------------------
+
+    def run(
+        self,
+        js: JobSpec,
+        message: Optional[str] = None,
+        *,
+        shop: Union[ShopConfig, Dict[str, Any], None] = None,
+        fold: Optional[str] = None,
+        fold_in: Optional[str] = None,
+        ascii: bool = False,
+        debug_ml: bool = False,
+        timings: bool = False,
+        render_scripts: bool = True,
+    ) -> AdviseResult:
+        opts = dict(
+            fold=fold, fold_in=fold_in, ascii=ascii, debug_ml=debug_ml, timings=timings, render_scripts=render_scripts
+        )
+        if self.cache is None or debug_ml:
+            return self._run(js, message, shop=shop, **opts)
+        t0 = time.perf_counter()
+        snap = _snapshot(shop)
+        key = self._cache_key(js, message, snap, fold, fold_in, ascii, render_scripts)
+        value, fut, leader = self.cache.claim(key)
+        if fut is not None and not leader:
+            try:
+                value = fut.result()
+            except Abandoned:
+                return self._run(js, message, shop=snap, **opts)
+        if value is not None:
+            return _from_cache(value, js, snap, timings, t0)
+        try:
+            result = self._run(js, message, shop=snap, **opts)
+        except BaseException as e:
+            self.cache.resolve(key, fut, error=e)
+            raise
+        self.cache.resolve(key, fut, result, store=_all_ok(result))
+        return _detached(result)  # the stored entry stays private to the cache
+
+    async def run_async(
+        self,
+        js: JobSpec,
+        message: Optional[str] = None,
+        *,
+        shop: Union[ShopConfig, Dict[str, Any], None] = None,
+        fold: Optional[str] = None,
+        fold_in: Optional[str] = None,
+        ascii: bool = False,
+        debug_ml: bool = False,
+        timings: bool = False,
+        render_scripts: bool = True,
+    ) -> AdviseResult:
+        """
+        Same as run() without blocking the event loop. Cancelling the awaiting task (e.g.
+        the HTTP client went away) cancels every skill that has not started yet; running
+        ones finish in their worker thread and their results are dropped.
+
+        render_scripts=False skips the skills' script rendering (tip-only callers).
+        """
+        opts = dict(
+            fold=fold, fold_in=fold_in, ascii=ascii, debug_ml=debug_ml, timings=timings, render_scripts=render_scripts
+        )
+        if self.cache is None or debug_ml:
+            return await self._run_async(js, message, shop=shop, **opts)
+        t0 = time.perf_counter()
+        snap = _snapshot(shop)
+        key = self._cache_key(js, message, snap, fold, fold_in, ascii, render_scripts)
+        value, fut, leader = self.cache.claim(key)
+        if fut is not None and not leader:
+            try:
+                value = await asyncio.wrap_future(fut)
+            except Abandoned:
+                return await self._run_async(js, message, shop=snap, **opts)
+        if value is not None:
+            return _from_cache(value, js, snap, timings, t0)
+        try:
+            result = await self._run_async(js, message, shop=snap, **opts)
+        except asyncio.CancelledError:  # the leader's client left; waiters compute their own
+            self.cache.resolve(key, fut, error=Abandoned(key))
+            raise
+        except BaseException as e:
+            self.cache.resolve(key, fut, error=e)
+            raise
+        self.cache.resolve(key, fut, result, store=_all_ok(result))
+        return _detached(result)  # the stored entry stays private to the cache
+
+    async def stream(
+        self,
+        js: JobSpec,
+        message: Optional[str] = None,
+        *,
+        shop: Union[ShopConfig, Dict[str, Any], None] = None,
+        fold: Optional[str] = None,
+        fold_in: Optional[str] = None,
+        ascii: bool = False,
+        debug_ml: bool = False,
+        render_scripts: bool = True,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        run_async() as events, each skill's output sent as soon as that skill finishes:
+
+            {"event": "intents", "intents": [...]}
+            {"event": "skill", "skill", "status": "ok", "tips", "nags", "scripts", "ms"}
+            {"event": "skill", "skill", "status": "error" | "timeout", "error"}
+            {"event": "meta", ...}                      # debug_ml
+            {"event": "done", "status", "errors", "retracted", "timings_ms"}
+
+        Tips and nags are de-duplicated incrementally: each event only carries entries not
+        sent before. A phrasing preference that only shows up later can drop a tip that
+        was already sent; "done" lists those under `retracted`. Not cached. Closing the
+        generator (client gone) cancels skills that have not started yet.
+        """
+        t_start, stages, lap = _stopwatch()
+        ctx = self._prepare(js, message, shop, fold, fold_in, render_scripts, lap)
+        active = [s for s in self.skills if s.triggered(ctx.intents)]
+        yield {"event": "intents", "intents": ctx.intents}
+
+        async def one(skill: Skill) -> Tuple[Optional[Skill], Any]:
+            fut = skill_pool().submit(_run_skill, skill, ctx)
+            try:
+                return skill, await asyncio.wait_for(asyncio.wrap_future(fut), self._budget(skill))
+            except asyncio.TimeoutError:
+                return skill, SkillTimeout(f"no result within {self._budget(skill)}s")
+            except asyncio.CancelledError:
+                fut.cancel()
+                raise
+            except Exception as e:
+                return skill, e
+
+        async def ml() -> Tuple[Optional[Skill], Any]:
+            return None, await asyncio.wrap_future(skill_pool().submit(_ml_meta, ctx.js, ctx.message))
+
+        tasks = [asyncio.ensure_future(one(skill)) for skill in active]
+        if debug_ml:
+            tasks.append(asyncio.ensure_future(ml()))
+        tips, nags = _Incremental(dedupe_tips), _Incremental(dedupe_nags)
+        status: Dict[str, str] = {}
+        errors: Dict[str, str] = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                skill, out = await next_done
+                if skill is None:
+                    yield {"event": "meta", **out}
+                    continue
+                if isinstance(out, Exception):
+                    if self.strict:
+                        raise out
+                    status[skill.name] = "timeout" if isinstance(out, SkillTimeout) else "error"
+                    errors[skill.name] = f"{type(out).__name__}: {out}"
+                    yield {
+                        "event": "skill",
+                        "skill": skill.name,
+                        "status": status[skill.name],
+                        "error": errors[skill.name],
+                    }
+                    continue
+                status[skill.name] = "ok"
+                stages[skill.name] = out.ms
+                new_tips = [normalize_ascii(t) for t in out.tips] if ascii else out.tips
+                new_nags = [normalize_ascii(n) for n in out.nags] if ascii else out.nags
+                yield {
+                    "event": "skill",
+                    "skill": skill.name,
+                    "status": "ok",
+                    "tips": tips.add(new_tips),
+                    "nags": nags.add(new_nags),
+                    "scripts": out.scripts,
+                    "ms": out.ms,
+                }
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        stages["total"] = round((time.perf_counter() - t_start) * 1000, 3)
+        yield {
+            "event": "done",
+            "status": status,
+            "errors": errors,
+            "retracted": tips.retracted() + nags.retracted(),
+            "timings_ms": stages,
+        }
+
+    def _cache_key(self, js, message, snap: ShopConfig, fold, fold_in, ascii, render_scripts) -> str:
+        skills = [(s.name, s.version, s.timeout_s) for s in self.skills]
+        return advise_key(
+            js,
+            message,
+            shop=snap.version,
+            rules=load_intent_rules().version,
+            skills=[__version__, skills, self.timeout_s, self.strict],
+            opts=[fold, fold_in, ascii, render_scripts],
+        )
+
+    def _finish(self, ctx, active, outcomes, ascii, debug_ml, timings, t_start, stages, lap) -> AdviseResult:
+        tips: List[str] = []
+        scripts: Dict[str, str] = {}
+        nags: List[str] = []
+        status: Dict[str, str] = {}
+        errors: Dict[str, str] = {}
+        for skill in active:
+            out = outcomes[skill.name]
+            if isinstance(out, Exception):
+                if self.strict:
+                    raise out
+                status[skill.name] = "timeout" if isinstance(out, SkillTimeout) else "error"
+                errors[skill.name] = f"{type(out).__name__}: {out}"
+                stages[skill.name] = round(self._budget(skill) * 1000, 3) if isinstance(out, SkillTimeout) else 0.0
+                continue
+            status[skill.name] = "ok"
+            stages[skill.name] = out.ms
+            tips += out.tips
+            scripts.update(out.scripts)
+            nags += out.nags
+
+        t0 = time.perf_counter()
+        if ascii:
+            tips = [normalize_ascii(t) for t in tips]
+            nags = [normalize_ascii(n) for n in nags]
+        result = AdviseResult(
+            intents=ctx.intents,
+            tips=dedupe_tips(tips),
+            scripts=scripts,
+            nags=dedupe_nags(nags),
+            status=status,
+            errors=errors,
+            jobspec=ctx.js,
+        )
+        lap("dedupe", t0)
+
+        if debug_ml:
+            result.meta = _ml_meta(ctx.js, ctx.message)
+        if timings:
+            stages["total"] = round((time.perf_counter() - t_start) * 1000, 3)
+            result.timings_ms = stages
+        return result
+
+
+class _Incremental:
+    """Feed batches through a whole-list dedupe; get back only what was not sent yet."""
+
+    def __init__(self, dedupe: Callable[[List[str]], List[str]]) -> None:
+        self.dedupe = dedupe
+        self.seen: List[str] = []
+        self.sent: Dict[str, str] = {}  # normalized -> as sent
+
+    def add(self, items: List[str]) -> List[str]:
+        self.seen += items
+        new = [s for s in self.dedupe(self.seen) if s.strip().lower() not in self.sent]
+        self.sent.update((s.strip().lower(), s) for s in new)
+        return new
+
+    def retracted(self) -> List[str]:
+        final = {s.strip().lower() for s in self.dedupe(self.seen)}
+        return [s for key, s in self.sent.items() if key not in final]
+
+
+def _snapshot(shop: Union[ShopConfig, Dict[str, Any], None]) -> ShopConfig:
+    return register_shop_config(shop) if shop is not None else current_shop_config("config")
+
+
+def _all_ok(result: AdviseResult) -> bool:
+    return all(v == "ok" for v in result.status.values())
+
+
+def _detached(result: AdviseResult, **changes: Any) -> AdviseResult:
+    """A copy sharing no list/dict with `result`, so callers may mutate it without touching the cache."""
+    fields = dict(
+        intents=list(result.intents),
+        tips=list(result.tips),
+        scripts=dict(result.scripts),
+        nags=list(result.nags),
+        status=dict(result.status),
+        meta=dict(result.meta),
+        timings_ms=dict(result.timings_ms),
+        errors=dict(result.errors),
+    )
+    fields.update(changes)
+    return dataclasses.replace(result, **fields)
+
+
+def _from_cache(cached: AdviseResult, js: JobSpec, snap: ShopConfig, timings: bool, t0: float) -> AdviseResult:
+    # the advice is shared; the JobSpec is this request's (it may differ in volatile fields)
+    ms = round((time.perf_counter() - t0) * 1000, 3)
+    return _detached(
+        cached,
+        jobspec=apply_shop_config(js, snap),
+        meta={},
+        timings_ms={"cache": ms, "total": ms} if timings else {},
+    )
+
+
+def _stopwatch():
+    stages: Dict[str, float] = {}
+
+    def lap(name: str, t0: float) -> None:
+        stages[name] = round((time.perf_counter() - t0) * 1000, 3)
+
+    return time.perf_counter(), stages, lap
+
+
+def _env_timeout() -> float:
+    raw = os.environ.get(ENV_SKILL_TIMEOUT, "").strip()
+    return float(raw) if raw else DEFAULT_SKILL_TIMEOUT
+
+
+def _ml_meta(js: JobSpec, message: str) -> Dict[str, Any]:
+    try:
+        from prepress_helper.ml.product_classifier import predict_label  # type: ignore
+
+        pred = predict_label(js, message)
+    except Exception:
+        return {}
+    if not pred:
+        return {}
+    return {"ml_prediction": pred[0], "prob": round(pred[1], 4)}
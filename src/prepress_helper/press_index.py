@@ -0,0 +1,182 @@
+# src/prepress_helper/press_index.py
+"""
+Machine-name -> press capability resolution.
+
+Tickets name machines the way operators type them ("HP Latex 800/570", "Fujifilm EC1100"),
+press_capabilities.yml keys them as slugs (`hp_latex_570`, `fuji_ec1100`). A PressIndex is
+built once per shop-config snapshot and resolves a name in this order:
+
+  1. slug / compact slug of the key or of one of its `aliases`
+  2. token match: every token of a key appears in the name (a key token may be a prefix
+     of a name token, "fuji" ~ "fujifilm"); the most specific unambiguous key wins
+  3. fuzzy (difflib) on the compact slug, limited to keys whose model numbers all appear
+     in the name, so "Latex 560" never resolves to `hp_latex_570`
+
+Results (hits and misses) are memoized per index.
+"""
+from __future__ import annotations
+
+import difflib
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from prepress_helper.snapshot_cache import LRUMemo, SnapshotCache
+
+# press_capabilities.yml group -> press class
+GROUP_CLASSES = {
+    "roll_printers": "roll",
+    "flatbed_printers": "flatbed",
+    "sheetfed_presses": "sheetfed",
+    "digital_presses": "digital",
+    "offset_presses": "offset",
+}
+WIDE_CLASSES = frozenset({"roll", "flatbed"})
+WIDE_MIN_WIDTH_IN = 24.0
+FUZZY_CUTOFF = 0.8
+_MEMO_SIZE = 1024
+_INDEX_CACHE_SIZE = 8
+
+
+def slug(name: Any) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", str(name or "").lower()).strip("_")
+
+
+def _compact(s: str) -> str:
+    return s.replace("_", "")
+
+
+def _tokens(s: str) -> Tuple[str, ...]:
+    return tuple(t for t in s.split("_") if t)
+
+
+def _digits(s: str) -> FrozenSet[str]:
+    return frozenset(re.findall(r"\d+", s))
+
+
+def _float(v: Any) -> Optional[float]:
+    try:
+        return float(v) if v is not None and v != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _bool(v: Any) -> Optional[bool]:
+    return None if v is None else bool(v)
+
+
+@dataclass(frozen=True)
+class PressRecord:
+    key: str
+    press_class: str = "unknown"  # roll | flatbed | sheetfed | digital | offset | unknown
+    max_width_in: Optional[float] = None
+    max_depth_in: Optional[float] = None
+    tac: Optional[float] = None
+    allow_rgb: Optional[bool] = None
+    allow_spot: Optional[bool] = None
+    icc: Optional[str] = None
+    meta: Mapping[str, Any] = field(default_factory=dict, compare=False, repr=False)
+
+    @property
+    def wide(self) -> bool:
+        if self.press_class in WIDE_CLASSES:
+            return True
+        return self.max_width_in is not None and self.max_width_in >= WIDE_MIN_WIDTH_IN
+
+    @classmethod
+    def from_meta(cls, key: str, press_class: str, meta: Any) -> "PressRecord":
+        meta = meta if isinstance(meta, dict) else {}
+        icc = meta.get("icc_profile") or meta.get("icc")
+        return cls(
+            key=key,
+            press_class=str(meta.get("class") or press_class),
+            max_width_in=_float(meta.get("max_width_in")),
+            max_depth_in=_float(meta.get("max_depth_in")),
+            tac=_float(meta.get("max_ink_coverage", meta.get("tac"))),
+            allow_rgb=_bool(meta.get("allow_rgb")),
+            allow_spot=_bool(meta.get("allow_spot")),
+            icc=str(icc) if icc else None,
+            meta=meta,
+        )
+
+
+def _iter_group(group: Any) -> Iterable[Tuple[str, Any]]:
+    # groups are mappings (name -> meta) in the YAML, plain name lists in older configs/tests
+    if isinstance(group, dict):
+        yield from ((str(k), v) for k, v in group.items())
+    elif isinstance(group, (list, tuple)):
+        yield from ((str(k), {}) for k in group if k)
+
+
+class PressIndex:
+    def __init__(self, records: Iterable[PressRecord]) -> None:
+        self.records: Dict[str, PressRecord] = {}
+        self._exact: Dict[str, PressRecord] = {}
+        self._by_tokens: List[Tuple[Tuple[str, ...], PressRecord]] = []
+        self._memo: LRUMemo[Optional[PressRecord]] = LRUMemo(_MEMO_SIZE)
+        for rec in records:
+            self.records.setdefault(rec.key, rec)
+        for rec in self.records.values():
+            aliases = rec.meta.get("aliases") or []
+            for name in [rec.key, *(aliases if isinstance(aliases, list) else [aliases])]:
+                s = slug(name)
+                if not s:
+                    continue
+                self._exact.setdefault(s, rec)
+                self._exact.setdefault(_compact(s), rec)
+                self._by_tokens.append((_tokens(s), rec))
+
+    @classmethod
+    def from_shop(cls, cfg: Mapping[str, Any]) -> "PressIndex":
+        records: List[PressRecord] = []
+        caps = cfg.get("press_capabilities") or {}
+        if isinstance(caps, dict):
+            for group, press_class in GROUP_CLASSES.items():
+                records += [PressRecord.from_meta(k, press_class, m) for k, m in _iter_group(caps.get(group))]
+        # flat `presses` (may repeat grouped presses; the grouped record wins)
+        records += [PressRecord.from_meta(k, "unknown", m) for k, m in _iter_group(cfg.get("presses"))]
+        return cls(records)
+
+    def lookup(self, name: Optional[str]) -> Optional[PressRecord]:
+        s = slug(name)
+        if not s:
+            return None
+        return self._memo.get(s, lambda: self._resolve(s))
+
+    def _resolve(self, s: str) -> Optional[PressRecord]:
+        rec = self._exact.get(s) or self._exact.get(_compact(s))
+        if rec is not None:
+            return rec
+        return self._token_match(_tokens(s)) or self._fuzzy(s)
+
+    def _token_match(self, name_tokens: Tuple[str, ...]) -> Optional[PressRecord]:
+        def has(tok: str) -> bool:
+            return any(t == tok or (len(tok) >= 3 and t.startswith(tok)) for t in name_tokens)
+
+        best: List[Tuple[int, PressRecord]] = []
+        for key_tokens, rec in self._by_tokens:
+            if key_tokens and all(has(t) for t in key_tokens):
+                best.append((len(key_tokens), rec))
+        if not best:
+            return None
+        top = max(n for n, _ in best)
+        winners = {rec.key: rec for n, rec in best if n == top}
+        return next(iter(winners.values())) if len(winners) == 1 else None
+
+    def _fuzzy(self, s: str) -> Optional[PressRecord]:
+        digits = _digits(s)
+        candidates = {k: rec for k, rec in self._exact.items() if "_" not in k and _digits(k) <= digits}
+        match = difflib.get_close_matches(_compact(s), list(candidates), n=1, cutoff=FUZZY_CUTOFF)
+        return candidates[match[0]] if match else None
+
+
+_INDEXES: SnapshotCache[PressIndex] = SnapshotCache(PressIndex.from_shop, _INDEX_CACHE_SIZE)
+
+
+def press_index(cfg: Optional[Mapping[str, Any]]) -> PressIndex:
+    """The PressIndex for a shop-config dict, built on first use (see snapshot_cache)."""
+    return _INDEXES.get(cfg)
+
+
+def resolve_press(cfg: Optional[Mapping[str, Any]], name: Optional[str]) -> Optional[PressRecord]:
+    return press_index(cfg).lookup(name)
@@ -2,9 +2,12 @@
 from __future__ import annotations
 
 import re
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Mapping, Optional, Tuple
 
-# Global shop config injected by the app/tests
+from prepress_helper.intent_rules import IntentMatch, load_intent_rules
+from prepress_helper.press_index import resolve_press
+
+# Fallback shop config for callers that do not pass `shop=` (set by the app/tests)
 SHOP_CFG: Dict[str, Any] = {}
 
 
@@ -18,40 +21,23 @@ def _normalize(s: str | None) -> str:
     return (s or "").strip().lower()
 
 
-def _is_wide_format_machine(name: str | None) -> bool:
+def _is_wide_format_machine(name: str | None, shop: Optional[Mapping[str, Any]] = None) -> bool:
     """
-    Heuristics + config-driven detection for wide-format printers.
-    Returns True for roll/flatbed wide-format devices.
+    Config-driven detection for wide-format printers, with keyword heuristics for
+    machines the shop config does not know. Returns True for roll/flatbed devices.
+    `shop` is the config the job was prepared with; SHOP_CFG when omitted.
     """
     machine = _normalize(name)
     if not machine:
         return False
 
-    # Obvious keyword hints
-    keyword_hits = ("latex", "flatbed", "arizona", "oce", "mimaki", "roland", "vutek")
-    if any(k in machine for k in keyword_hits):
-        return True
-
-    cfg = SHOP_CFG or {}
-
-    # press_capabilities from tests (roll/flatbed lists)
-    caps = cfg.get("press_capabilities") or {}
-    roll = [(_normalize(p)) for p in (caps.get("roll_printers") or [])]
-    flat = [(_normalize(p)) for p in (caps.get("flatbed_printers") or [])]
-    if machine in roll or machine in flat:
-        return True
-
-    # presses section with width hints
-    presses = cfg.get("presses") or {}
-    for pname, meta in presses.items():
-        if _normalize(pname) == machine:
-            max_w = (meta or {}).get("max_width_in", 0) or 0
-            try:
-                return float(max_w) >= 24.0
-            except Exception:
-                return False
+    # Known press: its class / max width decide (see press_index)
+    press = resolve_press(shop if shop is not None else SHOP_CFG, machine)
+    if press is not None:
+        return press.wide
 
-    return False
+    # Obvious keyword hints (intent_rules.yml: wide_machine)
+    return load_intent_rules().match(machine=machine).hit("wide_machine")
 
 
 def _maybe_color_policy(js) -> bool:
@@ -62,26 +48,18 @@ def _maybe_color_policy(js) -> bool:
     return bool(front or back)
 
 
-def _maybe_fold_math(message: str) -> bool:
-    msg = _normalize(message)
-    return any(k in msg for k in ("fold", "panel", "score", "crease"))
-
+def match_keywords(js, message: str) -> IntentMatch:
+    """One pass of the compiled intent rules over the message and the JobSpec's text fields."""
+    return load_intent_rules().match(
+        message=message,
+        product=getattr(js, "product", None),
+        stock=getattr(js, "stock", None),
+    )
 
-def _maybe_wide_format(js) -> bool:
-    # Prefer explicit machine hint
-    machine = (js.special or {}).get("machine")
-    if _is_wide_format_machine(machine):
-        return True
 
-    # Fallback on product/stock hints
-    product = _normalize(getattr(js, "product", None))
-    stock = _normalize(getattr(js, "stock", None))
-    if any(k in product for k in ("banner", "poster", "sign", "wide")):
-        return True
-    if any(k in stock for k in ("banner", "poly", "sav", "vinyl")):
-        return True
-
-    return False
+def message_hits(message: str) -> IntentMatch:
+    """Keyword hits in a message alone (memoized per matcher, so skills can ask cheaply)."""
+    return load_intent_rules().match(message=message)
 
 
 def fold_preferences_from_message(message: str) -> Tuple[str | None, float | None]:
@@ -93,8 +71,8 @@ def fold_preferences_from_message(message: str) -> Tuple[str | None, float | Non
     """
     msg = _normalize(message)
     style = None
-    for s in ("roll", "z", "gate", "half", "tri", "accordion"):
-        if re.search(rf"\b{s}\b", msg):
+    for s in ("double gate", "double parallel", "french", "roll", "z", "gate", "half", "tri", "accordion"):
+        if re.search(r"\b" + s.replace(" ", r"[\s-]") + r"\b", msg):
             style = s
             break
 
@@ -118,21 +96,23 @@ def fold_preferences_from_message(message: str) -> Tuple[str | None, float | Non
     return style, fold_in
 
 
-def detect_intents(js, message: str) -> list[str]:
+def detect_intents(js, message: str, shop: Optional[Mapping[str, Any]] = None) -> list[str]:
     """
     Decide which skills/modules to run for a given JobSpec + free-text message.
-    Always includes 'doc_setup'.
+    Always includes 'doc_setup'. `shop` resolves the ticket's machine (see _is_wide_format_machine).
     """
     intents: list[str] = ["doc_setup"]
 
     if _maybe_color_policy(js):
         intents.append("color_policy")
 
-    if _maybe_fold_math(message):
-        intents.append("fold_math")
-
-    if _maybe_wide_format(js):
-        intents.append("wide_format")
+    # keyword intents in rule-file order; a wide-format machine also implies wide_format
+    fired = set(match_keywords(js, message).intents)
+    if "wide_format" not in fired and _is_wide_format_machine((js.special or {}).get("machine"), shop):
+        fired.add("wide_format")
+    if (js.special or {}).get("press_sheet"):  # ticket carries a press sheet: cross-check the N-up
+        fired.add("imposition")
+    intents += [i for i in load_intent_rules().intent_order + ("wide_format", "imposition") if i in fired]
 
     # policy enforcer is useful on most sheet-fed/wide jobs
     intents.append("policy_enforcer")
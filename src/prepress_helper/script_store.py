@@ -0,0 +1,105 @@
+# src/prepress_helper/script_store.py
+"""
+Content-addressed, size-bounded store of rendered scripts.
+
+With scripts="ref", /advise hands out descriptors (id, name, sha256, size, href) instead
+of full script bodies; the body is fetched with GET /scripts/{id}. The id is a prefix of the content's
+sha256, so the same script rendered for many jobs is stored once and its ETag never
+changes.
+
+Descriptors are references into this process's memory, not render recipes: the bodies
+are rendered during /advise (scripts="ref" saves response bytes, not rendering; the
+default scripts="none" skips rendering) and kept only until evicted least-recently-used
+once `max_bytes` is exceeded. Ids therefore only work against the worker that issued
+them: after eviction, after a restart and on any other worker GET /scripts/{id} answers
+404 and the client re-runs /advise (the same content comes back under the same id).
+Behind more than one worker, use scripts="inline" or sticky sessions.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+ENV_SCRIPT_STORE_MAX_BYTES = "PRINTSSISTANT_SCRIPT_STORE_MAX_BYTES"
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+ID_LEN = 24
+
+
+@dataclass(frozen=True)
+class ScriptDescriptor:
+    id: str
+    name: str
+    sha256: str
+    size: int  # bytes, UTF-8
+
+    @property
+    def href(self) -> str:
+        return f"/scripts/{self.id}"
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.sha256}"'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "href": self.href}
+
+
+class ScriptStore:
+    """Thread-safe, process-local LRU of id -> (descriptor, body)."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, name: str, content: str) -> ScriptDescriptor:
+        body = content.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        desc = ScriptDescriptor(id=digest[:ID_LEN], name=name, sha256=digest, size=len(body))
+        with self._lock:
+            if desc.id in self._entries:
+                self._entries.move_to_end(desc.id)
+            else:
+                self._entries[desc.id] = (desc, body)
+                self._bytes += len(body)
+                while self._bytes > self.max_bytes and len(self._entries) > 1:
+                    _, (_, old) = self._entries.popitem(last=False)
+                    self._bytes -= len(old)
+        return desc
+
+    def describe(self, scripts: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """Store every script of an advise result; name -> descriptor dict."""
+        return {name: self.put(name, content).to_dict() for name, content in scripts.items()}
+
+    def get(self, script_id: str) -> Optional[tuple]:
+        """(descriptor, body bytes) or None if unknown / evicted."""
+        with self._lock:
+            item = self._entries.get(script_id)
+            if item is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(script_id)
+            return item
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def script_store_from_env() -> ScriptStore:
+    raw = os.environ.get(ENV_SCRIPT_STORE_MAX_BYTES, "").strip()
+    return ScriptStore(max_bytes=int(raw) if raw else DEFAULT_MAX_BYTES)
@@ -2,11 +2,12 @@ from __future__ import annotations
 
 from typing import Dict, List
 
+from ..config_loader import resolve_shop
 from ..jobspec import JobSpec
 
 
 def tips(job: JobSpec) -> List[str]:
-    shop = (job.special or {}).get("shop", {})
+    shop = resolve_shop(job)
     policies = shop.get("policies", {})
     t: List[str] = []
 
@@ -36,7 +37,7 @@ def tips(job: JobSpec) -> List[str]:
 
 
 def scripts(job: JobSpec) -> Dict[str, str]:
-    shop = (job.special or {}).get("shop", {})
+    shop = resolve_shop(job)
     policies = shop.get("policies", {})
     rb = job.special.get("rich_black") or policies.get("sleek_black") or policies.get("rich_black") or "60/40/40/100"
     icc = job.special.get("icc_profile") or policies.get("icc_profile", "US Web Coated (SWOP) v2")
@@ -3,10 +3,11 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Tuple
 
+from prepress_helper.config_loader import resolve_shop
+
 
 def _shop_policies(js) -> Dict[str, Any]:
-    special = getattr(js, "special", {}) or {}
-    shop = special.get("shop", {}) if isinstance(special, dict) else {}
+    shop = resolve_shop(js)
     return shop.get("policies", {}) if isinstance(shop, dict) else {}
 
 
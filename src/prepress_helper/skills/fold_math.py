@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import Dict, List
 
+from ..fold_solver import FoldLayout, layout_for
 from ..jobspec import JobSpec
 
 
@@ -11,33 +12,40 @@ def _axis_length(job: JobSpec) -> float:
     return max(job.trim_size.w_in, job.trim_size.h_in)
 
 
-def _trifold_panels(
-    total: float, style: str = "roll", fold_in: str = "right", offset_in: float = 1.0 / 16.0
-) -> List[float]:
-    if style == "z":
-        t = round(total / 3.0, 4)
-        return [t, t, t]
-    # roll fold: two equal outers, fold-in panel shorter by offset
-    outer = round((total + offset_in) / 3.0, 4)
-    inner = round(outer - offset_in, 4)
-    return [inner, outer, outer] if fold_in == "left" else [outer, outer, inner]
+def _inches(values) -> str:
+    return ", ".join(f'{v:.4g}"' for v in values)
+
+
+def _layout(job: JobSpec, style: str, fold_in: str) -> FoldLayout:
+    try:
+        return layout_for(job, style=style, fold_in=fold_in)
+    except ValueError:  # unknown style from free text: fall back to a roll fold
+        return layout_for(job, style="roll", fold_in=fold_in)
 
 
 def tips(job: JobSpec, style: str = "roll", fold_in: str = "right") -> List[str]:
     length = _axis_length(job)
+    fold = _layout(job, style, fold_in)
     if length < 8.0:
-        return ["Size looks too small for a tri-fold—confirm product and dimensions before placing fold guides."]
-    # prefer shop-configured offset if present
-    offset = float(job.special.get("fold_in_offset_in", 1.0 / 16.0)) if job.special else 1.0 / 16.0
-    panels = _trifold_panels(length, style=style, fold_in=fold_in, offset_in=offset)
+        return [
+            f"Size looks too small for the {fold.label.lower()}—confirm product and dimensions before placing"
+            " fold guides."
+        ]
     bleed = job.bleed_in or 0.125
     safety = job.safety_in or 0.125
-    return [
-        f"Tri-fold ({style}) along long edge: panel widths ≈ {', '.join(f'{p:.4g}\"' for p in panels)} (total {length}\").",
-        f'Add fold guides at {panels[0]:.4g}" and {(panels[0]+panels[1]):.4g}" from the left edge.',
+    t = [
+        f'{fold.label} along long edge: panel widths ≈ {_inches(fold.panels)} (total {length}").',
+        f"Add fold guides at {_inches(fold.positions)} from the left edge.",
+    ]
+    if fold.cross_positions:
+        t.append(f"Then fold across at {_inches(fold.cross_positions)} from the top edge.")
+    if any(a != b for a, b in zip(fold.panels, fold.panels[1:])):
+        t.append(f'Fold-in panels are {fold.offset:.4g}" shorter per nesting level for this stock.')
+    t += [
         f'Use {bleed}" bleed; keep type {safety}" from folds/trim.',
         "If your fold-in panel is opposite, flip which side is smaller.",
     ]
+    return t
 
 
 def scripts(job: JobSpec, style: str = "roll", fold_in: str = "right") -> Dict[str, str]:
@@ -45,14 +53,14 @@ def scripts(job: JobSpec, style: str = "roll", fold_in: str = "right") -> Dict[s
         w, h = 11.0, 8.5
     else:
         w, h = job.trim_size.w_in, job.trim_size.h_in
-    length = max(w, h)
-    offset = float(job.special.get("fold_in_offset_in", 1.0 / 16.0)) if job.special else 1.0 / 16.0
-    panels = _trifold_panels(length, style=style, fold_in=fold_in, offset_in=offset)
-    pos1 = round(panels[0] * 72, 3)
-    pos2 = round((panels[0] + panels[1]) * 72, 3)
+    fold = _layout(job, style, fold_in)
     bleed = job.bleed_in or 0.125
+    # guides run along the long edge: vertical on a landscape page, horizontal on a portrait one
+    long_is_x = w >= h
+    xs = ", ".join(str(round(p * 72, 3)) for p in fold.positions)
+    cross = ", ".join(str(round(p * 72, 3)) for p in fold.cross_positions)
     jsx = f"""
-// add_trifold_guides.jsx
+// add_fold_guides.jsx ({fold.label})
 (function(){{
   var bleed = {bleed};
   var w = {w}, h = {h};
@@ -63,7 +71,10 @@ def scripts(job: JobSpec, style: str = "roll", fold_in: str = "right") -> Dict[s
   }}
   var doc = app.activeDocument;
   function addV(x){{ var g = doc.guides.add(); g.orientation = Direction.VERTICAL; g.coordinate = x; }}
-  addV({pos1}); addV({pos2});
+  function addH(y){{ var g = doc.guides.add(); g.orientation = Direction.HORIZONTAL; g.coordinate = y; }}
+  var folds = [{xs}], cross = [{cross}];
+  for (var i=0;i<folds.length;i++){{ {"addV" if long_is_x else "addH"}(folds[i]); }}
+  for (var j=0;j<cross.length;j++){{ {"addH" if long_is_x else "addV"}(cross[j]); }}
 }})();
 """
     return {"illustrator_jsx_trifold_guides": jsx}
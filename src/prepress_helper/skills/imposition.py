@@ -0,0 +1,52 @@
+# src/prepress_helper/skills/imposition.py
+from __future__ import annotations
+
+from typing import Dict, List
+
+from ..imposition_solver import plan_for
+from ..jobspec import JobSpec
+
+
+def _in(x: float) -> str:
+    return f"{x:g}"
+
+
+def tips(job: JobSpec) -> List[str]:
+    plan = plan_for(job)
+    if plan is None:
+        return []
+    lay = plan.layout
+    sw, sh = plan.sheet
+    if lay.n == 0:
+        return [
+            f"Trim {_in(plan.trim[0])}×{_in(plan.trim[1])} in (with bleed) "
+            f"does not fit the {_in(sw)}×{_in(sh)} in sheet."
+        ]
+
+    out = [
+        f"Best fit on {_in(sw)}×{_in(sh)} in sheet: {lay.n}-up ({lay.label}) at "
+        f"{_in(lay.cell_w)}×{_in(lay.cell_h)} in cells, gutter {_in(plan.gutter)} in; "
+        f"{plan.waste:.0%} of the sheet is waste."
+    ]
+    if plan.ticket_n:
+        ticket = f"{plan.ticket_n}-up" + (f" ({plan.ticket_label})" if plan.ticket_label else "")
+        if plan.ticket_n < lay.n:
+            saved = ""
+            if plan.sheets_at_best and plan.sheets_required:
+                saved = f" ({plan.sheets_required} → {plan.sheets_at_best} run sheets)"
+            out.append(f"Ticket imposes {ticket}; {lay.n}-up fits{saved}. Check the layout before plating.")
+        elif plan.ticket_n > lay.n:
+            out.append(
+                f"Ticket imposes {ticket} but only {lay.n}-up fits with bleed and gutters; "
+                "confirm cell size and grippers."
+            )
+        else:
+            out.append(f"Ticket imposition {ticket} matches the best fit.")
+    if plan.overhead_sheets and plan.total_sheets:
+        share = plan.overhead_sheets / plan.total_sheets
+        out.append(f"Make-ready + spoils: {plan.overhead_sheets} of {plan.total_sheets} sheets ({share:.0%}).")
+    return out
+
+
+def scripts(job: JobSpec) -> Dict[str, str]:
+    return {}
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
 import re
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
+from prepress_helper.config_loader import resolve_shop
 from prepress_helper.jobspec import JobSpec
+from prepress_helper.press_index import resolve_press
+from prepress_helper.stock_index import resolve_stock
 
 
 def _shop(js: JobSpec) -> Dict[str, Any]:
-    sp = js.special or {}
-    return sp.get("shop", {}) if isinstance(sp, dict) else {}
+    return resolve_shop(js)
 
 
 def _pol(js: JobSpec) -> Dict[str, Any]:
@@ -16,12 +18,29 @@ def _pol(js: JobSpec) -> Dict[str, Any]:
 
 
 def _is_wide_machine(js: JobSpec) -> bool:
-    sp = js.special or {}
-    machine = (sp.get("machine") or "").lower()
-    caps = _shop(js).get("press_capabilities", {}) or {}
-    rolls = [s.lower() for s in caps.get("roll_printers", [])]
-    flats = [s.lower() for s in caps.get("flatbed_printers", [])]
-    return bool(machine) and (machine in rolls or machine in flats)
+    press = resolve_press(_shop(js), (js.special or {}).get("machine"))
+    return press is not None and press.wide
+
+
+def _nag_enabled(pol: Dict[str, Any], name: str) -> bool:
+    sn = pol.get("soft_nags")
+    if sn is True:  # legacy truthy
+        return True
+    return isinstance(sn, dict) and sn.get("enable") is not False and bool(sn.get(name, True))
+
+
+def stock_rule_nag(js: JobSpec) -> Optional[str]:
+    """
+    A stock rule (fold-in offset, min text) matched loosely: ask to confirm it is the same
+    sheet. Stocks without a rule use the defaults quietly; most stocks have none.
+    """
+    shop = _shop(js)
+    if not js.stock or not shop.get("stocks"):
+        return None
+    match = resolve_stock(shop, js)
+    if match is not None and match.how != "exact":
+        return f"Soft-nag: Using stock rule '{match.rule.name}' for '{js.stock}'; confirm it is the same sheet."
+    return None
 
 
 def tips(js: JobSpec, message: str) -> List[str]:
@@ -79,6 +98,12 @@ def soft_nags(js: JobSpec) -> List[str]:
     if _is_wide_machine(js):
         out.append('Soft-nag: Confirm grommet spacing; assuming 12" by default.')
 
+    # Stock without an exact shop stock rule
+    if _nag_enabled(pol, "stock_rules"):
+        nag = stock_rule_nag(js)
+        if nag:
+            out.append(nag)
+
     return out
 
 
@@ -3,11 +3,13 @@ from __future__ import annotations
 
 from typing import Dict, List, Optional
 
+from ..config_loader import resolve_shop
 from ..jobspec import JobSpec
+from .policy_enforcer import stock_rule_nag
 
 
 def _shop(job: JobSpec) -> Dict:
-    return (job.special or {}).get("shop", {})  # type: ignore
+    return resolve_shop(job)
 
 
 def _policies(job: JobSpec) -> Dict:
@@ -82,7 +84,13 @@ def tips(job: JobSpec, message: str = "", intents: Optional[List[str]] = None) -
         if not isinstance(grom, (int, float)):
             out.append(f'Soft-nag: Confirm grommet spacing; assuming {default_grom:.0f}" by default.')
 
-    # 3) ICC profile presence
+    # 3) Stock rules matched loosely or not at all (same nag the pipeline runs via policy_enforcer)
+    if _enabled(job, "stock_rules"):
+        nag = stock_rule_nag(job)
+        if nag:
+            out.append(nag)
+
+    # 4) ICC profile presence
     if _enabled(job, "icc_missing"):
         icc = _find_icc(job)
         if not icc:
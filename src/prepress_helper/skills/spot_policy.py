@@ -2,10 +2,9 @@ from __future__ import annotations
 
 from typing import Any, Dict, List
 
-from prepress_helper.config_loader import load_shop_config
+from prepress_helper.config_loader import resolve_shop
 from prepress_helper.jobspec import JobSpec
-
-SHOP = load_shop_config("config")
+from prepress_helper.router import message_hits
 
 
 def _get(cfg: Dict[str, Any], path: str, default=None):
@@ -19,7 +18,8 @@ def _get(cfg: Dict[str, Any], path: str, default=None):
 
 def tips(js: JobSpec, intents: List[str], msg: str) -> List[str]:
     out: List[str] = []
-    spot_cfg = _get(SHOP, "policies.spot_policy", {}) or {}
+    shop = resolve_shop(js)
+    spot_cfg = _get(shop, "policies.spot_policy", {}) or {}
 
     allow_sheet = bool(spot_cfg.get("allow_spot_on_sheet_fed", False))
     allow_wide = bool(spot_cfg.get("allow_spot_on_wide_format", True))
@@ -46,8 +46,7 @@ def tips(js: JobSpec, intents: List[str], msg: str) -> List[str]:
             out.append("Convert Pantone/spot colors to CMYK for sheet-fed production unless explicitly required.")
 
     # Message nudge if Pantone mentioned
-    m = (msg or "").lower()
-    if any(k in m for k in ("pantone", "pms", "spot", "varnish", "foil", "white ink", "white spot")):
+    if message_hits(msg or "").hit("spot"):  # intent_rules.yml: spot
         if is_wide and allow_wide:
             out.append("Verify spot channels map correctly in RIP (e.g., 'White'/'Gloss').")
         else:
@@ -57,7 +56,8 @@ def tips(js: JobSpec, intents: List[str], msg: str) -> List[str]:
 
 
 def scripts(js: JobSpec, intents: List[str], msg: str) -> Dict[str, str]:
-    spot_cfg = _get(SHOP, "policies.spot_policy", {}) or {}
+    shop = resolve_shop(js)
+    spot_cfg = _get(shop, "policies.spot_policy", {}) or {}
     whitelist = set(spot_cfg.get("whitelist_spots", []))
     add_white = "White" in whitelist
 
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
+from ..config_loader import resolve_shop
+from ..grommets import grommet_progression
 from ..jobspec import JobSpec
+from ..press_index import PressRecord, resolve_press
 
 
 def _dims(job: JobSpec) -> Tuple[float, float]:
@@ -12,7 +15,12 @@ def _dims(job: JobSpec) -> Tuple[float, float]:
 
 
 def _get_shop(job: JobSpec) -> Dict:
-    return (job.special or {}).get("shop", {})
+    return resolve_shop(job)
+
+
+def _get_press(job: JobSpec) -> Optional[PressRecord]:
+    special = job.special or {}
+    return resolve_press(_get_shop(job), special.get("press") or special.get("machine"))
 
 
 def _get_preset(job: JobSpec) -> Dict:
@@ -26,17 +34,15 @@ def _get_preset(job: JobSpec) -> Dict:
 
 def _is_rgb_allowed(job: JobSpec) -> bool:
     # precedence: product preset -> press -> policies
-    shop = _get_shop(job)
-    presses = shop.get("presses", {})
-    policies = shop.get("policies", {})
+    policies = _get_shop(job).get("policies", {})
     preset = _get_preset(job)
 
     if "allow_rgb" in preset:
         return bool(preset["allow_rgb"])
 
-    press_key = (job.special or {}).get("press")
-    if press_key and press_key in presses and "allow_rgb" in presses[press_key]:
-        return bool(presses[press_key]["allow_rgb"])
+    press = _get_press(job)
+    if press is not None and press.allow_rgb is not None:
+        return press.allow_rgb
 
     allow = policies.get("allow_rgb")
     return bool(allow) if allow is not None else False
@@ -67,14 +73,31 @@ def _grommet(job: JobSpec) -> Tuple[float | None, float | None]:
     return gm, gs
 
 
+def _grommet_finish(job: JobSpec) -> Tuple[float | None, bool]:
+    """(hole diameter in inches, corners_only) from the preset's finishing.grommet block."""
+    finishing = _get_preset(job).get("finishing") or {}
+    spec = finishing.get("grommet") if isinstance(finishing, dict) else None
+    if not isinstance(spec, dict):
+        return None, False
+    try:
+        diameter = float(spec["diameter_in"]) if spec.get("diameter_in") else None
+    except Exception:
+        diameter = None
+    return diameter, bool(spec.get("corners_only", False))
+
+
 def _icc(job: JobSpec) -> str | None:
-    # precedence: product preset -> job.special -> policies
+    # precedence: product preset -> job.special -> press -> policies
     preset = _get_preset(job)
     if "icc_profile" in preset and preset["icc_profile"]:
         return str(preset["icc_profile"])
-    shop = _get_shop(job)
-    policies = shop.get("policies", {})
-    return (job.special or {}).get("icc_profile") or policies.get("icc_profile")
+    if (job.special or {}).get("icc_profile"):
+        return (job.special or {}).get("icc_profile")
+    press = _get_press(job)
+    if press is not None and press.icc:
+        return press.icc
+    policies = _get_shop(job).get("policies", {})
+    return policies.get("icc_profile")
 
 
 def tips(job: JobSpec) -> List[str]:
@@ -101,8 +124,13 @@ def tips(job: JobSpec) -> List[str]:
 
     if gm:
         t.append(f'Keep critical content ≥ {gm}" from all edges (grommet/safe margin).')
-    if gs:
+    diameter, corners_only = _grommet_finish(job)
+    if corners_only:
+        t.append("Grommets at the corners only.")
+    elif gs:
         t.append(f'Plan grommets ~every {gs}" along edges unless specified otherwise.')
+    if diameter and (gs or corners_only):
+        t.append(f'Grommet holes are {diameter}" across; keep them clear of text and cut lines.')
 
     return t
 
@@ -112,6 +140,7 @@ def scripts(job: JobSpec) -> Dict[str, str]:
     bleed = job.bleed_in or 0.0
     safety = job.safety_in or 0.25
     gm, gs = _grommet(job)
+    diameter, corners_only = _grommet_finish(job)
 
     # Safety guides
     left = round(safety * 72, 3)
@@ -119,34 +148,29 @@ def scripts(job: JobSpec) -> Dict[str, str]:
     top = round(safety * 72, 3)
     bot = round((h - safety) * 72, 3)
 
-    grom_vert = ""
-    grom_horz = ""
-    if gs and gm is not None:
-        # vertical positions
-        xs = []
-        x = gm
-        endx = max(gm, w - gm)
-        while x <= endx + 1e-6:
-            xs.append(round(x * 72, 3))
-            x += gs
-        # horizontal positions
-        ys = []
-        y = gm
-        endy = max(gm, h - gm)
-        while y <= endy + 1e-6:
-            ys.append(round(y * 72, 3))
-            y += gs
-
-        xs_str = ", ".join(str(v) for v in xs)
-        ys_str = ", ".join(str(v) for v in ys)
-        grom_vert = f"""
-  // Grommet vertical guides
-  var xs = [{xs_str}];
-  for (var i=0;i<xs.length;i++){{ addV(xs[i]); }}"""
-        grom_horz = f"""
-  // Grommet horizontal guides
-  var ys = [{ys_str}];
-  for (var j=0;j<ys.length;j++){{ addH(ys[j]); }}"""
+    # Grommets: start/step/count per axis, expanded by a JSX loop, so the script size
+    # does not grow with banner length.
+    grommets = ""
+    if (gs or corners_only) and gm is not None:
+        x0, dx, nx = grommet_progression(w, gm, gs or 0.0, corners_only)
+        y0, dy, ny = grommet_progression(h, gm, gs or 0.0, corners_only)
+        grommets = f"""
+  // Grommet guides: start + i*step (points)
+  var gx0 = {round(x0 * 72, 3)}, gdx = {round(dx * 72, 3)}, gnx = {nx};
+  var gy0 = {round(y0 * 72, 3)}, gdy = {round(dy * 72, 3)}, gny = {ny};
+  for (var i=0;i<gnx;i++){{ addV(gx0 + i*gdx); }}
+  for (var j=0;j<gny;j++){{ addH(gy0 + j*gdy); }}"""
+        if diameter:
+            grommets += f"""
+  // Grommet hole marks ({diameter} in) along the edges, on a non-printing layer
+  var r = {round(diameter * 72 / 2, 3)}, gx1 = gx0 + (gnx-1)*gdx, gy1 = gy0 + (gny-1)*gdy;
+  var layer = doc.layers.add(); layer.name = "Grommets"; layer.printable = false;
+  function hole(x, y){{
+    var o = layer.pathItems.ellipse(-(y-r), x-r, 2*r, 2*r);  // top, left, width, height; y grows up
+    o.filled = false; o.stroked = true;
+  }}
+  for (var a=0;a<gnx;a++){{ hole(gx0 + a*gdx, gy0); if (gny>1) hole(gx0 + a*gdx, gy1); }}
+  for (var b=1;b<gny-1;b++){{ hole(gx0, gy0 + b*gdy); if (gnx>1) hole(gx1, gy0 + b*gdy); }}"""
 
     jsx = f"""
 // wide_format_guides.jsx
@@ -162,7 +186,7 @@ def scripts(job: JobSpec) -> Dict[str, str]:
   function addH(y){{ var g = doc.guides.add(); g.orientation = Direction.HORIZONTAL; g.coordinate = y; }}
   // Safety guides
   addV({left}); addV({right});
-  addH({top});  addH({bot});{grom_vert}{grom_horz}
+  addH({top});  addH({bot});{grommets}
 }})();
 """
     return {"illustrator_jsx_wide_format_guides": jsx}
@@ -0,0 +1,75 @@
+# src/prepress_helper/snapshot_cache.py
+"""
+Caches shared by the lookup indexes built from shop-config snapshots (press_index,
+stock_index).
+
+SnapshotCache keeps the object built for each of a handful of recent snapshots. Snapshots
+are immutable, so the dict's identity stands in for its version; the entry holds the dict
+so its id cannot be reused while cached. A missing or empty config maps to one shared
+object, built once. LRUMemo memoizes an index's lookups (hits and misses).
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Mapping, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+V = TypeVar("V")
+_MISSING = object()
+
+
+class SnapshotCache(Generic[T]):
+    def __init__(self, build: Callable[[Mapping[str, Any]], T], size: int = 8) -> None:
+        self.build = build
+        self.size = size
+        self._entries: "OrderedDict[int, Tuple[Mapping[str, Any], T]]" = OrderedDict()
+        self._empty: Optional[T] = None
+        self._lock = threading.Lock()
+
+    def get(self, cfg: Optional[Mapping[str, Any]]) -> T:
+        if not cfg:
+            if self._empty is None:
+                self._empty = self.build({})
+            return self._empty
+        with self._lock:
+            hit = self._entries.get(id(cfg))
+            if hit is not None and hit[0] is cfg:
+                self._entries.move_to_end(id(cfg))
+                return hit[1]
+        value = self.build(cfg)
+        with self._lock:
+            self._entries[id(cfg)] = (cfg, value)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._empty = None
+
+
+class LRUMemo(Generic[V]):
+    """Thread-safe, size-bounded memo; `compute` runs outside the lock."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._entries: "OrderedDict[Hashable, V]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, compute: Callable[[], V]) -> V:
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+                return value  # type: ignore[return-value]
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            if len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,196 @@
+# src/prepress_helper/stock_index.py
+"""
+Stock name -> stock rule (config/stock_rules.yml) resolution.
+
+Tickets name stock in free text ("130# Pro Digital Silk Cover", "12pt. Pro Digital Knight
+C1S") and PrintIQ adds a StockCode and a weight. A StockIndex is built once per
+shop-config snapshot and resolves, in order:
+
+  1. exact normalized name, alias or code (`#` reads as `lb`, punctuation ignored)
+  2. the ticket's stock code
+  3. tokens: every token of a rule name appears in the stock text; most specific wins
+  4. trigrams: best Dice similarity over an inverted trigram index, limited to rules
+     whose weights/numbers all appear in the text
+
+Steps 1-2 are dict lookups and 3-4 only score rules that share a token / trigram with
+the text, so cost does not grow with the size of the catalogue. Results (hits and
+misses) are memoized per index.
+"""
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+from prepress_helper.jobspec import JobSpec
+from prepress_helper.snapshot_cache import LRUMemo, SnapshotCache
+
+TRIGRAM_CUTOFF = 0.6
+_MEMO_SIZE = 4096
+_INDEX_CACHE_SIZE = 8
+
+
+def normalize_stock(text: Any) -> str:
+    s = str(text or "").lower()
+    s = re.sub(r"(\d)\s*#", r"\1lb", s)  # 100# -> 100lb
+    s = re.sub(r"[^a-z0-9.]+", " ", s)
+    s = re.sub(r"(?<!\d)\.|\.(?!\d)", " ", s)  # keep decimal points only
+    return " ".join(s.split())
+
+
+def _tokens(s: str) -> Tuple[str, ...]:
+    return tuple(s.split())
+
+
+def _compact(s: str) -> str:
+    return s.replace(" ", "")
+
+
+def _numbers(s: str) -> FrozenSet[str]:
+    return frozenset(re.findall(r"\d+(?:\.\d+)?", s))
+
+
+def _trigrams(s: str) -> FrozenSet[str]:
+    padded = f"  {_compact(s)} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def _float(v: Any) -> Optional[float]:
+    try:
+        return float(v) if v is not None and v != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class StockRule:
+    name: str
+    fold_in_offset_in: Optional[float] = None
+    min_text_pt: Optional[float] = None
+    caliper_in: Optional[float] = None
+    meta: Mapping[str, Any] = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def from_meta(cls, meta: Mapping[str, Any]) -> "StockRule":
+        return cls(
+            name=str(meta.get("name", "")),
+            fold_in_offset_in=_float(meta.get("fold_in_offset_in")),
+            min_text_pt=_float(meta.get("min_text_pt")),
+            caliper_in=_float(meta.get("caliper_in")),
+            meta=meta,
+        )
+
+
+@dataclass(frozen=True)
+class StockMatch:
+    rule: StockRule
+    how: str  # exact | code | tokens | trigram
+
+
+def _as_list(v: Any) -> List[str]:
+    if v is None:
+        return []
+    return [str(x) for x in v] if isinstance(v, (list, tuple)) else [str(v)]
+
+
+class StockIndex:
+    def __init__(self, rules: Iterable[StockRule]) -> None:
+        self.rules: List[StockRule] = []
+        self._exact: Dict[str, StockRule] = {}
+        self._codes: Dict[str, StockRule] = {}
+        self._names: List[Tuple[Tuple[str, ...], FrozenSet[str], FrozenSet[str], StockRule]] = []
+        self._by_token: Dict[str, Set[int]] = {}
+        self._by_trigram: Dict[str, Set[int]] = {}
+        self._memo: LRUMemo[Optional[StockMatch]] = LRUMemo(_MEMO_SIZE)
+        for rule in rules:
+            if not rule.name:
+                continue
+            self.rules.append(rule)
+            for code in _as_list(rule.meta.get("codes")):
+                self._codes.setdefault(_compact(normalize_stock(code)), rule)
+            for name in [rule.name, *_as_list(rule.meta.get("aliases"))]:
+                s = normalize_stock(name)
+                if not s:
+                    continue
+                self._exact.setdefault(s, rule)
+                self._exact.setdefault(_compact(s), rule)
+                i = len(self._names)
+                self._names.append((_tokens(s), _numbers(s), _trigrams(s), rule))
+                for tok in _tokens(s):
+                    self._by_token.setdefault(tok, set()).add(i)
+                for tri in _trigrams(s):
+                    self._by_trigram.setdefault(tri, set()).add(i)
+
+    @classmethod
+    def from_shop(cls, cfg: Mapping[str, Any]) -> "StockIndex":
+        stocks = cfg.get("stocks") or []
+        return cls(StockRule.from_meta(m) for m in stocks if isinstance(m, dict))
+
+    def lookup(
+        self, stock: Optional[str], code: Optional[str] = None, weight: Optional[str] = None
+    ) -> Optional[StockMatch]:
+        s, c, w = normalize_stock(stock), _compact(normalize_stock(code)), normalize_stock(weight)
+        if not (s or c):
+            return None
+        return self._memo.get((s, c, w), lambda: self._resolve(s, c, w))
+
+    def _resolve(self, s: str, code: str, weight: str) -> Optional[StockMatch]:
+        rule = self._exact.get(s) or self._exact.get(_compact(s)) if s else None
+        if rule is not None:
+            return StockMatch(rule, "exact")
+        rule = self._codes.get(code) or self._exact.get(code) if code else None
+        if rule is not None:
+            return StockMatch(rule, "code")
+        if not s:
+            return None
+        text = f"{s} {weight}".strip()
+        rule = self._token_match(_tokens(text))
+        if rule is not None:
+            return StockMatch(rule, "tokens")
+        rule = self._trigram_match(s, _numbers(text))
+        return StockMatch(rule, "trigram") if rule is not None else None
+
+    def _token_match(self, text_tokens: Tuple[str, ...]) -> Optional[StockRule]:
+        present = set(text_tokens)
+        candidates: Set[int] = set().union(*(self._by_token.get(t, set()) for t in present)) if present else set()
+        best: List[Tuple[int, StockRule]] = []
+        for i in candidates:
+            tokens, _, _, rule = self._names[i]
+            if all(t in present for t in tokens):
+                best.append((len(tokens), rule))
+        if not best:
+            return None
+        top = max(n for n, _ in best)
+        winners = {r.name: r for n, r in best if n == top}
+        return next(iter(winners.values())) if len(winners) == 1 else None
+
+    def _trigram_match(self, s: str, numbers: FrozenSet[str]) -> Optional[StockRule]:
+        grams = _trigrams(s)
+        shared: Counter = Counter()
+        for tri in grams:
+            for i in self._by_trigram.get(tri, ()):
+                shared[i] += 1
+        best, best_score = None, TRIGRAM_CUTOFF
+        for i, n in shared.items():
+            _, rule_numbers, rule_grams, rule = self._names[i]
+            if not rule_numbers <= numbers:
+                continue  # "80lb" never resolves to a "100lb" rule
+            score = 2.0 * n / (len(grams) + len(rule_grams))
+            if score > best_score:
+                best, best_score = rule, score
+        return best
+
+
+_INDEXES: SnapshotCache[StockIndex] = SnapshotCache(StockIndex.from_shop, _INDEX_CACHE_SIZE)
+
+
+def stock_index(cfg: Optional[Mapping[str, Any]]) -> StockIndex:
+    """The StockIndex for a shop-config dict, built on first use (see snapshot_cache)."""
+    return _INDEXES.get(cfg)
+
+
+def resolve_stock(cfg: Optional[Mapping[str, Any]], js: JobSpec) -> Optional[StockMatch]:
+    """Stock rule for a job from its stock text, special.stock_code and special.stock_weight."""
+    special = js.special or {}
+    return stock_index(cfg).lookup(js.stock, special.get("stock_code"), special.get("stock_weight"))
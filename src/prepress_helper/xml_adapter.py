@@ -3,16 +3,26 @@ from __future__ import annotations
 
 import math
 import re
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
 
-import yaml
 from lxml import etree as ET
 
+from prepress_helper import xml_parsers
 from prepress_helper.jobspec import JobSpec
-
-
-def _assign(cursor: Dict[str, Any], dotted: str, value: Any) -> None:
-    parts = dotted.split(".")
+from prepress_helper.mapping_plan import MappingPlan, MappingRule, load_mapping_plan
+from prepress_helper.parse_cache import ParseCache
+from prepress_helper.xml_parsers import XMLTooLargeError
+from prepress_helper.xml_stream import (
+    STREAM_EVENTS,
+    LocalNameIndex,
+    first_pair_in_text,
+    select_plan_for_root,
+    stream_extract,
+    stream_extractor,
+)
+
+
+def _assign(cursor: Dict[str, Any], parts: Sequence[str], value: Any) -> None:
     for p in parts[:-1]:
         if p not in cursor or not isinstance(cursor[p], dict):
             cursor[p] = {}
@@ -80,6 +90,63 @@ def _as_clean_int_str(val: Any) -> str | None:
     return None
 
 
+def _finite(val: Any) -> float | None:
+    """A positive finite number (XPath number() yields NaN for missing nodes), else None."""
+    try:
+        f = float(val)
+    except (TypeError, ValueError):
+        return None
+    return round(f, 6) if math.isfinite(f) and f > 0 else None
+
+
+_RE_HHMM = re.compile(r"^\s*(-?\d+)\s*:\s*(-?\d+)\s*$")
+
+
+def _hours(text: Any) -> float:
+    """PrintIQ 'HH:   MM' -> hours ('04:   -15' is 3.75); anything else counts as 0."""
+    m = _RE_HHMM.match(str(text or ""))
+    if not m:
+        return 0.0
+    return max(round(int(m.group(1)) + int(m.group(2)) / 60, 4), 0.0)
+
+
+def _operations(raw: Any) -> List[Dict[str, Any]]:
+    """Mapped operation records -> [{key, name, machine, mr_h, run_h[, quantity]}], one per OperationKey."""
+    if not isinstance(raw, list):
+        return []
+    out, seen = [], set()
+    for rec in raw:
+        key = str(rec.get("key") or "").strip()
+        machine = str(rec.get("machine") or "").strip()
+        if not machine or (key and key in seen):
+            continue
+        seen.add(key)
+        op: Dict[str, Any] = {
+            "key": key,
+            "name": str(rec.get("name") or "").strip() or rec.get("element", ""),
+            "machine": machine,
+            "mr_h": _hours(rec.get("mr")),
+            "run_h": _hours(rec.get("run")),
+        }
+        quantity = _finite(rec.get("quantity"))
+        if quantity:
+            op["quantity"] = int(quantity)
+        out.append(op)
+    return out
+
+
+def _press_sheet(raw: Any) -> Dict[str, float] | None:
+    """Numeric press-sheet fields that are present (0 kept: a zero gripper is meaningful)."""
+    if not isinstance(raw, dict):
+        return None
+    out = {}
+    for k, v in raw.items():
+        f = _finite(v) if v != 0 else 0.0
+        if f is not None:
+            out[k] = int(f) if f.is_integer() and not k.endswith(("_w", "_h")) else f
+    return out if out.get("sheet_w") and out.get("sheet_h") else None
+
+
 def _normalize_imposition_pair(text: str) -> str | None:
     """Normalize '8x4', '8×4', '8 X 4', '8 by 4' -> '8x4'."""
     s = (text or "").strip().lower()
@@ -96,95 +163,255 @@ def _normalize_imposition_pair(text: str) -> str | None:
     return None
 
 
-def _first_int_from_nodes_text(tree: ET._ElementTree, needle: str) -> str | None:
-    """First integer from any node where local-name() contains `needle` (element text)."""
-    ln_lower = "abcdefghijklmnopqrstuvwxyz"
-    ln_upper = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-    try:
-        nodes = tree.xpath(
-            f"//*[contains(translate(local-name(), '{ln_upper}', '{ln_lower}'), '{needle.lower()}')]/text()"
-        )
-    except Exception:
-        nodes = []
-    for t in nodes:
-        m = re.search(r"\d+", (t or "").strip())
-        if m:
-            return str(int(m.group(0)))
-    return None
-
-
-def _first_int_from_attrs(tree: ET._ElementTree, needle: str) -> str | None:
-    """First integer from any attribute whose local-name contains `needle`."""
-    root = tree.getroot()
-    for el in root.iter():
-        for k, v in el.attrib.items():
-            lname = k.split("}")[-1].lower()
-            if needle.lower() in lname:
-                m = re.search(r"\d+", (v or "").strip())
-                if m:
-                    return str(int(m.group(0)))
-    return None
-
-
 def _extract_across_down_from_xml(tree: ET._ElementTree) -> Tuple[str | None, str | None]:
     """
     Pull Across/Down from XML, namespace-agnostic.
     We check:
       1) element text where local-name contains 'across' / 'down'
       2) attributes whose names contain 'across' / 'down'
+    Both come from one walk that indexes every local-name (see LocalNameIndex).
+    """
+    return LocalNameIndex.from_tree(tree.getroot()).across_down()
+
+
+def _resolve_plan(mapping: str | MappingPlan) -> MappingPlan:
+    return mapping if isinstance(mapping, MappingPlan) else load_mapping_plan(mapping)
+
+
+class _TreeFallback:
+    """Imposition fallback scans over a fully built tree (only run when the mapping misses)."""
+
+    def __init__(self, tree: ET._ElementTree) -> None:
+        self.tree = tree
+
+    def across_down(self) -> Tuple[str | None, str | None]:
+        return _extract_across_down_from_xml(self.tree)
+
+    def first_pair(self) -> Optional[Tuple[int, int]]:
+        return first_pair_in_text(self.tree.getroot().itertext())
+
+
+def _map_tree(plan: MappingPlan, tree: ET._ElementTree) -> Tuple[JobSpec, Dict[str, Any]]:
+    plan = select_plan_for_root(plan, tree.getroot())
+    values = plan.evaluate(tree)
+    return _build_jobspec(plan, values, _TreeFallback(tree)), values
+
+
+def _from_tree(plan: MappingPlan, tree: ET._ElementTree) -> JobSpec:
+    return _map_tree(plan, tree)[0]
+
+
+def _has_value(v: Any) -> bool:
+    if v is None:
+        return False
+    if isinstance(v, float) and math.isnan(v):
+        return False
+    return not (isinstance(v, str) and v.strip() == "")
+
+
+def _check_tree_size(size: Optional[int], what: Any, plan: MappingPlan) -> None:
+    cfg = xml_parsers.get_parser_config()
+    if size is not None and cfg.too_large(size):
+        raise XMLTooLargeError(
+            f"{what}: {size} bytes exceeds the {cfg.max_bytes}-byte limit for a full parse "
+            f"(mapping {plan.source} cannot be streamed)"
+        )
+
+
+def _sections_from_tree(plan: MappingPlan, tree: ET._ElementTree) -> List[JobSpec]:
+    """
+    One JobSpec per component element selected by the plan's `sections` block.
+    Job-level rules run once; per section only the (small, relative) section rules run.
+    """
+    plan = select_plan_for_root(plan, tree.getroot())
+    job_values = plan.evaluate(tree)
+    found = plan.sections.xpath(tree) if plan.sections is not None else []
+    sections = [el for el in found if isinstance(el, ET._Element)] if isinstance(found, list) else []
+    if not sections:
+        return [_build_jobspec(plan, job_values, _TreeFallback(tree))]
+
+    section_plan = plan.sections
+    out: List[JobSpec] = []
+    for index, el in enumerate(sections):
+        values = dict(job_values)
+        label: Dict[str, Any] = {"index": index}
+        section_rules = []
+        raw = section_plan.evaluate(el)  # type: ignore[union-attr]
+        for rule in section_plan.rules:  # type: ignore[union-attr]
+            if rule.target not in raw:
+                continue
+            v = raw[rule.target]
+            if rule.parts[0] == "section":
+                _assign(label, rule.parts[1:], v)
+            elif _has_value(v):
+                values[rule.target] = v
+                section_rules.append(rule)
+        # imposition fallback scans only look inside this section
+        out.append(_build_jobspec(plan, values, _TreeFallback(ET.ElementTree(el)), section_rules, label))
+    return out
+
+
+def load_jobspec_sections_from_xml(xml_path: str, map_yaml_path: str | MappingPlan) -> List[JobSpec]:
+    """
+    Section-aware variant of load_jobspec_from_xml: one parse, one JobSpec per Section
+    (special.section = {index, name, type}). Jobs without sections yield a single spec.
+    """
+    plan = _resolve_plan(map_yaml_path)
+    _check_tree_size(xml_parsers.source_size(xml_path), xml_path, plan)
+    return _sections_from_tree(plan, xml_parsers.parse(xml_path))
+
+
+def load_jobspec_sections_from_bytes(data: bytes, map_yaml_path: str | MappingPlan) -> List[JobSpec]:
+    plan = _resolve_plan(map_yaml_path)
+    _check_tree_size(len(data), "<bytes>", plan)
+    return _sections_from_tree(plan, xml_parsers.fromstring(data).getroottree())
+
+
+def load_jobspec_from_xml(
+    xml_path: str,
+    map_yaml_path: str | MappingPlan,
+    *,
+    stream: bool = False,
+    cache: ParseCache | None = None,
+) -> JobSpec:
+    """
+    Parse a job ticket into a JobSpec.
+    `map_yaml_path` may be a mapping YAML path (compiled once and cached) or a MappingPlan.
+
+    stream=True resolves every mapped field in one iterparse pass and discards elements as it
+    goes (flat memory on large tickets). Mappings that need a full tree fall back to tree mode.
+
+    With a ParseCache, the file bytes are hashed first and a hit returns without parsing.
+
+    Documents over the parser size cap (see xml_parsers) are always streamed; if the mapping
+    needs a full tree they are refused with XMLTooLargeError.
     """
-    across = _first_int_from_nodes_text(tree, "across")
-    down = _first_int_from_nodes_text(tree, "down")
-    if not across:
-        across = _first_int_from_attrs(tree, "across")
-    if not down:
-        down = _first_int_from_attrs(tree, "down")
-    return across, down
+    size = xml_parsers.source_size(xml_path)
+    too_large = size is not None and xml_parsers.get_parser_config().too_large(size)
 
+    if cache is not None and not too_large:
+        with open(xml_path, "rb") as f:
+            data = f.read()
+        return load_jobspec_from_bytes(data, map_yaml_path, stream=stream, cache=cache)
 
-def load_jobspec_from_xml(xml_path: str, map_yaml_path: str) -> JobSpec:
-    tree = ET.parse(xml_path)
-    with open(map_yaml_path, "r", encoding="utf-8") as f:
-        mapping = yaml.safe_load(f) or {}
+    plan = _resolve_plan(map_yaml_path)
+    if (stream or too_large) and plan.streamable:
+        plan, values, fallback = stream_extract(xml_path, plan)
+        return _build_jobspec(plan, values, fallback)
+    _check_tree_size(size, xml_path, plan)
+    return _from_tree(plan, xml_parsers.parse(xml_path))
 
-    if not isinstance(mapping, dict) or not all(isinstance(k, str) and isinstance(v, str) for k, v in mapping.items()):
-        raise ValueError(f"Mapping YAML must be a dict of 'target: xpath'. Got: {type(mapping).__name__}")
 
+def load_jobspec_from_file(
+    fileobj: BinaryIO, map_yaml_path: str | MappingPlan, *, stream: bool = False, chunk_size: int = 1 << 16
+) -> JobSpec:
+    """
+    Same as load_jobspec_from_xml, reading from an open binary file object (uploads, BytesIO).
+    Streamable plans are fed chunk by chunk; otherwise the bytes go through load_jobspec_from_bytes.
+    """
+    plan = _resolve_plan(map_yaml_path)
+    if not (stream and plan.streamable):
+        return load_jobspec_from_bytes(fileobj.read(), plan, stream=stream)
+    parser = JobSpecFeedParser(plan, stream=True)
+    for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+        parser.feed(chunk)
+    return parser.close()
+
+
+def load_jobspec_from_bytes(
+    data: bytes,
+    map_yaml_path: str | MappingPlan,
+    *,
+    stream: bool = False,
+    cache: ParseCache | None = None,
+) -> JobSpec:
+    """Parse an XML document that is already in memory; no temp file involved."""
+    plan = _resolve_plan(map_yaml_path)
+    key = None
+    if cache is not None:
+        key = cache.key(data, plan)
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+
+    js, _ = load_jobspec_and_values_from_bytes(data, plan, stream=stream)
+    if cache is not None and key is not None:
+        cache.put(key, js)
+    return js
+
+
+def load_jobspec_and_values_from_bytes(
+    data: bytes, map_yaml_path: str | MappingPlan, *, stream: bool = False
+) -> Tuple[JobSpec, Dict[str, Any]]:
+    """
+    load_jobspec_from_bytes (uncached) that also returns the raw mapped values, for callers
+    that need targets JobSpec does not keep (e.g. `job_number`).
+    """
+    plan = _resolve_plan(map_yaml_path)
+    if (stream or xml_parsers.get_parser_config().too_large(len(data))) and plan.streamable:
+        parser = JobSpecFeedParser(plan, stream=True)
+        parser.feed(data)
+        js = parser.close()
+        return js, parser.values
+    _check_tree_size(len(data), "<bytes>", plan)
+    return _map_tree(plan, xml_parsers.fromstring(data).getroottree())
+
+
+class JobSpecFeedParser:
+    """
+    Incremental entry point: feed() raw XML chunks as they arrive, close() returns the JobSpec.
+
+    With a streamable plan (and stream=True) events are consumed while feeding and elements are
+    discarded, so an upload is never held twice in memory. Otherwise the chunks build a tree
+    that is mapped on close(), and feeding past the parser size cap raises XMLTooLargeError.
+    """
+
+    def __init__(self, map_yaml_path: str | MappingPlan, *, stream: bool = True) -> None:
+        self.plan = _resolve_plan(map_yaml_path)
+        self._extractor = stream_extractor(self.plan) if stream and self.plan.streamable else None
+        self._fed = 0
+        self.values: Dict[str, Any] = {}
+        if self._extractor is not None:
+            self._parser = xml_parsers.pull_parser(STREAM_EVENTS)
+        else:
+            self._parser = xml_parsers.new_tree_parser()
+
+    def feed(self, chunk: bytes) -> None:
+        self._fed += len(chunk)
+        if self._extractor is None:
+            _check_tree_size(self._fed, "<upload>", self.plan)
+        self._parser.feed(chunk)
+        if self._extractor is not None:
+            self._extractor.consume(self._parser.read_events())
+
+    def close(self) -> JobSpec:
+        """Finish parsing and return the JobSpec; raw mapped values are left in `.values`."""
+        root = self._parser.close()
+        if self._extractor is None:
+            js, self.values = _map_tree(self.plan, root.getroottree())
+            return js
+        self._extractor.consume(self._parser.read_events())
+        self.values = self._extractor.values()
+        return _build_jobspec(self._extractor.plan, self.values, self._extractor.fallback)
+
+
+def _build_jobspec(
+    plan: MappingPlan,
+    values: Dict[str, Any],
+    fallback: Any,
+    extra_rules: Sequence[MappingRule] = (),
+    section: Optional[Dict[str, Any]] = None,
+) -> JobSpec:
+    """
+    Normalize raw mapped values into a JobSpec. `fallback` answers the imposition scans.
+    `extra_rules`/`section` are only used by the section-aware loader.
+    """
     data: Dict[str, Any] = {}
 
     # 1) Apply mapping into a plain dict
-    for target, xpath in mapping.items():
-        if not xpath:
-            continue
-        try:
-            raw = tree.xpath(xpath)
-        except ET.XPathEvalError:
-            continue
-
-        val: Any = None
-        if isinstance(raw, list):
-            vals = []
-            for v in raw:
-                if isinstance(v, ET._Element):
-                    t = "".join(v.itertext()).strip()
-                    if t != "":
-                        vals.append(t)
-                elif isinstance(v, bytes):
-                    t = v.decode("utf-8", "ignore").strip()
-                    if t != "":
-                        vals.append(t)
-                elif isinstance(v, str):
-                    t = v.strip()
-                    if t != "":
-                        vals.append(t)
-                elif isinstance(v, (int, float, bool)):
-                    vals.append(v)
-            if vals:
-                val = vals[0]
-        elif isinstance(raw, (int, float, bool, str)):
-            val = raw
-
-        _assign(data, target, val)
+    for rule in (*plan.rules, *extra_rules):
+        if rule.target in values:
+            _assign(data, rule.parts, values[rule.target])
 
     # 2) Normalize numerics
     for key in ("bleed_in", "safety_in", "pages", "trim_w_in", "trim_h_in"):
@@ -236,23 +463,23 @@ def load_jobspec_from_xml(xml_path: str, map_yaml_path: str) -> JobSpec:
 
         # Otherwise try to pull from XML (again Down x Across)
         if composed is None:
-            a_xml, d_xml = _extract_across_down_from_xml(tree)
+            a_xml, d_xml = fallback.across_down()
             if a_xml and a_xml.isdigit() and d_xml and d_xml.isdigit():
                 composed = f"{int(d_xml)}x{int(a_xml)}"  # Down x Across
 
         # Last resort: free-text scan (kept as-is)
         if composed is None:
             # free text can only give "AxB" order; we do not flip here
-            try:
-                text = ET.tostring(tree.getroot(), encoding="unicode", method="text")
-            except Exception:
-                text = ""
-            m = re.search(r"(\d+)\s*[x×X]\s*(\d+)", text)
-            if m:
-                composed = f"{int(m.group(1))}x{int(m.group(2))}"
+            pair = fallback.first_pair()
+            if pair:
+                composed = f"{pair[0]}x{pair[1]}"
 
         # Write back minimal set to match goldens
         slim_special: Dict[str, Any] = {}
+        job_number = data.get("job_number")
+        if isinstance(job_number, str) and job_number.strip():
+            # identifies the ticket across its section specs (capacity, nesting, gang ids)
+            slim_special["job_number"] = job_number.strip()
         if special.get("artwork_file"):
             slim_special["artwork_file"] = special["artwork_file"]
         if special.get("stock_group"):
@@ -261,6 +488,29 @@ def load_jobspec_from_xml(xml_path: str, map_yaml_path: str) -> JobSpec:
             slim_special["imposition_across"] = composed
         if special.get("machine"):
             slim_special["machine"] = special["machine"]
+        # stock identity (stock-rules index): code, "380 gsm", caliper
+        if special.get("stock_code"):
+            slim_special["stock_code"] = special["stock_code"]
+        weight = _finite(special.get("stock_weight_value"))
+        if weight:
+            unit = str(special.get("stock_weight_unit") or "").strip()
+            # PrintIQ units are either "gsm" or already carry the value ("100lb Cover")
+            slim_special["stock_weight"] = unit if unit[:1].isdigit() else f"{weight:g} {unit}".strip()
+        # caliper: value and unit are mapped as plain (streamable) paths; only inches are kept
+        caliper = _finite(special.get("stock_thickness_value"))
+        if caliper and str(special.get("stock_thickness_unit") or "").strip().lower() == "in":
+            slim_special["caliper_in"] = caliper
+        quantity = _finite(special.get("quantity"))
+        if quantity and quantity > 0:
+            slim_special["quantity"] = int(quantity)
+        press_sheet = _press_sheet(special.get("press_sheet"))
+        if press_sheet:
+            slim_special["press_sheet"] = press_sheet
+        operations = _operations(values.get("operations"))
+        if operations:
+            slim_special["operations"] = operations
+        if section is not None:
+            slim_special["section"] = section
 
         special = slim_special
 
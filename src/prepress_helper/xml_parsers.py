@@ -0,0 +1,123 @@
+# src/prepress_helper/xml_parsers.py
+"""
+Hardened, reusable lxml parsers for ticket ingest.
+
+- entity resolution and network access are off (no XXE / remote DTD fetches)
+- `huge_tree` stays off unless configured, so libxml2's depth/text-size limits apply
+- tree parsers are pooled per thread (lxml parsers must not be shared across threads)
+- `max_bytes` caps what may be built as a full tree; loaders stream larger documents
+  when the mapping allows it and raise XMLTooLargeError otherwise
+
+`remove_blank_text` is available but off by default: whitespace-only text between child
+elements is part of string() values (e.g. ArtworkFile's first token), and dropping it
+changes the mapped result on the sample corpus.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence
+
+from lxml import etree as ET
+
+ENV_MAX_BYTES = "PRINTSSISTANT_XML_MAX_BYTES"
+ENV_HUGE_TREE = "PRINTSSISTANT_XML_HUGE_TREE"
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class XMLTooLargeError(ValueError):
+    """The document exceeds the configured size cap and cannot be streamed."""
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class ParserConfig:
+    max_bytes: Optional[int] = DEFAULT_MAX_BYTES  # None = no cap
+    huge_tree: bool = False
+    remove_blank_text: bool = False
+
+    @classmethod
+    def from_env(cls) -> "ParserConfig":
+        raw = os.environ.get(ENV_MAX_BYTES, "").strip()
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES
+        if raw:
+            max_bytes = int(raw) if int(raw) > 0 else None
+        return cls(max_bytes=max_bytes, huge_tree=_env_flag(ENV_HUGE_TREE))
+
+    def options(self) -> Dict[str, Any]:
+        return {
+            "resolve_entities": False,
+            "no_network": True,
+            "load_dtd": False,
+            "huge_tree": self.huge_tree,
+            "remove_blank_text": self.remove_blank_text,
+        }
+
+    def too_large(self, size: int) -> bool:
+        return self.max_bytes is not None and size > self.max_bytes
+
+
+_CONFIG: Optional[ParserConfig] = None
+_LOCAL = threading.local()
+
+
+def get_parser_config() -> ParserConfig:
+    global _CONFIG
+    if _CONFIG is None:
+        _CONFIG = ParserConfig.from_env()
+    return _CONFIG
+
+
+def configure_parsers(config: Optional[ParserConfig] = None) -> None:
+    """Replace the process-wide parser config (None re-reads the environment)."""
+    global _CONFIG
+    _CONFIG = config
+    _LOCAL.__dict__.clear()
+
+
+def new_tree_parser(config: Optional[ParserConfig] = None) -> ET.XMLParser:
+    """A fresh parser (for the feed interface, where each document needs its own)."""
+    return ET.XMLParser(**(config or get_parser_config()).options())
+
+
+def tree_parser(config: Optional[ParserConfig] = None) -> ET.XMLParser:
+    """This thread's pooled parser for one-shot parse()/fromstring() calls."""
+    config = config or get_parser_config()
+    pool: Dict[ParserConfig, ET.XMLParser] = _LOCAL.__dict__.setdefault("pool", {})
+    parser = pool.get(config)
+    if parser is None:
+        parser = pool[config] = new_tree_parser(config)
+    return parser
+
+
+def pull_parser(events: Sequence[str], config: Optional[ParserConfig] = None) -> ET.XMLPullParser:
+    return ET.XMLPullParser(events=events, **(config or get_parser_config()).options())
+
+
+def iterparse(source: Any, events: Sequence[str], config: Optional[ParserConfig] = None) -> Any:
+    return ET.iterparse(source, events=events, **(config or get_parser_config()).options())
+
+
+def parse(source: Any, config: Optional[ParserConfig] = None) -> ET._ElementTree:
+    return ET.parse(source, tree_parser(config))
+
+
+def fromstring(data: bytes, config: Optional[ParserConfig] = None) -> ET._Element:
+    return ET.fromstring(data, tree_parser(config))
+
+
+def source_size(source: Any) -> Optional[int]:
+    """Byte size of a path or seekable file object, None when it cannot be told cheaply."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    try:
+        pos = source.tell()
+        end = source.seek(0, os.SEEK_END)
+        source.seek(pos)
+        return end - pos
+    except (AttributeError, OSError, ValueError):
+        return None
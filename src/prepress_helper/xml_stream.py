@@ -0,0 +1,392 @@
+# src/prepress_helper/xml_stream.py
+"""
+Single forward-pass extraction over (start, end, comment, pi) events.
+
+The same consumer handles `ET.iterparse` over a file. Elements are cleared as soon
+as their end event has been processed, so memory stays flat for large tickets.
+Text is reassembled in document order from `.text`/`.tail` slots, which gives
+XPath-identical string values without keeping subtrees alive.
+"""
+from __future__ import annotations
+
+import re
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from lxml import etree as ET
+
+from prepress_helper import xml_parsers
+from prepress_helper.mapping_plan import MappingPlan, MappingRule, PathSteps
+
+STREAM_EVENTS = ("start", "end", "comment", "pi")
+
+# Scalar conversions are delegated to libxml2 so results match the tree path exactly.
+_SCALAR_DOC = ET.fromstring("<x/>")
+_XP_NUMBER = ET.XPath("number($v)", smart_strings=False)
+_XP_NORMALIZE = ET.XPath("normalize-space($v)", smart_strings=False)
+
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+_RE_INT = re.compile(r"\d+")
+_RE_PAIR = re.compile(r"(\d+)\s*[x×X]\s*(\d+)")
+_RE_PAIR_PARTIAL = re.compile(r"\d+\s*(?:[x×X]\s*)?\Z")
+
+
+def _local(tag: Any) -> str:
+    return tag.split("}")[-1] if isinstance(tag, str) else ""
+
+
+def _path_matches(steps: PathSteps, chain: List[str]) -> bool:
+    """Does the element at chain[-1] (ancestors before it, root first) match the location path?"""
+
+    def m(k: int, pos: int) -> bool:
+        axis, name = steps[k]
+        if chain[pos] != name:
+            return False
+        if k == 0:
+            return pos == 0 if axis == "/" else True
+        if axis == "/":
+            return pos > 0 and m(k - 1, pos - 1)
+        return any(m(k - 1, p) for p in range(pos - 1, -1, -1))
+
+    return m(len(steps) - 1, len(chain) - 1)
+
+
+class _PairScanner:
+    """Finds the first 'AxB' in the document text without materializing the whole text."""
+
+    def __init__(self) -> None:
+        self.buf = ""
+        self.found: Optional[Tuple[int, int]] = None
+
+    def feed(self, text: str) -> None:
+        if self.found is not None or not text:
+            return
+        self.buf += text
+        m = _RE_PAIR.search(self.buf)
+        if m:
+            if m.end() < len(self.buf):  # later text can no longer extend the match
+                self.found = (int(m.group(1)), int(m.group(2)))
+                self.buf = ""
+            else:
+                self.buf = self.buf[m.start() :]
+            return
+        p = _RE_PAIR_PARTIAL.search(self.buf)
+        self.buf = self.buf[p.start() :] if p else ""
+
+    def close(self) -> Optional[Tuple[int, int]]:
+        if self.found is None and self.buf:
+            m = _RE_PAIR.search(self.buf)
+            if m:
+                self.found = (int(m.group(1)), int(m.group(2)))
+            self.buf = ""
+        return self.found
+
+
+class LocalNameIndex:
+    """
+    Lowercase local-name -> first integer value, for element text and for attributes.
+
+    Filled in one walk (tree) or during the streaming pass. Positions are event counters,
+    so "first" means first in document order, exactly like the XPath/attribute scans
+    it replaces. Lookups by substring ("needle") only touch the distinct names.
+    """
+
+    def __init__(self) -> None:
+        self.text: Dict[str, Tuple[int, str]] = {}
+        self.attrs: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+    @classmethod
+    def from_tree(cls, root: Any) -> "LocalNameIndex":
+        idx = cls()
+        pos = 0
+        for event, node in ET.iterwalk(root, events=STREAM_EVENTS):
+            pos += 1
+            if event == "start":
+                if node.text:
+                    idx.add_text(_local(node.tag), pos, node.text)
+                idx.add_attrs(pos, node)
+            elif node is not root and node.tail:
+                idx.add_text(_local(node.getparent().tag), pos, node.tail)
+        return idx
+
+    def add_text(self, owner: str, pos: int, text: str) -> None:
+        lname = owner.translate(_ASCII_LOWER)
+        if lname not in self.text:
+            m = _RE_INT.search(text.strip())
+            if m:
+                self.text[lname] = (pos, str(int(m.group(0))))
+
+    def add_attrs(self, pos: int, el: Any) -> None:
+        for i, (k, v) in enumerate(el.attrib.items()):
+            lname = k.split("}")[-1].lower()
+            if lname not in self.attrs:
+                m = _RE_INT.search((v or "").strip())
+                if m:
+                    self.attrs[lname] = ((pos, i), str(int(m.group(0))))
+
+    def first_text_int(self, needle: str) -> str | None:
+        """First integer in the text of any element whose local-name contains `needle`."""
+        hits = [v for k, v in self.text.items() if needle in k]
+        return min(hits)[1] if hits else None
+
+    def first_attr_int(self, needle: str) -> str | None:
+        """First integer in any attribute whose local-name contains `needle`."""
+        hits = [v for k, v in self.attrs.items() if needle in k]
+        return min(hits)[1] if hits else None
+
+    def across_down(self) -> Tuple[str | None, str | None]:
+        across = self.first_text_int("across") or self.first_attr_int("across")
+        down = self.first_text_int("down") or self.first_attr_int("down")
+        return across, down
+
+
+def first_pair_in_text(texts: Iterable[str]) -> Optional[Tuple[int, int]]:
+    """First 'AxB' over text chunks in document order; stops reading at the first settled match."""
+    scanner = _PairScanner()
+    for t in texts:
+        scanner.feed(t)
+        if scanner.found is not None:
+            break
+    return scanner.close()
+
+
+class StreamFallback:
+    """Imposition fallback facts gathered during the streaming pass."""
+
+    def __init__(self) -> None:
+        self.index = LocalNameIndex()
+        self.pairs = _PairScanner()
+
+    def across_down(self) -> Tuple[str | None, str | None]:
+        return self.index.across_down()
+
+    def first_pair(self) -> Optional[Tuple[int, int]]:
+        return self.pairs.close()
+
+
+def _convert(func: str, text: str) -> Any:
+    if func == "number":
+        return _XP_NUMBER(_SCALAR_DOC, v=text)
+    if func == "normalize":
+        return _XP_NORMALIZE(_SCALAR_DOC, v=text)
+    return text
+
+
+class StreamExtractor:
+    """
+    Consumes parse events and resolves every rule of a streamable MappingPlan.
+
+    Operation records (plan.operations) are captured in the same pass: while a record
+    element is open its relative field rules match against the chain below it, and the
+    record is closed into `values()["operations"]` at its end event. Records do not nest.
+    """
+
+    def __init__(self, plan: MappingPlan) -> None:
+        if not plan.streamable:
+            raise ValueError(f"Mapping {plan.source} cannot be evaluated in streaming mode")
+        self.plan = plan
+        self.fallback = StreamFallback()
+        self._by_name: Dict[str, List[Tuple[MappingRule, PathSteps]]] = {}
+        for rule in plan.rules:
+            for steps in rule.stream.paths:  # type: ignore[union-attr]
+                self._by_name.setdefault(steps[-1][1], []).append((rule, steps))
+        self._records_by_name: Dict[str, List[PathSteps]] = {}
+        self._fields_by_name: Dict[str, List[Tuple[MappingRule, PathSteps]]] = {}
+        if plan.operations is not None:
+            for steps in plan.operations.paths:  # type: ignore[union-attr]
+                self._records_by_name.setdefault(steps[-1][1], []).append(steps)
+            for rule in plan.operations.rules:
+                for steps in rule.stream.paths:  # type: ignore[union-attr]
+                    self._fields_by_name.setdefault(steps[-1][1], []).append((rule, steps))
+        self._done: set[str] = set()
+        self._texts: Dict[str, str] = {}  # target -> captured string-value
+        # (element, rules, text pieces, where the text goes: self._texts or a record's texts)
+        self._open: List[Tuple[Any, List[MappingRule], List[str], Dict[str, str]]] = []
+        self._record: Optional[Tuple[Any, int, Dict[str, str], set[str]]] = None  # (element, depth, texts, done)
+        self._records: List[Tuple[str, Dict[str, str]]] = []
+        self._chain: List[str] = []
+        self._pending: Optional[Tuple[Any, str, int]] = None  # text slot not yet complete
+        self._pos = 0  # event counter, orders text slots like LocalNameIndex.from_tree
+
+    # -- text slots ----------------------------------------------------------
+    def _flush(self) -> None:
+        slot = self._pending
+        self._pending = None
+        if slot is None:
+            return
+        node, kind, pos = slot
+        text = node.text if kind == "text" else node.tail
+        if not text:
+            return
+        if kind == "text":
+            owner = node
+        else:
+            owner = node.getparent()
+            if owner is None:  # text after the root element is not document text
+                return
+        for _, _, pieces, _ in self._open:
+            pieces.append(text)
+        self.fallback.index.add_text(_local(owner.tag), pos, text)
+        self.fallback.pairs.feed(text)
+
+    # -- events --------------------------------------------------------------
+    def consume(self, events: Iterable[Tuple[str, Any]]) -> None:
+        for event, node in events:
+            self.handle(event, node)
+
+    def handle(self, event: str, node: Any) -> None:
+        self._flush()
+        self._pos += 1
+        if event == "start":
+            self._start(node)
+        elif event == "end":
+            self._end(node)
+        else:  # comment / pi: only their tails are document text
+            self._pending = (node, "tail", self._pos)
+
+    def _start(self, el: Any) -> None:
+        tag = el.tag
+        self._chain.append(tag)
+        candidates = self._by_name.get(tag)
+        if candidates:
+            hits: List[MappingRule] = []
+            for rule, steps in candidates:
+                if rule.target not in self._done and _path_matches(steps, self._chain):
+                    self._done.add(rule.target)
+                    hits.append(rule)
+            if hits:
+                self._open.append((el, hits, [], self._texts))
+        if self._record is not None:
+            self._record_field(el)
+        elif tag in self._records_by_name:
+            if any(_path_matches(steps, self._chain) for steps in self._records_by_name[tag]):
+                self._record = (el, len(self._chain), {}, set())
+        if el.attrib:
+            self.fallback.index.add_attrs(self._pos, el)
+        self._pending = (el, "text", self._pos)
+
+    def _record_field(self, el: Any) -> None:
+        """Field rules of the open record, matched from the record element down."""
+        candidates = self._fields_by_name.get(el.tag)
+        if not candidates:
+            return
+        _, depth, texts, done = self._record  # type: ignore[misc]
+        below = self._chain[depth - 1 :]
+        hits: List[MappingRule] = []
+        for rule, steps in candidates:
+            if rule.target not in done and _path_matches((("/", below[0]),) + steps, below):
+                done.add(rule.target)
+                hits.append(rule)
+        if hits:
+            self._open.append((el, hits, [], texts))
+
+    def _end(self, el: Any) -> None:
+        while self._open and self._open[-1][0] is el:
+            _, rules, pieces, store = self._open.pop()
+            text = "".join(pieces)
+            for rule in rules:
+                store[rule.target] = text
+        if self._record is not None and self._record[0] is el:
+            self._records.append((_local(el.tag), self._record[2]))
+            self._record = None
+        self._chain.pop()
+        el.clear(keep_tail=True)
+        parent = el.getparent()
+        if parent is not None:
+            while el.getprevious() is not None:
+                del parent[0]
+        self._pending = (el, "tail", self._pos)
+
+    # -- results -------------------------------------------------------------
+    def values(self) -> Dict[str, Any]:
+        """Raw values keyed by target, as MappingPlan.evaluate would return them."""
+        self._flush()
+        out: Dict[str, Any] = {}
+        for rule in self.plan.rules:
+            out[rule.target] = _convert(rule.stream.func, self._texts.get(rule.target, ""))  # type: ignore[union-attr]
+        if self.plan.operations is not None:
+            rules = self.plan.operations.rules
+            out["operations"] = [
+                {"element": element, **{r.target: _convert(r.stream.func, texts.get(r.target, "")) for r in rules}}
+                for element, texts in self._records
+            ]
+        return out
+
+
+def select_plan_for_root(plan: MappingPlan, root: Any) -> MappingPlan:
+    """Pick the dialect plan for a built tree from its root tag and first child elements."""
+    if not plan.dialects:
+        return plan
+    children = [_local(c.tag) for c in islice(root.iterchildren(ET.Element), plan.signature_depth)]
+    return plan.select(_local(root.tag), children)
+
+
+class DialectStreamExtractor:
+    """
+    Streaming front-end for plans with dialects. The first events are buffered until the
+    root tag and its first child elements are known (the dialect signature), then replayed
+    into a StreamExtractor for the selected plan. Elements are not cleared while buffering,
+    so the replay sees the same text slots a direct pass would.
+    """
+
+    def __init__(self, plan: MappingPlan) -> None:
+        self.plan = plan
+        self._depth = plan.signature_depth
+        self._roots = {d.root for d in plan.dialects}
+        self._buffer: List[Tuple[str, Any]] = []
+        self._root: Optional[str] = None
+        self._children: List[str] = []
+        self._level = 0
+        self._extractor: Optional[StreamExtractor] = None
+
+    def _select(self) -> StreamExtractor:
+        if self._extractor is None:
+            self.plan = self.plan.select(self._root or "", self._children)
+            self._extractor = StreamExtractor(self.plan)
+            buffered, self._buffer = self._buffer, []
+            self._extractor.consume(buffered)
+        return self._extractor
+
+    def consume(self, events: Iterable[Tuple[str, Any]]) -> None:
+        for event, node in events:
+            self.handle(event, node)
+
+    def handle(self, event: str, node: Any) -> None:
+        if self._extractor is not None:
+            self._extractor.handle(event, node)
+            return
+        self._buffer.append((event, node))
+        if event == "start":
+            self._level += 1
+            if self._level == 1:
+                self._root = _local(node.tag)
+                if self._root not in self._roots:
+                    self._select()
+            elif self._level == 2:
+                self._children.append(_local(node.tag))
+                if len(self._children) >= self._depth:
+                    self._select()
+        elif event == "end":
+            self._level -= 1
+            if self._level == 0:
+                self._select()
+
+    @property
+    def fallback(self) -> StreamFallback:
+        return self._select().fallback
+
+    def values(self) -> Dict[str, Any]:
+        return self._select().values()
+
+
+def stream_extractor(plan: MappingPlan) -> StreamExtractor | DialectStreamExtractor:
+    """Extractor for `plan`; `.plan` is the plan actually used once the dialect is known."""
+    return DialectStreamExtractor(plan) if plan.dialects else StreamExtractor(plan)
+
+
+def stream_extract(source: Any, plan: MappingPlan) -> Tuple[MappingPlan, Dict[str, Any], StreamFallback]:
+    """Run one iterparse pass over `source` (path or binary file object)."""
+    ex = stream_extractor(plan)
+    ex.consume(xml_parsers.iterparse(source, STREAM_EVENTS))
+    values = ex.values()
+    return ex.plan, values, ex.fallback
@@ -0,0 +1,88 @@
+# tests/test_advise_cache.py
+import threading
+import time
+
+from prepress_helper.advise_cache import AdviseCache, advise_key
+from prepress_helper.jobspec import JobSpec, TrimSize
+from prepress_helper.pipeline import AdvisePipeline, Skill
+
+
+def _card(**kw):
+    return JobSpec(product="Business Card", trim_size=TrimSize(w_in=3.5, h_in=2.0), stock="14pt C2S", **kw)
+
+
+def _counting(calls, delay=0.0):
+    def tips(js):
+        time.sleep(delay)
+        calls.append(js.product)
+        return ["Use 0.125in bleed"]
+
+    return Skill("counting", tips=tips)
+
+
+def test_hit_skips_skills_and_ignores_volatile_fields():
+    calls = []
+    pipe = AdvisePipeline([_counting(calls)], cache=AdviseCache())
+    first = pipe.run(_card(due_at="2025-01-01"), "Check  Bleed")
+    again = pipe.run(_card(due_at="2025-02-02"), "check bleed", timings=True)
+    assert calls == ["Business Card"]
+    assert again.tips == first.tips and set(again.timings_ms) == {"cache", "total"}
+    assert again.jobspec.due_at == "2025-02-02"  # the JobSpec is the caller's, not the cached one
+    assert pipe.cache.stats()["hits"] == 1
+
+    pipe.run(_card(), "check bleed", fold="tri")  # options are part of the key
+    assert len(calls) == 2
+
+
+def test_callers_mutating_results_do_not_corrupt_hits():
+    calls = []
+    skill = Skill("counting", tips=_counting(calls).tips, scripts=lambda js: {"setup.jsx": "// doc"})
+    pipe = AdvisePipeline([skill], cache=AdviseCache())
+    first = pipe.run(_card(), "bleed")
+    first.tips.append("leader's note")
+    first.scripts["setup.jsx"] = {"id": "descriptor"}  # like /advise rewriting scripts
+    hit = pipe.run(_card(), "bleed")
+    assert hit.tips == ["Use 0.125in bleed"] and hit.scripts == {"setup.jsx": "// doc"}
+    hit.tips.clear()
+    hit.scripts.clear()
+    assert pipe.run(_card(), "bleed").scripts == {"setup.jsx": "// doc"} and len(calls) == 1
+
+
+def test_concurrent_identical_requests_compute_once():
+    calls = []
+    pipe = AdvisePipeline([_counting(calls, delay=0.2)], cache=AdviseCache())
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pipe.run(_card(), "bleed"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and len(results) == 4
+    stats = pipe.cache.stats()
+    assert stats["misses"] == 1 and stats["coalesced"] + stats["hits"] == 3 and stats["inflight"] == 0
+
+
+def test_failed_runs_are_not_stored():
+    def boom(js):
+        raise RuntimeError("nope")
+
+    pipe = AdvisePipeline([Skill("boom", tips=boom)], cache=AdviseCache())
+    assert pipe.run(_card(), "x").status == {"boom": "error"}
+    pipe.run(_card(), "x")
+    assert pipe.cache.stats()["misses"] == 2
+
+
+def test_lru_and_ttl():
+    cache = AdviseCache(max_entries=2, ttl_s=60)
+    for k in "abc":
+        cache.put(k, k)
+    assert cache.get("a") is None and cache.get("c") == "c"
+
+    cache = AdviseCache(ttl_s=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_key_tracks_shop_version():
+    assert advise_key(_card(), "m", shop="v1") != advise_key(_card(), "m", shop="v2")
@@ -0,0 +1,116 @@
+# tests/test_advise_pipeline.py
+import asyncio
+import json
+import time
+
+import pytest
+from typer.testing import CliRunner
+
+from prepress_helper import pipeline, router
+from prepress_helper.cli import app
+from prepress_helper.jobspec import JobSpec, TrimSize
+from prepress_helper.pipeline import SKILLS, AdvisePipeline, Skill
+
+
+def _banner():
+    return JobSpec(
+        product="Banner",
+        trim_size=TrimSize(w_in=48.0, h_in=24.0),
+        pages=1,
+        colors={"front": "CMYK", "back": "No Printing"},
+        stock="13oz Vinyl",
+    )
+
+
+def test_structured_result_with_stage_timings():
+    res = AdvisePipeline().run(_banner(), "pantone spot and small text", timings=True)
+    assert res.intents[0] == "doc_setup"
+    assert {"wide_format", "spot", "min_specs"} <= set(res.intents)
+    assert "illustrator_jsx_wide_format_guides" in res.scripts
+    assert {"shop_config", "intents", "doc_setup", "wide_format", "dedupe", "total"} <= set(res.timings_ms)
+    assert "timings_ms" in res.to_dict() and "jobspec" not in res.to_dict()
+    assert len(res.tips) == len(set(res.tips))
+
+
+def test_wide_machine_routes_without_the_router_global(monkeypatch):
+    monkeypatch.setattr(router, "SHOP_CFG", {})  # CLI / library callers never call set_shop_cfg
+    js = JobSpec(trim_size=TrimSize(w_in=48.0, h_in=96.0), special={"machine": "Trufire X2"})  # no keyword hints
+    res = AdvisePipeline().run(js, "")
+    assert "wide_format" in res.intents and "illustrator_jsx_wide_format_guides" in res.scripts
+
+
+def test_skill_registry_triggers_and_isolates_errors():
+    def boom(js):
+        raise RuntimeError("nope")
+
+    calls = []
+    skills = [
+        Skill("always", tips=lambda js: calls.append("always") or ["A"]),
+        Skill("wide_only", intents=("wide_format",), tips=lambda js: calls.append("wide") or ["W"]),
+        Skill("broken", tips=boom),
+    ]
+    res = AdvisePipeline(skills).run(JobSpec(), "")
+    assert calls == ["always"] and res.tips == ["A"]
+    assert res.errors == {"broken": "RuntimeError: nope"}
+    assert list(SKILLS)[0] == "doc_setup"
+
+
+def test_cli_advise_uses_pipeline(tmp_path):
+    path = tmp_path / "js.json"
+    path.write_text(_banner().model_dump_json(), encoding="utf-8")
+    result = CliRunner().invoke(app, ["advise", str(path), "--msg", "banner"])
+    assert result.exit_code == 0, result.output
+    data = json.loads(result.stdout)
+    want = AdvisePipeline().run(_banner(), "banner").to_dict()
+    assert data == json.loads(json.dumps(want))
+    assert "wide_format" in data["intents"] and "nags" in data  # previously skipped by the CLI
+
+
+def _slow(js):
+    time.sleep(0.5)
+    return ["slow"]
+
+
+def test_slow_skill_times_out_without_blocking_the_rest():
+    skills = [Skill("fast", tips=lambda js: ["fast"]), Skill("slow", tips=_slow, timeout_s=0.05)]
+    t0 = time.perf_counter()
+    res = AdvisePipeline(skills).run(JobSpec(), "")
+    assert time.perf_counter() - t0 < 0.4
+    assert res.tips == ["fast"]
+    assert res.status == {"fast": "ok", "slow": "timeout"}
+
+
+def test_async_run_matches_sync_and_skills_overlap():
+    skills = [Skill(f"s{i}", tips=lambda js, i=i: time.sleep(0.1) or [f"t{i}"]) for i in range(4)]
+    t0 = time.perf_counter()
+    res = asyncio.run(AdvisePipeline(skills).run_async(JobSpec(), ""))
+    assert time.perf_counter() - t0 < 0.35  # concurrent, not 4 x 0.1s
+    assert res.tips == ["t0", "t1", "t2", "t3"]  # registry order, not completion order
+    assert res.to_dict() == AdvisePipeline(skills).run(JobSpec(), "").to_dict()
+
+
+def test_stream_sends_fast_skills_before_slow_ones():
+    def slow(js):
+        time.sleep(0.2)
+        return ["slow tip"]
+
+    skills = [Skill("slow", tips=slow), Skill("fast", tips=lambda js: ["fast tip", "Slow tip"])]
+
+    async def collect():
+        return [e async for e in AdvisePipeline(skills).stream(_banner())]
+
+    events = asyncio.run(collect())
+    assert [e.get("skill") for e in events] == [None, "fast", "slow", None]
+    assert events[1]["tips"] == ["fast tip", "Slow tip"]
+    assert events[2]["tips"] == []  # duplicate of an already sent tip
+    assert events[-1]["status"] == {"slow": "ok", "fast": "ok"} and events[-1]["retracted"] == []
+
+
+def test_broken_skill_module_fails_registration_instead_of_dropping_the_skill(monkeypatch):
+    def broken(name):
+        raise SyntaxError(f"invalid syntax ({name})")
+
+    monkeypatch.setattr(pipeline.importlib, "import_module", broken)
+    with pytest.raises(SyntaxError):
+        pipeline._register_module("doc_setup", "doc_setup", functions={"tips": "tips"})
+    assert SKILLS["doc_setup"].tips is not None  # the registered skill is left alone
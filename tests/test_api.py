@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+import asyncio
+import json
 from pathlib import Path
 
 import pytest
 from fastapi.testclient import TestClient
 
-from api.main import app  # <-- now that api/ is a package, this works
+import api.main
+from api.main import (  # <-- now that api/ is a package, this works
+    _cancel_on_disconnect,
+    app,
+)
+from prepress_helper.script_store import ScriptStore
 
 client = TestClient(app)
 
@@ -38,3 +45,114 @@ def test_parse_xml_endpoint_roundtrip():
     assert resp.status_code == 200, resp.text
     js = resp.json()
     assert js["trim_size"]["w_in"] == 3.5 and js["trim_size"]["h_in"] == 2.0
+
+
+def test_advise_work_cancelled_when_client_disconnects():
+    class GoneRequest:
+        async def is_disconnected(self):
+            return True
+
+    async def scenario():
+        work = asyncio.ensure_future(asyncio.sleep(5))
+        assert await _cancel_on_disconnect(GoneRequest(), work, poll_s=0.01) is None
+        await asyncio.sleep(0)
+        return work.cancelled()
+
+    assert asyncio.run(scenario())
+
+
+def test_advise_returns_script_descriptors_fetchable_with_etag():
+    jobspec = {"product": "Banner", "trim_size": {"w_in": 48.0, "h_in": 24.0}, "stock": "13oz Vinyl"}
+    assert client.post("/advise", json={"jobspec": jobspec}).json()["scripts"] == {}  # tips only by default
+    data = client.post("/advise", json={"jobspec": jobspec, "scripts": "ref"}).json()
+    desc = data["scripts"]["illustrator_jsx_wide_format_guides"]
+    assert set(desc) == {"id", "name", "sha256", "size", "href"}
+
+    resp = client.get(desc["href"])
+    assert resp.status_code == 200 and len(resp.content) == desc["size"]
+    assert resp.headers["etag"] == f'"{desc["sha256"]}"'
+    assert client.get(desc["href"], headers={"If-None-Match": resp.headers["etag"]}).status_code == 304
+    assert client.get("/scripts/nope").status_code == 404
+
+    inline = client.post("/advise", json={"jobspec": jobspec, "scripts": "inline"}).json()
+    assert inline["scripts"]["illustrator_jsx_wide_format_guides"] == resp.text
+    assert client.post("/advise", json={"jobspec": jobspec, "scripts": "none"}).json()["scripts"] == {}
+
+
+def test_script_ids_are_process_local_and_valid_until_evicted(monkeypatch):
+    jobspec = {"product": "Banner", "trim_size": {"w_in": 48.0, "h_in": 24.0}, "stock": "13oz Vinyl"}
+    scripts = client.post("/advise", json={"jobspec": jobspec, "scripts": "ref"}).json()["scripts"]
+    href = scripts["illustrator_jsx_wide_format_guides"]["href"]
+    assert client.get(href).status_code == 200
+
+    store = ScriptStore()
+    monkeypatch.setattr(api.main, "SCRIPT_STORE", store)  # a restart / another worker
+    resp = client.get(href)
+    assert resp.status_code == 404 and "re-run /advise" in resp.json()["detail"]
+
+    again = client.post("/advise", json={"jobspec": jobspec, "scripts": "ref"}).json()["scripts"]
+    assert again["illustrator_jsx_wide_format_guides"]["href"] == href  # same content, same id
+    assert client.get(href).status_code == 200
+    store.max_bytes = 1
+    store.put("other.jsx", "// evicts everything older")
+    assert client.get(href).status_code == 404
+
+
+def test_advise_stream_ndjson_and_sse():
+    jobspec = {"product": "Banner", "trim_size": {"w_in": 48.0, "h_in": 24.0}, "stock": "13oz Vinyl"}
+    resp = client.post("/advise/stream", json={"jobspec": jobspec, "message": "pantone spot", "scripts": "ref"})
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in resp.text.splitlines()]
+    assert events[0]["event"] == "intents" and events[-1]["event"] == "done"
+    skills = [e for e in events if e["event"] == "skill"]
+    assert {e["skill"] for e in skills} == set(events[-1]["status"])
+    tips = [t for e in skills for t in e.get("tips", [])]
+    assert tips and len(tips) == len({t.lower() for t in tips})  # deduped across events
+    wide = next(e for e in skills if e["skill"] == "wide_format")
+    assert "href" in wide["scripts"]["illustrator_jsx_wide_format_guides"]
+
+    sse = client.post("/advise/stream?format=sse", json={"jobspec": jobspec})
+    assert sse.headers["content-type"].startswith("text/event-stream")
+    assert sse.text.startswith("event: intents\ndata: {")
+
+
+def test_nest_endpoint_returns_layout_and_placement_script():
+    banner = {"product": "Banner", "trim_size": {"w_in": 48, "h_in": 24}, "special": {"quantity": 4}}
+    resp = client.post("/nest", json={"jobspecs": [banner], "press": "hp_latex_570"})
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["pieces"] == 4 and data["media_length_in"] > 0 and not data["unplaced"]
+    desc = data["scripts"]["illustrator_jsx_nest_placement"]
+    assert "nest_placement.jsx" in client.get(desc["href"]).text
+    assert client.post("/nest", json={"jobspecs": [banner], "press": "indigo_7900"}).status_code == 422
+
+
+def test_gang_endpoint_reports_savings():
+    card = {"trim_size": {"w_in": 3.5, "h_in": 2.0}, "bleed_in": 0.125, "stock": "14pt C2S"}
+    jobs = [{**card, "special": {"quantity": q, "job_number": f"J{q}"}} for q in (250, 250, 500, 1000)]
+    resp = client.post("/gang", json={"jobspecs": jobs, "make_ready": 5})
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["summary"]["groups"] == 1 and data["summary"]["forms"] == 1
+    assert data["summary"]["saved_sheets"] > 0
+
+
+def test_capacity_endpoint_flags_overloaded_machines():
+    op = {"key": "1", "name": "Cut", "machine": "Zund G3", "mr_h": 1.0, "run_h": 4.0}
+    jobs = [{"due_at": "2024-09-16", "special": {"operations": [{**op, "key": str(k)}]}} for k in range(2)]
+    resp = client.post("/capacity", json={"jobspecs": jobs})
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["loads"][0]["total_h"] == 10.0 and data["summary"]["over_capacity"] == 1
+    assert client.post("/capacity", json={"jobspecs": jobs, "hours_per_day": 12}).json()["over_capacity"] == []
+
+
+@pytest.mark.skipif(not Path("samples/J213010.xml").exists(), reason="sample XML not present")
+def test_capacity_counts_section_specs_of_one_ticket_once():
+    files = {"xml": ("J213010.xml", Path("samples/J213010.xml").read_bytes(), "application/xml")}
+    form = {"mapping_path": "config/xml_map.yml"}
+    sections = client.post("/parse_xml", files=files, data={**form, "sections": "true"}).json()
+    whole = client.post("/parse_xml", files=files, data=form).json()
+    assert len(sections) > 1 and {s["special"]["job_number"] for s in sections} == {"J213010"}
+    by_section = client.post("/capacity", json={"jobspecs": sections}).json()["summary"]
+    assert by_section == client.post("/capacity", json={"jobspecs": [whole]}).json()["summary"]
@@ -0,0 +1,76 @@
+# tests/test_batch.py
+import json
+import shutil
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from prepress_helper.batch import ZIP_SEP, iter_sources, run_batch
+from prepress_helper.xml_adapter import load_jobspec_from_xml
+
+CONFIG = "config/xml_map.yml"
+SAMPLES = ["samples/J208819.xml", "samples/J208823.xml", "samples/J212660.xml"]
+
+pytestmark = pytest.mark.skipif(not all(Path(p).exists() for p in SAMPLES), reason="sample XML not present")
+
+
+def _records(path):
+    return [json.loads(line) for line in Path(path).read_text(encoding="utf-8").splitlines()]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    d = tmp_path / "in"
+    (d / "sub").mkdir(parents=True)
+    shutil.copy(SAMPLES[0], d)
+    shutil.copy(SAMPLES[1], d / "sub")
+    (d / "broken.xml").write_text("<Job><Title>oops</Job>", encoding="utf-8")
+    with zipfile.ZipFile(tmp_path / "more.zip", "w") as zf:
+        zf.write(SAMPLES[2], "tickets/J212660.xml")
+        zf.write(SAMPLES[2], "tickets/copy-of-J212660.xml")  # same job number twice
+    return tmp_path
+
+
+def test_sources_expand_dirs_globs_and_zips(corpus):
+    srcs = list(iter_sources([str(corpus / "in"), str(corpus / "*.zip"), str(corpus / "in" / "*.xml")]))
+    assert len(srcs) == 5  # de-duplicated across inputs
+    assert sum(ZIP_SEP in s for s in srcs) == 2
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_writes_records_and_errors_inline(corpus, workers):
+    out = corpus / "out.jsonl"
+    stats = run_batch([str(corpus / "in"), str(corpus / "more.zip")], str(out), CONFIG, workers=workers)
+    recs = _records(out)
+    assert stats.written == len(recs) == 4 and stats.errors == 1 and stats.skipped_jobs == 1
+    bad = [r for r in recs if not r["ok"]]
+    assert len(bad) == 1 and bad[0]["source"].endswith("broken.xml") and "XMLSyntaxError" in bad[0]["error"]
+
+    ok = {Path(r["source"]).name: r for r in recs if r["ok"]}
+    assert ok["J208819.xml"]["job_number"] == "J208819"
+    want = load_jobspec_from_xml(SAMPLES[0], CONFIG).model_dump()
+    assert ok["J208819.xml"]["jobspec"]["product"] == want["product"]
+
+
+def test_resume_skips_done_sources_and_job_numbers(corpus):
+    out = corpus / "out.jsonl"
+    run_batch([str(corpus / "in")], str(out), CONFIG, workers=1)
+    with open(out, "a", encoding="utf-8") as f:
+        f.write('{"source": "torn')  # interrupted run
+
+    shutil.copy(SAMPLES[0], corpus / "renamed.xml")  # already-done job under another name
+    stats = run_batch([str(corpus / "in"), str(corpus / "renamed.xml")], str(out), CONFIG, workers=1, resume=True)
+    assert stats.skipped_sources == 2 and stats.skipped_jobs == 1
+    assert stats.written == 1 and stats.errors == 1  # failed files are retried
+    assert sum(1 for r in _records_lenient(out) if r.get("ok")) == 2
+
+
+def _records_lenient(path):
+    out = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        try:
+            out.append(json.loads(line))
+        except ValueError:
+            pass
+    return out
@@ -0,0 +1,121 @@
+# tests/test_capacity.py
+import random
+import time
+
+import pytest
+import yaml
+from lxml import etree as ET
+
+from prepress_helper import capacity
+from prepress_helper.capacity import capacity_report, machine_capacity
+from prepress_helper.config_loader import current_shop_config
+from prepress_helper.jobspec import JobSpec
+from prepress_helper.mapping_plan import compile_mapping
+from prepress_helper.xml_adapter import _hours, load_jobspec_from_xml
+from prepress_helper.xml_stream import stream_extract
+
+SHOP = current_shop_config("config").data
+SAMPLE = "samples/J212882-02.xml"
+
+
+def _op(key, machine, mr, run):
+    return {"key": key, "name": key, "machine": machine, "mr_h": mr, "run_h": run}
+
+
+def _ticket(due, *ops):
+    return JobSpec(due_at=due, special={"operations": list(ops)})
+
+
+def test_hhmm_to_hours():
+    assert _hours("00:   05") == pytest.approx(5 / 60, abs=1e-4)
+    assert _hours("04:   -15") == 3.75
+    assert _hours("") == 0.0 and _hours(None) == 0.0
+
+
+def test_operations_stream_matches_tree():
+    mapping = yaml.safe_load(open("config/xml_map.yml", encoding="utf-8"))
+    plan = compile_mapping({"job_number": mapping["job_number"], "operations": mapping["operations"]})
+    assert plan.streamable
+    tree_ops = plan.evaluate(ET.parse(SAMPLE))["operations"]
+    _, values, _ = stream_extract(SAMPLE, plan)
+
+    def clean(recs):
+        return [{k: (None if v != v else v) for k, v in r.items()} for r in recs]  # NaN quantities
+
+    assert clean(values["operations"]) == clean(tree_ops) and len(tree_ops) == 5
+    assert tree_ops[0]["element"] == "Printing" and tree_ops[0]["machine"] == "DI 5634 Sheetwise"
+
+
+def test_adapter_keeps_one_record_per_operation_key():
+    ops = load_jobspec_from_xml(SAMPLE, "config/xml_map.yml").special["operations"]
+    keys = [op["key"] for op in ops]
+    assert len(keys) == len(set(keys))
+    press = ops[0]
+    assert press["name"] == "Printing" and press["run_h"] == 3.75 and press["quantity"] == 20675
+
+
+def test_report_sums_per_machine_and_day_and_flags_overload():
+    jobs = [
+        ("J1", _ticket("2024-09-16T05:00:00Z", _op("1", "HP Indigo 7800", 1.0, 9.0), _op("2", "No Machine", 5, 5))),
+        ("J2", _ticket("2024-09-16T12:00:00Z", _op("3", "HP Indigo 7800", 0.5, 5.0), _op("4", "Zund G3", 1, 8))),
+        ("J2", _ticket("2024-09-16T12:00:00Z", _op("3", "HP Indigo 7800", 0.5, 5.0))),  # second section spec
+        ("J3", _ticket("2024-09-17", _op("5", "Handwork", 2.0, 20.0))),
+        ("J4", _ticket(None, _op("6", "Zund G3", 10.0, 10.0))),
+    ]
+    report = capacity_report(jobs, SHOP)
+    loads = {(x.machine, x.day): x for x in report.loads}
+    assert set(loads) == {
+        ("HP Indigo 7800", "2024-09-16"),
+        ("Zund G3", "2024-09-16"),
+        ("Zund G3", "unscheduled"),
+        ("Handwork", "2024-09-17"),
+    }
+    indigo = loads[("HP Indigo 7800", "2024-09-16")]
+    assert (indigo.jobs, indigo.operations, indigo.mr_h, indigo.run_h) == (2, 2, 1.5, 14.0)
+    assert indigo.capacity_h == 16.0 and not indigo.over  # press_capabilities hours_per_day
+    assert loads[("Zund G3", "2024-09-16")].over  # 9 h on the 8 h policy default
+    assert not loads[("Handwork", "2024-09-17")].over  # policies.capacity.machines
+    assert not loads[("Zund G3", "unscheduled")].over
+    data = report.to_dict()
+    assert [(x["machine"], x["due"]) for x in data["over_capacity"]] == [("Zund G3", "2024-09-16")]
+    assert data["machines"]["Zund G3"]["total_h"] == 29.0
+    assert capacity_report(jobs, SHOP, hours_per_day=10).summary()["over_capacity"] == 0
+    assert machine_capacity(SHOP, "Prepress") == 16.0
+
+
+def test_loop_fallback_matches_numpy(monkeypatch):
+    pytest.importorskip("numpy")
+    rnd = random.Random(1)
+    machines = ["HP Indigo 7800", "Zund G3", "Handwork", "MBO B26"]
+    jobs = [
+        (
+            f"J{i}",
+            _ticket(
+                f"2024-09-{rnd.randint(16, 20)}", *(_op(f"{i}.{k}", rnd.choice(machines), 0.1, 0.7) for k in range(3))
+            ),
+        )
+        for i in range(200)
+    ]
+    vectorized = capacity_report(jobs, SHOP).to_dict()
+    monkeypatch.setattr(capacity, "np", None)
+    assert capacity_report(jobs, SHOP).to_dict() == vectorized
+
+
+def test_a_week_of_tickets_in_milliseconds():
+    rnd = random.Random(2)
+    machines = ["HP Indigo 7800", "Fujifilm EC1100", "Zund G3", "Handwork", "Prepress", "MBO B26", "Komfi Amiga 36"]
+    jobs = [
+        (
+            f"J{i}",
+            _ticket(
+                f"2024-09-{rnd.randint(16, 22)}T05:00:00Z",
+                *(_op(f"{i}.{k}", rnd.choice(machines), rnd.random() / 4, rnd.random()) for k in range(7)),
+            ),
+        )
+        for i in range(5000)
+    ]
+    t0 = time.perf_counter()
+    report = capacity_report(jobs, SHOP)
+    assert time.perf_counter() - t0 < 1.0
+    assert report.summary()["operations"] == 35000 and report.summary()["days"] == 7
+    assert report.over_capacity
@@ -0,0 +1,79 @@
+# tests/test_dialects.py
+import dataclasses
+import os
+from pathlib import Path
+
+import pytest
+from lxml import etree as ET
+
+from prepress_helper.mapping_plan import load_mapping_plan
+from prepress_helper.xml_adapter import load_jobspec_from_bytes, load_jobspec_from_xml
+from prepress_helper.xml_stream import select_plan_for_root
+
+SAMPLES = sorted(Path("samples").glob("*.xml"))
+CONFIG = "config/xml_map.yml"
+
+
+def _dump(xml, plan):
+    try:
+        return load_jobspec_from_xml(str(xml), plan).model_dump()
+    except Exception as e:
+        return type(e).__name__
+
+
+@pytest.mark.skipif(not SAMPLES, reason="sample XML not present")
+def test_printiq_samples_use_anchored_map_and_match_generic():
+    plan = load_mapping_plan(CONFIG)
+    generic = dataclasses.replace(plan, dialects=())
+    for xml in SAMPLES:
+        chosen = select_plan_for_root(plan, ET.parse(str(xml)).getroot())
+        assert chosen.source.endswith("xml_map.printiq.yml"), xml.name
+        assert _dump(xml, chosen) == _dump(xml, generic), xml.name
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize(
+    "xml",
+    [
+        b"<Ticket><Title>Other</Title><Stock>S</Stock><Pages>2</Pages></Ticket>",  # unknown root
+        b"<Job><JobNumber>1</JobNumber><Config/><Title>Other</Title><Stock>S</Stock><Pages>2</Pages></Job>",
+        b"<Job><Config><x/></Config></Job>",  # root ends before the signature is complete
+    ],
+)
+def test_unknown_producers_fall_back_to_generic_map(xml, stream):
+    plan = load_mapping_plan(CONFIG)
+    assert select_plan_for_root(plan, ET.fromstring(xml)) is plan
+    generic = dataclasses.replace(plan, dialects=())
+    try:
+        want = load_jobspec_from_bytes(xml, generic).model_dump()
+    except Exception as e:
+        want = type(e).__name__
+    try:
+        got = load_jobspec_from_bytes(xml, plan, stream=stream).model_dump()
+    except Exception as e:
+        got = type(e).__name__
+    assert got == want
+
+
+def test_dialect_map_change_changes_fingerprint(tmp_path):
+    (tmp_path / "d.yml").write_text('product: "string(/Job/Title)"\n', encoding="utf-8")
+    (tmp_path / "map.yml").write_text(
+        "dialects:\n  d:\n    match: {root: Job, children: [Title]}\n    mapping: d.yml\n"
+        'product: "string(//Title)"\n',
+        encoding="utf-8",
+    )
+    plan = load_mapping_plan(str(tmp_path / "map.yml"))
+    before = plan.fingerprint()
+    assert load_jobspec_from_bytes(b"<Job><Title>T</Title><Pages>1</Pages></Job>", plan, stream=True).product == "T"
+
+    (tmp_path / "d.yml").write_text('product: "string(/Job/Other)"\n', encoding="utf-8")
+    st = os.stat(tmp_path / "d.yml")
+    os.utime(tmp_path / "d.yml", ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert plan.fingerprint() != before
+
+
+def test_compile_all_loads_every_dialect_plan():
+    plan = load_mapping_plan(CONFIG)
+    plans = plan.compile_all()
+    assert plans[0] is plan and len(plans) == 1 + len(plan.dialects)
+    assert all(p is load_mapping_plan(d.mapping) for p, d in zip(plans[1:], plan.dialects))
@@ -0,0 +1,64 @@
+# tests/test_fold_solver.py
+import pytest
+
+from prepress_helper.fold_solver import fold_offset, layout_for, solve, solve_many
+from prepress_helper.jobspec import JobSpec, TrimSize
+from prepress_helper.pipeline import AdvisePipeline
+from prepress_helper.skills import fold_math
+
+SHOP = {"stocks": [{"name": "100# Cover Silk", "fold_in_offset_in": 0.09375}]}
+
+
+def _js(stock="80# Text Gloss", w=11.0, h=8.5, **special):
+    return JobSpec(trim_size=TrimSize(w_in=w, h_in=h), stock=stock, special=special)
+
+
+@pytest.mark.parametrize(
+    "style,panels,expected",
+    [
+        ("half", None, (5.5, 5.5)),
+        ("bi-fold", 3, (5.5, 5.5)),  # fixed two panels
+        ("roll", None, (3.6875, 3.6875, 3.625)),  # legacy tri-fold numbers
+        ("z", None, (3.6667, 3.6667, 3.6667)),
+        ("roll", 4, (2.7969, 2.7969, 2.7344, 2.6719)),  # cumulative offsets
+        ("accordion", 4, (2.75, 2.75, 2.75, 2.75)),
+        ("gate", None, (2.7188, 5.5625, 2.7188)),
+        ("double gate", None, (2.7188, 2.7812, 2.7812, 2.7188)),
+    ],
+)
+def test_panels_sum_to_length(style, panels, expected):
+    fold = solve(11.0, style, panels, "right", 0.0625)
+    assert fold.panels == expected
+    assert abs(sum(fold.panels) - 11.0) < 1e-3 and len(fold.positions) == len(fold.panels) - 1
+
+
+def test_fold_in_left_mirrors_and_french_folds_across():
+    assert solve(11.0, "roll", None, "left", 0.0625).panels == (3.625, 3.6875, 3.6875)
+    assert layout_for(_js(), "french").cross_positions == (4.25,)
+
+
+def test_half_fold_message_gets_two_panels():
+    res = AdvisePipeline().run(_js(), "half fold please")
+    assert "fold_math" in res.intents
+    assert any(t.startswith('Half fold along long edge: panel widths ≈ 5.5", 5.5"') for t in res.tips)
+    assert "Tri-fold" not in res.scripts["illustrator_jsx_trifold_guides"]
+
+
+def test_offset_sources():
+    assert fold_offset(_js("100# Cover Silk"), SHOP) == 0.09375  # stock rule
+    assert fold_offset(_js("100# Cover Silk", fold_in_offset_in=0.125), SHOP) == 0.125  # job override
+    assert fold_offset(_js("24pt Board"), SHOP) == 0.109375  # 4 x caliper, rounded up to 1/64
+    assert fold_offset(_js("Mystery stock"), SHOP) == 0.0625
+
+
+def test_solve_many_reuses_layouts():
+    solve.cache_clear()
+    layouts = solve_many([_js(), _js(), _js(w=8.5, h=11.0)], style="roll", shop=SHOP)
+    assert layouts[0] is layouts[1] is layouts[2]
+    assert solve.cache_info().misses == 1 and solve.cache_info().hits == 0  # shared within the batch
+
+
+def test_too_small_tip_names_the_solved_fold():
+    tips = fold_math.tips(_js(w=5.0, h=3.0), style="half fold")
+    assert len(tips) == 1 and "too small for the half fold" in tips[0]
+    assert "tri-fold (roll)" in fold_math.tips(_js(w=5.0, h=3.0))[0]
@@ -0,0 +1,101 @@
+# tests/test_gang_planner.py
+import random
+import time
+
+import pytest
+
+from prepress_helper.config_loader import current_shop_config
+from prepress_helper.gang_planner import allocate, plan_gang
+from prepress_helper.imposition_solver import best_nup, cell_positions
+from prepress_helper.jobspec import JobSpec, TrimSize
+
+SHOP = current_shop_config("config").data
+
+
+def _ticket(qty, w=3.5, h=2.0, stock="130# Pro Digital Silk Cover", back="No Printing", machine="HP Indigo 7800"):
+    return JobSpec(
+        trim_size=TrimSize(w_in=w, h_in=h),
+        bleed_in=0.125,
+        stock=stock,
+        colors={"front": "CMYK", "back": back},
+        special={"machine": machine, "quantity": qty},
+    )
+
+
+def test_allocate_gangs_small_jobs_onto_one_form():
+    forms = allocate([("a", 1000), ("b", 500), ("c", 250), ("d", 250)], 24, make_ready=5)
+    assert [(f.run_sheets, f.slots) for f in forms] == [(84, (("a", 12), ("b", 6), ("c", 3), ("d", 3)))]
+    for f in allocate([(f"j{i}", q) for i, q in enumerate([5000, 120, 80, 80, 40, 10, 10, 3])], 24, 5):
+        assert f.size == 24
+
+
+def test_allocate_covers_every_quantity():
+    rnd = random.Random(5)
+    jobs = [(f"j{i}", rnd.choice([50, 100, 250, 500, 1000, 5000])) for i in range(400)]
+    forms = allocate(jobs, 24, make_ready=5)
+    produced = {}
+    for f in forms:
+        assert f.size <= 24
+        for job_id, s in f.slots:
+            produced[job_id] = produced.get(job_id, 0) + s * f.run_sheets
+    assert all(produced[j] >= q for j, q in jobs) and len(produced) == len(jobs)
+
+
+def test_cell_positions_cover_mixed_layout_without_overlap():
+    lay = best_nup(4.25, 6.25, 12.5, 18.5, 0.125)
+    cells = cell_positions(lay, 0.125)
+    assert len(cells) == lay.n == 6
+    boxes = [(x, y, x + (6.25 if r else 4.25), y + (4.25 if r else 6.25)) for x, y, r in cells]
+    assert all(x1 <= 12.5 + 1e-9 and y1 <= 18.5 + 1e-9 for _, _, x1, y1 in boxes)
+    for i, a in enumerate(boxes):
+        for b in boxes[i + 1 :]:
+            assert a[2] <= b[0] or b[2] <= a[0] or a[3] <= b[1] or b[3] <= a[1]
+
+
+def test_plan_groups_by_stock_colors_press_and_reports_savings():
+    jobs = [
+        ("A", _ticket(250)),
+        ("B", _ticket(250, stock="130lb Pro Digital Silk Cover")),  # same stock spelled differently
+        ("C", _ticket(500, back="CMYK")),
+        ("D", _ticket(250, w=6, h=4)),
+        ("E", _ticket(100, machine="Fujifilm EC1100")),
+        ("F", JobSpec(special={"quantity": 10})),
+    ]
+    plan = plan_gang(jobs, SHOP)
+    groups = {tuple(j for j, _ in g.jobs) for g in plan.groups}
+    assert groups == {("A", "B"), ("C",), ("D",), ("E",)}
+    ab = next(g for g in plan.groups if len(g.jobs) == 2)
+    assert ab.make_ready == 5 and len(ab.forms) == 1 and ab.solo_sheets - ab.total_sheets > 0
+    assert plan.unplanned == (("F", "no trim size"),)
+    data = plan.to_dict()
+    assert data["summary"]["saved_sheets"] == sum(g["saved_sheets"] for g in data["groups"])
+    assert len(data["groups"][0]["forms"][0]["cells"]) == data["groups"][0]["n_up"]
+
+
+def test_thousands_of_tickets_in_seconds():
+    rnd = random.Random(3)
+    jobs = [
+        (
+            f"J{i}",
+            _ticket(
+                rnd.choice([100, 250, 500, 1000, 2500]),
+                *rnd.choice([(3.5, 2.0), (6.0, 4.0), (5.0, 7.0)]),
+                stock=rnd.choice(["130# Pro Digital Silk Cover", "14pt C2S", "100# Gloss Text"]),
+                back=rnd.choice(["CMYK", "No Printing"]),
+            ),
+        )
+        for i in range(3000)
+    ]
+    t0 = time.perf_counter()
+    plan = plan_gang(jobs, SHOP)
+    assert time.perf_counter() - t0 < 5.0
+    summary = plan.summary()
+    assert summary["jobs"] == 3000 and summary["forms"] < 1000 and summary["saved_sheets"] > 0
+    assert all(g.run_sheets >= g.min_run_sheets for g in plan.groups)
+
+
+@pytest.mark.parametrize("make_ready", [0, 20])
+def test_gang_never_worse_than_solo(make_ready):
+    jobs = [(f"j{i}", _ticket(q)) for i, q in enumerate([30, 70, 130, 260, 500, 999, 5000])]
+    plan = plan_gang(jobs, SHOP, make_ready=make_ready)
+    assert all(g.total_sheets <= g.solo_sheets for g in plan.groups)
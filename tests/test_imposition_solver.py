@@ -0,0 +1,51 @@
+# tests/test_imposition_solver.py
+import time
+
+import pytest
+
+from prepress_helper.imposition_solver import best_nup, plan_for, plan_many
+from prepress_helper.jobspec import JobSpec, TrimSize
+from prepress_helper.skills import imposition
+
+SHOP = {"policies": {"imposition": {"default_sheet_in": [13, 19], "gripper_in": 0.375, "margin_in": 0.125}}}
+TICKET = {"sheet_w": 13.0, "sheet_h": 19.0, "printable_w": 12.5, "printable_h": 18.5, "across_x": 3, "across_y": 8}
+
+
+def _card(**press_sheet):
+    special = {"shop": SHOP, "press_sheet": {**TICKET, **press_sheet}}
+    return JobSpec(trim_size=TrimSize(w_in=3.5, h_in=2.0), bleed_in=0.125, special=special)
+
+
+@pytest.mark.parametrize(
+    "cell,area,gutter,n,label",
+    [
+        ((3.75, 2.25), (12.5, 18.5), 0.0, 24, "3x8"),
+        ((2.25, 3.75), (12.5, 18.5), 0.0, 24, "3x8 rotated"),
+        ((4.25, 6.25), (12.5, 18.5), 0.125, 6, "1x2 + 1x4 rotated"),  # mixing orientations fits more
+        ((20.0, 30.0), (12.5, 18.5), 0.0, 0, "0"),
+    ],
+)
+def test_best_nup(cell, area, gutter, n, label):
+    lay = best_nup(*cell, *area, gutter)
+    assert (lay.n, lay.label) == (n, label)
+
+
+def test_plan_cross_checks_ticket():
+    plan = plan_for(_card(number_up=20, sheets_required=12, mr_sheets=5, spoils=3, total_sheets=20))
+    assert plan.layout.n == 24 and plan.ticket_n == 20 and plan.sheets_at_best == 10
+    assert 0.3 < plan.waste < 0.35
+    tips = imposition.tips(_card(number_up=20, sheets_required=12))
+    assert any("Ticket imposes 20-up (3x8); 24-up fits (12 → 10 run sheets)" in t for t in tips)
+    assert any("matches the best fit" in t for t in imposition.tips(_card()))
+
+
+def test_default_sheet_and_batch_speed():
+    js = JobSpec(trim_size=TrimSize(w_in=8.5, h_in=11.0), bleed_in=0.125, special={"shop": SHOP})
+    plan = plan_for(js)
+    assert plan.sheet == (13.0, 19.0) and plan.area == (12.75, 18.5) and plan.layout.label == "1x2 rotated"
+
+    jobs = [_card()] * 500 + [js] * 500
+    t0 = time.perf_counter()
+    plans = plan_many(jobs)
+    assert time.perf_counter() - t0 < 1.0
+    assert plans[0].layout is plans[499].layout
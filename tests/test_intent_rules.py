@@ -0,0 +1,51 @@
+# tests/test_intent_rules.py
+import os
+
+import pytest
+
+from prepress_helper.intent_rules import compile_rules, load_intent_rules
+
+DOC = {
+    "rules": {
+        "spot": {"intent": "spot", "fields": ["message"], "keywords": ["spot", "white spot", "pms"]},
+        "white": {"fields": ["message"], "keywords": ["white"]},
+        "fold": {"intent": "fold_math", "keywords": ["fold"]},
+        "wide_stock": {"intent": "wide_format", "fields": ["stock"], "keywords": ["vinyl"]},
+    }
+}
+
+
+def test_one_pass_reports_every_intent_and_overlapping_hit():
+    m = compile_rules(DOC).match(message="Roll FOLD, White Spot varnish", stock="13oz Vinyl")
+    assert m.intents == ("spot", "fold_math", "wide_format")  # rule-file order
+    assert m.hits["spot"] == {"spot", "white spot"}
+    assert m.hit("white")  # keyword-only rule: a hit, no intent
+    assert not compile_rules(DOC).match(message="plain card").intents
+
+
+def test_fields_are_scoped():
+    m = compile_rules(DOC).match(message="vinyl", stock="fold")
+    assert m.intents == ()
+
+
+@pytest.mark.parametrize(
+    "doc",
+    [{"rules": {"x": {"keywords": []}}}, {"rules": {"x": {"fields": ["title"], "keywords": ["a"]}}}, ["nope"]],
+)
+def test_invalid_rules_raise(doc):
+    with pytest.raises(ValueError):
+        compile_rules(doc)
+
+
+def test_matcher_cached_per_file_version(tmp_path):
+    path = tmp_path / "rules.yml"
+    path.write_text("rules:\n  fold: {intent: fold_math, keywords: [fold]}\n", encoding="utf-8")
+    first = load_intent_rules(str(path))
+    assert load_intent_rules(str(path)) is first
+
+    path.write_text("rules:\n  fold: {intent: fold_math, keywords: [fold, crease]}\n", encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    second = load_intent_rules(str(path))
+    assert second is not first and second.version != first.version
+    assert second.match(message="crease it").intents == ("fold_math",)
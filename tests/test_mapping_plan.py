@@ -0,0 +1,31 @@
+# tests/test_mapping_plan.py
+import os
+
+import pytest
+import yaml
+
+from prepress_helper.mapping_plan import compile_mapping, load_mapping_plan
+
+
+def test_invalid_xpath_reported_at_load():
+    with pytest.raises(ValueError) as exc:
+        compile_mapping({"product": "string(//Title)", "stock": "string(//Stock[", "pages": "number(("})
+    msg = str(exc.value)
+    assert "stock" in msg and "pages" in msg and "product" not in msg
+
+
+def test_plan_cached_until_file_changes(tmp_path):
+    mapp = tmp_path / "map.yml"
+    mapp.write_text(yaml.dump({"product": "string(//Title)"}), encoding="utf-8")
+
+    first = load_mapping_plan(str(mapp))
+    assert load_mapping_plan(str(mapp)) is first
+    assert first.rules[0].parts == ("product",)
+
+    mapp.write_text(yaml.dump({"special.machine": "string(//Machine)"}), encoding="utf-8")
+    st = os.stat(mapp)
+    os.utime(mapp, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    second = load_mapping_plan(str(mapp))
+    assert second is not first
+    assert second.rules[0].parts == ("special", "machine")
+    assert second.digest != first.digest
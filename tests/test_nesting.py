@@ -0,0 +1,95 @@
+# tests/test_nesting.py
+import random
+import time
+
+import pytest
+
+from prepress_helper.config_loader import current_shop_config
+from prepress_helper.jobspec import JobSpec, TrimSize
+from prepress_helper.nesting import (
+    Bed,
+    Piece,
+    bed_for,
+    nest,
+    nest_jobs,
+    pieces_for,
+    placement_jsx,
+)
+
+SHOP = current_shop_config("config").data
+
+
+def _overlaps(a, b, gap):
+    return (
+        a.bed == b.bed
+        and a.x < b.x + b.w + gap - 1e-6
+        and b.x < a.x + a.w + gap - 1e-6
+        and a.y < b.y + b.h + gap - 1e-6
+        and b.y < a.y + a.h + gap - 1e-6
+    )
+
+
+def _assert_valid(layout):
+    bed = layout.bed
+    for p in layout.placements:
+        assert bed.edge - 1e-6 <= p.x and p.x + p.w <= bed.width - bed.edge + 1e-6
+        assert p.y >= bed.edge - 1e-6
+        if bed.depth:
+            assert p.y + p.h <= bed.depth - bed.edge + 1e-6
+        assert sorted((p.w, p.h)) == sorted((p.piece.w, p.piece.h))
+    pl = layout.placements
+    assert not any(_overlaps(a, b, bed.gap) for i, a in enumerate(pl) for b in pl[i + 1 :])
+
+
+def test_beds_from_press_capabilities():
+    roll, flat = bed_for(SHOP, "HP Latex 570"), bed_for(SHOP, "trufire_x2")
+    assert (roll.kind, roll.width, roll.depth) == ("roll", 64.0, None)
+    assert (flat.kind, flat.width, flat.depth) == ("flatbed", 120.0, 60.0)
+    assert roll.gap == 0.25 and roll.edge == 0.5
+    with pytest.raises(ValueError):
+        bed_for(SHOP, "indigo_7900")
+
+
+def test_banner_footprint_includes_hems_and_counts_grommets():
+    js = JobSpec(
+        product="13oz Vinyl Banner", trim_size=TrimSize(w_in=72, h_in=36), bleed_in=0.0, special={"quantity": 3}
+    )
+    pieces = pieces_for(js, SHOP, "J1")
+    assert [p.id for p in pieces] == ["J1#1", "J1#2", "J1#3"]
+    assert (pieces[0].w, pieces[0].h) == (74.0, 38.0)  # 1" hems all round
+    assert pieces[0].grommets == 2 * 6 + 2 * 3 - 4  # every 12", 0.5" in
+    poster = JobSpec(product="Poster", trim_size=TrimSize(w_in=24, h_in=36), bleed_in=0.125)
+    assert (pieces_for(poster, SHOP)[0].w, pieces_for(poster, SHOP)[0].grommets) == (24.25, 0)
+
+
+def test_roll_rotates_to_fit_and_reports_media():
+    # 74" banners only fit the 64" roll turned 90 degrees
+    js = JobSpec(product="Banner", trim_size=TrimSize(w_in=72, h_in=36), special={"quantity": 2})
+    layout = nest_jobs([js], "hp_latex_570", shop=SHOP)
+    _assert_valid(layout)
+    assert all(p.rotated for p in layout.placements) and not layout.unplaced
+    assert layout.media_length == pytest.approx(2 * 74.0 + 0.25 + 2 * 0.5)
+    assert layout.to_dict()["grommets"] == 2 * 14
+
+
+def test_exact_fill_and_unplaced():
+    bed = Bed("test", "flatbed", width=21.0, depth=21.0, gap=0.0, edge=0.5)
+    layout = nest([Piece(f"p{i}", 10.0, 10.0) for i in range(4)] + [Piece("big", 30.0, 30.0)], bed)
+    _assert_valid(layout)
+    assert layout.beds == 1 and layout.waste == pytest.approx(1 - 400 / 441)
+    assert [p.id for p in layout.unplaced] == ["big"]
+    pinned = nest([Piece("tall", 5.0, 15.0, rotate=False)], Bed("r", "roll", width=11.0, gap=0.0, edge=0.5))
+    assert not pinned.placements[0].rotated and pinned.media_length == pytest.approx(16.0)
+
+
+@pytest.mark.parametrize("press", ["hp_latex_570", "trufire_x2"])
+def test_hundreds_of_pieces_interactive(press):
+    rnd = random.Random(7)
+    pieces = [Piece(f"p{i}", rnd.choice([12, 18, 24, 36, 48]), rnd.choice([12, 18, 24, 36, 48])) for i in range(500)]
+    t0 = time.perf_counter()
+    layout = nest(pieces, bed_for(SHOP, press))
+    assert time.perf_counter() - t0 < 2.0
+    _assert_valid(layout)
+    assert not layout.unplaced and layout.waste < 0.25  # gaps, edges and a part-filled last bed
+    jsx = placement_jsx(layout)
+    assert "nest_placement.jsx" in jsx and jsx.count('"p') == 500
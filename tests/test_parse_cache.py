@@ -0,0 +1,96 @@
+# tests/test_parse_cache.py
+import os
+
+import pytest
+
+import prepress_helper.xml_adapter as xa
+from prepress_helper import parse_cache
+from prepress_helper.mapping_plan import load_mapping_plan
+from prepress_helper.parse_cache import ParseCache
+
+CONFIG = "config/xml_map.yml"
+XML = b"""<Job><Title>Card</Title><FinishedWidth>3.5</FinishedWidth><FinishedHeight>2</FinishedHeight>
+<Stock>100# Gloss Cover</Stock><Pages>2</Pages><AcrossX>4</AcrossX><AcrossY>6</AcrossY></Job>"""
+
+
+def test_hit_skips_parsing_and_matches(tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path / "cache"))
+    xml = tmp_path / "job.xml"
+    xml.write_bytes(XML)
+
+    first = xa.load_jobspec_from_xml(str(xml), CONFIG, cache=cache)
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 0
+
+    def boom(*a, **k):
+        raise AssertionError("lxml should not run on a cache hit")
+
+    monkeypatch.setattr(xa, "_from_tree", boom)
+    again = xa.load_jobspec_from_bytes(XML, CONFIG, cache=cache)
+    assert again.model_dump() == first.model_dump()
+    assert cache.stats()["hits"] == 1
+
+
+def test_key_depends_on_bytes_and_mapping(tmp_path):
+    plan = load_mapping_plan(CONFIG)
+    other = tmp_path / "map.yml"
+    other.write_text("product: string(//Title)\n", encoding="utf-8")
+    k = ParseCache.key(XML, plan)
+    assert k != ParseCache.key(XML + b" ", plan)
+    assert k != ParseCache.key(XML, load_mapping_plan(str(other)))
+
+
+def test_adapter_schema_bump_misses(tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path / "cache"))
+    xml = tmp_path / "job.xml"
+    xml.write_bytes(XML)
+    xa.load_jobspec_from_xml(str(xml), CONFIG, cache=cache)
+    xa.load_jobspec_from_xml(str(xml), CONFIG, cache=cache)
+    assert cache.stats()["hits"] == 1
+    monkeypatch.setattr(parse_cache, "PARSE_SCHEMA_VERSION", parse_cache.PARSE_SCHEMA_VERSION + 1)
+    xa.load_jobspec_from_xml(str(xml), CONFIG, cache=cache)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_lru_eviction_drops_least_recently_used(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    js = xa.load_jobspec_from_bytes(XML, CONFIG)
+    size = len(js.model_dump_json())
+    cache.max_bytes = size * 2 + size // 2  # the low watermark (90%) still holds two entries
+    keys = [f"{i:02d}" + "a" * 62 for i in range(3)]
+
+    cache.put(keys[0], js)
+    os.utime(cache._path(keys[0]), (1, 1))
+    cache.put(keys[1], js)
+    os.utime(cache._path(keys[1]), (2, 2))
+    assert cache.get(keys[0]) is not None  # touch: keys[1] is now the oldest
+    cache.put(keys[2], js)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_eviction_trims_to_low_watermark_instead_of_rescanning_every_put(tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path))
+    js = xa.load_jobspec_from_bytes(XML, CONFIG)
+    size = len(js.model_dump_json())
+    cache.max_bytes = size * 20
+    scans = []
+    real = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or real())
+
+    for i in range(60):
+        cache.put(f"{i:02x}" + "a" * 62, js)
+    assert cache.stats()["bytes"] <= cache.max_bytes
+    assert len(scans) <= 20  # once per ~2 entries (10% of the cap), not on every put past it
+
+
+@pytest.mark.parametrize("payload", [b"", b"{not json"])
+def test_corrupt_entry_is_a_miss(tmp_path, payload):
+    cache = ParseCache(str(tmp_path))
+    key = "ab" + "0" * 62
+    path = tmp_path / "ab" / (key + ".json")
+    path.parent.mkdir()
+    path.write_bytes(payload)
+    assert cache.get(key) is None
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,63 @@
+# tests/test_press_index.py
+import pytest
+
+from prepress_helper.press_index import PressIndex, press_index
+
+CFG = {
+    "presses": {
+        "indigo_7800": {"icc": "US Web Coated (SWOP) v2", "tac": 300, "allow_spot": True},
+        "fuji_ec1100": {"tac": 300},
+        "digitech_ltx2": {"icc": None},
+        "hp_latex_570": {"max_width_in": 64},
+    },
+    "press_capabilities": {
+        "roll_printers": {"hp_latex_570": {"max_width_in": 64, "allow_rgb": True, "icc_profile": "LATEX.icc"}},
+        "flatbed_printers": {"trufire_x2": {"max_width_in": 120, "max_depth_in": 60, "aliases": ["TruFire"]}},
+    },
+}
+
+
+@pytest.mark.parametrize(
+    "name,key",
+    [
+        ("hp_latex_570", "hp_latex_570"),  # slug
+        ("DigiTech LT/X2", "digitech_ltx2"),  # compact slug
+        ("HP Indigo 7800", "indigo_7800"),  # key tokens inside the name
+        ("HP Latex 800/570", "hp_latex_570"),
+        ("Fujifilm EC1100", "fuji_ec1100"),  # token prefix
+        ("Trufire", "trufire_x2"),  # alias
+        ("Polar 115", None),
+        ("HP Latex 560", None),  # different model number: no fuzzy match
+    ],
+)
+def test_lookup(name, key):
+    rec = press_index(CFG).lookup(name)
+    assert (rec.key if rec else None) == key
+
+
+def test_grouped_record_carries_class_and_caps():
+    rec = press_index(CFG).lookup("HP Latex 570")
+    assert rec.press_class == "roll" and rec.wide
+    assert rec.allow_rgb is True and rec.icc == "LATEX.icc" and rec.max_width_in == 64
+    indigo = press_index(CFG).lookup("indigo 7800")
+    assert not indigo.wide and indigo.tac == 300 and indigo.allow_spot is True
+
+
+def test_index_is_built_once_per_config_and_memoized():
+    idx = press_index(CFG)
+    assert press_index(CFG) is idx
+    assert idx.lookup("Fujifilm EC1100") is idx.lookup("fujifilm ec1100")
+    assert press_index(dict(CFG)) is not idx
+
+
+def test_missing_config_shares_one_empty_index_and_keeps_real_entries():
+    idx = press_index(CFG)
+    empties = {id(press_index(None)) for _ in range(20)} | {id(press_index({}))}
+    assert len(empties) == 1 and press_index(None).lookup("HP Latex 570") is None
+    assert press_index(CFG) is idx  # not pushed out by the None calls
+
+
+def test_legacy_name_lists():
+    idx = PressIndex.from_shop({"press_capabilities": {"flatbed_printers": ["oce arizona 1260"]}})
+    rec = idx.lookup("Oce Arizona 1260")
+    assert rec.press_class == "flatbed" and rec.wide
@@ -0,0 +1,88 @@
+# tests/test_shop_config.py
+import os
+
+from prepress_helper.config_loader import (
+    ShopConfigStore,
+    apply_shop_config,
+    current_shop_config,
+    load_shop_config,
+    resolve_shop,
+)
+from prepress_helper.jobspec import JobSpec
+
+
+def _write_cfg(d, min_body=7):
+    (d / "policies.yml").write_text(f"min_text_pt:\n  body_k_only: {min_body}\n", encoding="utf-8")
+    (d / "product_presets.yml").write_text("business_card:\n  bleed_in: 0.125\n", encoding="utf-8")
+    (d / "press_capabilities.yml").write_text("presses:\n  Indigo:\n    max_sheet_in: [13, 19]\n", encoding="utf-8")
+
+
+def _bump(path, step):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + step * 1_000_000_000))
+
+
+def test_snapshot_version_is_content_hash(tmp_path):
+    _write_cfg(tmp_path)
+    a = ShopConfigStore(str(tmp_path)).current()
+    b = ShopConfigStore(str(tmp_path)).current()
+    assert a.version == b.version
+    assert a.data["policies"]["min_text_pt"]["body_k_only"] == 7
+    assert "Indigo" in a.data["presses"]
+
+
+def test_edit_swaps_in_new_snapshot_and_keeps_old(tmp_path):
+    _write_cfg(tmp_path)
+    store = ShopConfigStore(str(tmp_path), poll_interval=0)
+    old = store.current()
+    assert store.current() is old  # nothing changed on disk
+
+    _write_cfg(tmp_path, min_body=9)
+    _bump(tmp_path / "policies.yml", 1)
+    new = store.current()
+    assert new.version != old.version
+    assert new.data["policies"]["min_text_pt"]["body_k_only"] == 9
+    assert old.data["policies"]["min_text_pt"]["body_k_only"] == 7  # in-flight holders unaffected
+
+
+def test_broken_yaml_keeps_last_good_snapshot(tmp_path):
+    _write_cfg(tmp_path)
+    store = ShopConfigStore(str(tmp_path), poll_interval=0)
+    good = store.current()
+
+    (tmp_path / "policies.yml").write_text("min_text_pt: [unclosed\n", encoding="utf-8")
+    _bump(tmp_path / "policies.yml", 1)
+    assert store.current() is good
+    assert store.last_error  # surfaced, not raised
+
+
+def test_load_shop_config_matches_store(tmp_path):
+    _write_cfg(tmp_path)
+    assert load_shop_config(str(tmp_path)) == ShopConfigStore(str(tmp_path)).current().data
+
+
+def test_apply_attaches_version_not_config(tmp_path):
+    _write_cfg(tmp_path)
+    store = ShopConfigStore(str(tmp_path), poll_interval=0)
+    old = store.current()
+    js = apply_shop_config(JobSpec(), old)
+    assert js.special["shop_version"] == old.version and "shop" not in js.special
+
+    _write_cfg(tmp_path, min_body=9)
+    _bump(tmp_path / "policies.yml", 1)
+    assert store.current().version != old.version
+    assert resolve_shop(js) is old.data  # still resolves to the snapshot it was prepared with
+
+
+def test_inline_opt_in_and_fallbacks(tmp_path):
+    _write_cfg(tmp_path)
+    snap = ShopConfigStore(str(tmp_path)).current()
+    inline = apply_shop_config(JobSpec(), snap, inline=True)
+    assert inline.special["shop"] == snap.data
+    assert resolve_shop(inline) is inline.special["shop"]
+
+    # re-applying without inline drops a stale embedded copy
+    assert "shop" not in apply_shop_config(inline, snap).special
+
+    unknown = JobSpec(special={"shop_version": "nope"})
+    assert resolve_shop(unknown) is current_shop_config().data
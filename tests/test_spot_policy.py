@@ -1,4 +1,5 @@
 from prepress_helper.jobspec import JobSpec
+from prepress_helper.pipeline import AdvisePipeline
 from prepress_helper.skills import spot_policy
 
 
@@ -29,3 +30,10 @@ def test_spot_on_sheetfed_recommends_convert():
     js = _js()
     tips = spot_policy.tips(js, [], "pantone 185")
     assert any("convert" in t.lower() and "cmyk" in t.lower() for t in tips)
+
+
+def test_pipeline_shop_snapshot_drives_spot_advice():
+    shop = {"policies": {"spot_policy": {"whitelist_spots": []}}}  # the shipped policy whitelists White
+    result = AdvisePipeline().run(_js(), "white ink spot", shop=shop)
+    assert "Spot colors allowed for wide-format. Use spots only when needed (e.g., White/Gloss)." in result.tips
+    assert "illustrator_jsx_spot_white" not in result.scripts
@@ -0,0 +1,57 @@
+# tests/test_stock_index.py
+import pytest
+
+from prepress_helper.jobspec import JobSpec
+from prepress_helper.pipeline import AdvisePipeline
+from prepress_helper.skills import min_specs, soft_nags
+from prepress_helper.stock_index import StockIndex, StockRule, stock_index
+
+CFG = {
+    "stocks": [
+        {"name": "80# Text Gloss", "fold_in_offset_in": 0.0625, "min_text_pt": 7},
+        {"name": "100# Cover Silk", "fold_in_offset_in": 0.09375, "min_text_pt": 8, "codes": ["840620"]},
+        {"name": "Customer Supplied Indigo Stock", "fold_in_offset_in": 0.0625},
+    ]
+}
+
+
+@pytest.mark.parametrize(
+    "stock,code,name,how",
+    [
+        ("100# Cover - Silk", None, "100# Cover Silk", "exact"),
+        ("Something else", "CustomerSuppliedIndigostock", "Customer Supplied Indigo Stock", "code"),
+        ("Silk stock", "840620", "100# Cover Silk", "code"),
+        ("80# Gloss Text (House Digital Size)", None, "80# Text Gloss", "tokens"),
+        ("80 lb Text Glos", None, "80# Text Gloss", "trigram"),
+        ("100# Text Gloss", None, None, None),  # weight differs: no match
+    ],
+)
+def test_lookup(stock, code, name, how):
+    m = stock_index(CFG).lookup(stock, code)
+    assert (m.rule.name, m.how) == (name, how) if name else m is None
+
+
+def test_index_scales_by_candidates_not_catalogue():
+    rules = [StockRule(f"{w}# Stock Line {i}") for i in range(2000) for w in (70, 100)]
+    idx = StockIndex(rules + [StockRule("130# Pro Digital Silk Cover", min_text_pt=6)])
+    m = idx.lookup("130# Pro Digital Silk Cover (House)")
+    assert m.rule.min_text_pt == 6 and m.how == "tokens"
+    assert idx.lookup("130# Pro Digital Silk Cover (House)") is m  # memoized
+
+
+def test_skills_consume_stock_rules():
+    js = JobSpec(trim_size={"w_in": 11, "h_in": 8.5}, stock="100# Cover Silk Dull", special={"shop": CFG})
+    assert any("on 100# Cover Silk" in t and "8 pt" in t for t in min_specs.tips(js, "small text", []))
+    nags = soft_nags.tips(js)
+    assert any("Using stock rule '100# Cover Silk'" in n for n in nags)
+    unknown = js.model_copy(update={"stock": "Mystery Board"})
+    assert not any("stock rule" in n for n in soft_nags.tips(unknown))
+
+
+def test_pipeline_nags_on_loose_stock_rule_matches_only():
+    js = JobSpec(trim_size={"w_in": 11, "h_in": 8.5}, stock="100# Cover Silk Dull")
+    assert any("Using stock rule '100# Cover Silk'" in n for n in AdvisePipeline().run(js, "").nags)
+    unknown = js.model_copy(update={"stock": "Mystery Board"})
+    assert not any("stock rule" in n for n in AdvisePipeline().run(unknown, "").nags)  # most stocks have no rule
+    quiet = {**CFG, "policies": {"soft_nags": {"enable": True, "stock_rules": False}}}
+    assert not any("stock rule" in n for n in AdvisePipeline().run(js, "", shop=quiet).nags)
@@ -46,3 +46,29 @@ def test_message_keyword_alone_does_not_force_wide_format():
     js = _js(None)
     intents = router.detect_intents(js, "banner")
     assert "wide_format" not in intents
+
+
+def test_grommet_progression_closed_form_without_drift():
+    from prepress_helper.grommets import grommet_progression
+
+    assert grommet_progression(1200.0, 0.5, 12.0) == (0.5, 12.0, 100)
+    start, step, count = grommet_progression(1200.0, 0.5, 0.1)
+    assert count == 11991 and abs(start + (count - 1) * step - 1199.5) < 1e-9
+    assert grommet_progression(48.0, 0.5, 12.0, corners_only=True) == (0.5, 47.0, 2)
+    assert grommet_progression(0.8, 0.5, 12.0)[2] == 1
+
+
+def test_grommet_script_size_independent_of_length():
+    from prepress_helper.skills.wide_format import scripts
+
+    preset = {"grommet_margin_in": 0.5, "grommet_spacing_in": 2, "finishing": {"grommet": {"diameter_in": 0.375}}}
+
+    def jsx(w):
+        js = _js(None, w=w, h=36.0)
+        js.special["product_preset"] = preset
+        return scripts(js)["illustrator_jsx_wide_format_guides"]
+
+    short, long = jsx(48.0), jsx(1200.0)
+    assert abs(len(long) - len(short)) < 8 and "gnx = 600;" in long
+    assert "r = 13.5" in long and "layer.pathItems.ellipse(" in long
+    assert "ovals" not in long and "doc.layers.add()" in long  # Illustrator DOM calls only
@@ -0,0 +1,62 @@
+# tests/test_xml_parsers.py
+import threading
+
+import pytest
+
+from prepress_helper import xml_parsers
+from prepress_helper.mapping_plan import compile_mapping
+from prepress_helper.xml_adapter import (
+    JobSpecFeedParser,
+    load_jobspec_from_bytes,
+    load_jobspec_from_xml,
+)
+from prepress_helper.xml_parsers import ParserConfig, XMLTooLargeError
+
+STREAMABLE = compile_mapping({"product": "string(//Title)", "pages": "number(//Pages)"})
+TREE_ONLY = compile_mapping({"product": "string(//Title[1])", "pages": "number(//Pages)"})
+XML = b"<Job><Title>Card</Title><Pages>2</Pages>" + b"<Pad>" + b"x" * 400 + b"</Pad></Job>"
+
+
+@pytest.fixture
+def small_cap():
+    xml_parsers.configure_parsers(ParserConfig(max_bytes=100))
+    yield
+    xml_parsers.configure_parsers(None)
+
+
+def test_external_entities_are_not_resolved(tmp_path):
+    secret = tmp_path / "secret.txt"
+    secret.write_text("TOPSECRET", encoding="utf-8")
+    xml = (
+        f'<?xml version="1.0"?><!DOCTYPE Job [<!ENTITY s SYSTEM "{secret.as_uri()}">]>'
+        "<Job><Title>&s;</Title><Pages>1</Pages></Job>"
+    ).encode()
+    for stream in (False, True):
+        js = load_jobspec_from_bytes(xml, STREAMABLE, stream=stream)
+        assert "TOPSECRET" not in (js.product or "")
+
+
+def test_oversized_documents_stream_or_are_refused(tmp_path, small_cap):
+    path = tmp_path / "big.xml"
+    path.write_bytes(XML)
+    assert load_jobspec_from_xml(str(path), STREAMABLE).product == "Card"  # streamed, not refused
+    assert load_jobspec_from_bytes(XML, STREAMABLE).product == "Card"
+    with pytest.raises(XMLTooLargeError):
+        load_jobspec_from_xml(str(path), TREE_ONLY)
+    with pytest.raises(XMLTooLargeError):
+        load_jobspec_from_bytes(XML, TREE_ONLY)
+
+    parser = JobSpecFeedParser(TREE_ONLY)
+    with pytest.raises(XMLTooLargeError):
+        for i in range(0, len(XML), 64):
+            parser.feed(XML[i : i + 64])
+
+
+def test_tree_parsers_pooled_per_thread():
+    mine = xml_parsers.tree_parser()
+    assert xml_parsers.tree_parser() is mine
+    other = []
+    t = threading.Thread(target=lambda: other.append(xml_parsers.tree_parser()))
+    t.start()
+    t.join()
+    assert other[0] is not mine
@@ -0,0 +1,76 @@
+# tests/test_xml_sections.py
+from pathlib import Path
+
+import pytest
+
+from prepress_helper.mapping_plan import compile_mapping
+from prepress_helper.xml_adapter import (
+    load_jobspec_from_xml,
+    load_jobspec_sections_from_bytes,
+    load_jobspec_sections_from_xml,
+)
+
+CONFIG = "config/xml_map.yml"
+
+
+@pytest.mark.skipif(not Path("samples/J212597.xml").exists(), reason="sample XML not present")
+def test_booklet_yields_cover_and_text_specs():
+    cover, text = load_jobspec_sections_from_xml("samples/J212597.xml", CONFIG)
+    assert cover.special["section"] == {"index": 0, "name": "Cover_0", "type": "Cover"}
+    assert text.special["section"]["type"] == "Text"
+    assert (cover.pages, text.pages) == (4, 52)
+    assert "Cover" in cover.stock and "Text" in text.stock
+    # job-level fields are shared
+    assert cover.product == text.product and cover.due_at == text.due_at
+
+
+XML = b"""<Job><Title>Flyer</Title><Pages>2</Pages><Stock>Job stock</Stock><FinishedWidth>8.5</FinishedWidth>
+<FinishedHeight>11</FinishedHeight><Sections>
+  <Section><Name>A</Name><FinishedWidth>5</FinishedWidth><Printing><Stock>S1</Stock></Printing></Section>
+  <Section><Name>B</Name><Printing><Stock/></Printing><Note>2 x 3</Note></Section>
+</Sections></Job>"""
+
+
+def test_empty_section_values_fall_back_to_job_level():
+    plan = compile_mapping(
+        {
+            "product": "string(//Title)",
+            "pages": "number(//Pages)",
+            "stock": "string(//Stock)",
+            "trim_w_in": "number(//FinishedWidth)",
+            "trim_h_in": "number(//FinishedHeight)",
+            "sections": {
+                "xpath": "//Sections/Section",
+                "fields": {
+                    "section.name": "string(Name)",
+                    "trim_w_in": "number(FinishedWidth)",
+                    "stock": "string(Printing/Stock)",
+                },
+            },
+        }
+    )
+    a, b = load_jobspec_sections_from_bytes(XML, plan)
+    assert (a.stock, a.trim_size.w_in) == ("S1", 5.0)
+    assert (b.stock, b.trim_size.w_in) == ("Job stock", 8.5)
+    assert b.special["imposition_across"] == "2x3"  # free-text fallback scoped to the section
+    assert "imposition_across" not in a.special
+
+
+def test_single_section_and_sectionless_jobs_match_plain_loader(tmp_path):
+    (only,) = load_jobspec_sections_from_xml("samples/J208823.xml", CONFIG)
+    assert only.special.pop("section")["index"] == 0
+    assert only.model_dump() == load_jobspec_from_xml("samples/J208823.xml", CONFIG).model_dump()
+
+    flat = tmp_path / "flat.xml"
+    flat.write_bytes(XML.replace(b"Sections", b"Parts"))
+    (spec,) = load_jobspec_sections_from_xml(str(flat), CONFIG)
+    assert "section" not in spec.special
+    assert spec.model_dump() == load_jobspec_from_xml(str(flat), CONFIG).model_dump()
+
+
+def test_bad_sections_block_rejected():
+    with pytest.raises(ValueError):
+        compile_mapping({"product": "string(//Title)", "sections": {"xpath": "//Section"}})
+    with pytest.raises(ValueError) as exc:
+        compile_mapping({"sections": {"xpath": "//Section[", "fields": {"stock": "string(Stock["}}})
+    assert "sections.xpath" in str(exc.value) and "sections.fields.stock" in str(exc.value)
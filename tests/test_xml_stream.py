@@ -0,0 +1,135 @@
+# tests/test_xml_stream.py
+import io
+import os
+import tempfile
+import textwrap
+from pathlib import Path
+
+import pytest
+import yaml
+from lxml import etree as ET
+
+from prepress_helper.mapping_plan import (
+    analyze_stream_expr,
+    compile_mapping,
+    load_mapping_plan,
+)
+from prepress_helper.xml_adapter import (
+    JobSpecFeedParser,
+    load_jobspec_from_bytes,
+    load_jobspec_from_file,
+    load_jobspec_from_xml,
+)
+from prepress_helper.xml_stream import LocalNameIndex, first_pair_in_text
+
+SAMPLES = sorted(Path("samples").glob("*.xml"))
+CONFIG = "config/xml_map.yml"
+
+
+def _parse(path, mapping, stream):
+    try:
+        return load_jobspec_from_xml(str(path), mapping, stream=stream).model_dump()
+    except Exception as e:  # both modes must fail the same way too
+        return type(e).__name__
+
+
+@pytest.mark.skipif(not SAMPLES, reason="sample XML not present")
+@pytest.mark.parametrize("xml", SAMPLES, ids=lambda p: p.name)
+def test_stream_matches_tree_on_samples(xml):
+    assert _parse(xml, CONFIG, True) == _parse(xml, CONFIG, False)
+
+
+def test_stream_matches_tree_on_mixed_content_and_fallbacks():
+    xml = textwrap.dedent(
+        """\
+        <?xml version="1.0"?>
+        <!-- leading comment -->
+        <Job xmlns:p="urn:x">
+          <Title>  Tri <!-- c -->fold <b>Brochure</b> tail  </Title>
+          <Printing><Press><Machine>HP   Latex 570</Machine></Press></Printing>
+          <Machine>Other</Machine>
+          <p:Stock>ns stock</p:Stock>
+          <Stock>Plain <?pi x?>stock</Stock>
+          <FinishedWidth> 1.1e1 </FinishedWidth>
+          <Layout numAcross="4" numDown="x">
+            <rowsDown>ab 6 cd</rowsDown>
+          </Layout>
+          <Note>size 8</Note><Note2>x 4 then 9x9</Note2>
+        </Job>
+    """
+    )
+    mapping = {
+        "product": "normalize-space(string((//Title | //ProductName)[1]))",
+        "stock": "string((//Stock | //Paper)[1])",
+        "trim_w_in": "number((//FinishedWidth | //TrimWidth)[1])",
+        "trim_h_in": "number((//FinishedHeight)[1])",
+        "special.machine": "normalize-space(string((//Printing//Machine | //Machine)[1]))",
+    }
+    with tempfile.TemporaryDirectory() as td:
+        xmlp = os.path.join(td, "job.xml")
+        mapp = os.path.join(td, "map.yml")
+        open(xmlp, "w", encoding="utf-8").write(xml)
+        open(mapp, "w", encoding="utf-8").write(yaml.dump(mapping))
+        tree = _parse(xmlp, mapp, False)
+        assert _parse(xmlp, mapp, True) == tree
+        assert tree["product"] == "Tri fold Brochure tail"
+        assert tree["special"]["machine"] == "HP Latex 570"
+        assert tree["special"]["imposition_across"] == "6x4"  # Down x Across from text/attrs
+
+        # without across/down hints the free-text scan must find the same first pair
+        mapping["special.imposition_across"] = "string(//Nothing)"
+        open(xmlp, "w", encoding="utf-8").write(xml.replace("numAcross", "n").replace("rowsDown", "rows"))
+        open(mapp, "w", encoding="utf-8").write(yaml.dump(mapping))
+        tree = _parse(xmlp, mapp, False)
+        assert _parse(xmlp, mapp, True) == tree
+        assert tree["special"]["imposition_across"] == "8x4"
+
+
+@pytest.mark.skipif(not SAMPLES, reason="sample XML not present")
+@pytest.mark.parametrize("stream", [False, True])
+def test_in_memory_entry_points_match_path(stream):
+    for xml in SAMPLES[:10]:
+        want = load_jobspec_from_xml(str(xml), CONFIG).model_dump()
+        data = xml.read_bytes()
+        assert load_jobspec_from_bytes(data, CONFIG, stream=stream).model_dump() == want
+        assert load_jobspec_from_file(io.BytesIO(data), CONFIG, stream=stream).model_dump() == want
+
+        parser = JobSpecFeedParser(CONFIG, stream=stream)
+        for i in range(0, len(data), 997):  # odd chunk size splits tags and text
+            parser.feed(data[i : i + 997])
+        assert parser.close().model_dump() == want
+
+
+@pytest.mark.skipif(not SAMPLES, reason="sample XML not present")
+def test_file_entry_point_feeds_streamable_plans_in_chunks():
+    plan = load_mapping_plan(CONFIG)
+    assert plan.streamable
+    data = SAMPLES[0].read_bytes()
+    want = load_jobspec_from_bytes(data, plan).model_dump()
+    assert load_jobspec_from_file(io.BytesIO(data), plan, stream=True, chunk_size=997).model_dump() == want
+
+
+@pytest.mark.parametrize("path", ["config/xml_map.yml", "config/xml_map.printiq.yml"])
+def test_shipped_maps_are_streamable(path):
+    assert load_mapping_plan(path).streamable
+
+
+def test_non_streamable_expressions_detected():
+    assert analyze_stream_expr("string(//Section[2]/Stock)") is None
+    assert analyze_stream_expr("count(//Section)") is None
+    plan = compile_mapping({"pages": "count(//Section)", "stock": "string(//Stock)"})
+    assert not plan.streamable
+
+
+def test_local_name_index_first_value_in_document_order():
+    root = ET.fromstring(
+        b'<Job><SheetAcross a="z">none<Inner>3</Inner>5</SheetAcross><AcrossX>7</AcrossX>'
+        b'<L DownCount="9" downOther="2"/><Notes>12 x</Notes><More> 4, then 5x6</More></Job>'
+    )
+    idx = LocalNameIndex.from_tree(root)
+    want = root.xpath("//*[contains(translate(local-name(), 'ACROSX', 'acrosx'), 'across')]/text()")
+    assert want[0] == "none" and idx.first_text_int("across") == "5"
+    assert idx.first_text_int("down") is None
+    assert idx.first_attr_int("down") == "9"
+    # same concatenation as tostring(method="text"): "none" "3" "5" "7" "12 x" " 4" -> 35712x4
+    assert first_pair_in_text(root.itertext()) == (35712, 4)
@@ -6,7 +6,6 @@ import json
 import os
 import re
 import sys
-import tempfile
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List
@@ -58,67 +57,26 @@ SRC = ROOT / "src"
 if SRC.exists() and str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
-from prepress_helper.config_loader import (  # noqa: E402
-    apply_shop_config,
-    load_shop_config,
+from prepress_helper.config_loader import ShopConfig, current_shop_config  # noqa: E402
+from prepress_helper.parse_cache import parse_cache_from_env  # noqa: E402
+from prepress_helper.pipeline import AdvisePipeline, normalize_ascii  # noqa: E402
+from prepress_helper.router import set_shop_cfg  # noqa: E402
+from prepress_helper.xml_adapter import (  # noqa: E402
+    JobSpecFeedParser,
+    load_jobspec_from_bytes,
+    load_jobspec_from_xml,
 )
-from prepress_helper.router import (  # noqa: E402
-    detect_intents,
-    fold_preferences_from_message,
-    set_shop_cfg,
-)
-from prepress_helper.skills import doc_setup  # noqa: E402
-from prepress_helper.xml_adapter import load_jobspec_from_xml  # noqa: E402
-
-# Optional skills
-try:  # noqa: E402
-    from prepress_helper.skills import color_policy  # type: ignore  # noqa: E402
-except Exception:  # noqa: E402
-    color_policy = None  # type: ignore
-try:  # noqa: E402
-    from prepress_helper.skills import fold_math  # type: ignore  # noqa: E402
-except Exception:  # noqa: E402
-    fold_math = None  # type: ignore
-try:  # noqa: E402
-    from prepress_helper.skills import policy_enforcer  # type: ignore  # noqa: E402
-except Exception:  # noqa: E402
-    policy_enforcer = None  # type: ignore
-try:  # noqa: E402
-    from prepress_helper.skills import wide_format  # type: ignore  # noqa: E402
-except Exception:  # noqa: E402
-    wide_format = None  # type: ignore
-
 
 # -----------------------
 # Helpers
 # -----------------------
 
 
-def normalize_ascii(s: str) -> str:
-    if not isinstance(s, str):
-        return s
-    table = {
-        "≤": "<=",
-        "≥": ">=",
-        "×": "x",
-        "–": "-",
-        "—": "-",
-        "“": '"',
-        "”": '"',
-        "‘": "'",
-        "’": "'",
-        "\u00a0": " ",
-    }
-    for k, v in table.items():
-        s = s.replace(k, v)
-    return s
-
-
-@st.cache_resource
-def _load_shop_cfg() -> Dict[str, Any]:
-    cfg = load_shop_config("config")
-    set_shop_cfg(cfg)
-    return cfg
+def _load_shop_cfg() -> ShopConfig:
+    # Not st.cache_resource: the snapshot store polls the YAML files, so edits show up on the next rerun.
+    snap = current_shop_config("config")
+    set_shop_cfg(snap.data)
+    return snap
 
 
 @st.cache_resource
@@ -137,15 +95,21 @@ def _checklist_md5(path: str = "config/checklists.yml") -> str:
         return hashlib.md5(f.read()).hexdigest()
 
 
-def _write_temp_uploaded(file) -> str:
-    if file is None:
-        return ""
-    suffix = os.path.splitext(file.name or "upload.xml")[1] or ".xml"
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    tmp.write(file.getbuffer())
-    tmp.flush()
-    tmp.close()
-    return tmp.name
+@st.cache_resource
+def _parse_cache():
+    return parse_cache_from_env()
+
+
+def _parse_uploaded(file, mapping_path: str, chunk_size: int = 64 * 1024):
+    """Feed an uploaded XML straight into the parser (no temp file)."""
+    cache = _parse_cache()
+    if cache is not None:  # reruns of the same upload skip parsing entirely
+        return load_jobspec_from_bytes(file.getvalue(), mapping_path, cache=cache)
+    parser = JobSpecFeedParser(mapping_path)
+    file.seek(0)
+    while chunk := file.read(chunk_size):
+        parser.feed(chunk)
+    return parser.close()
 
 
 def _scripts_downloads(scripts: Dict[str, str]) -> None:
@@ -361,7 +325,8 @@ def _session_download(js, message: str, intents: List[str], tips: List[str]) ->
 st.set_page_config(page_title="Printssistant — Operator Console", layout="wide")
 st.title("🖨️ Printssistant — Operator Console (MVP)")
 
-SHOP_CFG = _load_shop_cfg()
+SHOP_SNAP = _load_shop_cfg()
+SHOP_CFG = SHOP_SNAP.data
 CHECK_CFG = _load_checklists()
 CHECK_HASH = _checklist_md5()
 st.session_state.checklist_hash = CHECK_HASH
@@ -391,67 +356,23 @@ with tab1:
 
     if submitted:
         try:
-            xml_path = ""
+            js = None
             if xml_file is not None:
-                xml_path = _write_temp_uploaded(xml_file)
-            elif sample_hint.strip():
-                xml_path = sample_hint.strip()
+                js = _parse_uploaded(xml_file, mapping_path)
+            elif sample_hint.strip() and os.path.exists(sample_hint.strip()):
+                js = load_jobspec_from_xml(sample_hint.strip(), mapping_path, cache=_parse_cache())
 
-            if not xml_path or not os.path.exists(xml_path):
+            if js is None:
                 st.error("Please upload an XML or provide a valid local path.")
             else:
-                js = load_jobspec_from_xml(xml_path, mapping_path)
-
                 if selected_machine and selected_machine != "(none)":
                     special = dict(js.special or {})
                     special["machine"] = selected_machine
                     js.special = special
 
-                js = apply_shop_config(js, SHOP_CFG)
-
-                intents = detect_intents(js, message or "")
-                tips: List[str] = []
-                scripts: Dict[str, str] = {}
-                tips += doc_setup.tips(js)
-                scripts.update(doc_setup.scripts(js))
-
-                if "color_policy" in intents and color_policy:
-                    try:
-                        tips += color_policy.tips(js)  # type: ignore
-                        scripts.update(color_policy.scripts(js))  # type: ignore
-                    except Exception:
-                        pass
-
-                if "fold_math" in intents and fold_math:
-                    try:
-                        style, fin = fold_preferences_from_message(message or "")
-                        tips += fold_math.tips(js, style=style, fold_in=fin)  # type: ignore
-                        scripts.update(fold_math.scripts(js, style=style, fold_in=fin))  # type: ignore
-                    except Exception:
-                        pass
-
-                if policy_enforcer:
-                    try:
-                        tips += policy_enforcer.tips(js, message or "")
-                        scripts.update(policy_enforcer.scripts(js, message or ""))
-                    except Exception:
-                        pass
-
-                if "wide_format" in intents and wide_format:
-                    try:
-                        tips += wide_format.tips(js)  # type: ignore
-                        scripts.update(wide_format.scripts(js))  # type: ignore
-                    except Exception:
-                        pass
-
-                # Normalize and de-dupe tips
-                seen = set()
-                tips_norm = [normalize_ascii(t) for t in tips]
-                tips_dedup = []
-                for t in tips_norm:
-                    if t not in seen:
-                        seen.add(t)
-                        tips_dedup.append(t)
+                result = AdvisePipeline().run(js, message, shop=SHOP_SNAP, ascii=True)
+                js, intents, scripts = result.jobspec, result.intents, result.scripts
+                tips_dedup = result.tips + result.nags
 
                 # Reset state only if job/tips/config changed
                 fingerprint = _parse_key(js, tips_dedup, CHECK_HASH)
@@ -517,38 +438,9 @@ with tab2:
                 imposition_hint=imposition_hint,
                 special={"machine": selected_machine} if selected_machine != "(none)" else {},
             )
-            js2 = apply_shop_config(js2, SHOP_CFG)
-
-            intents2 = detect_intents(js2, message or "")
-            tips2: List[str] = []
-            scripts2: Dict[str, str] = {}
-            tips2 += doc_setup.tips(js2)
-            scripts2.update(doc_setup.scripts(js2))
-
-            if "color_policy" in intents2 and color_policy:
-                tips2 += color_policy.tips(js2)  # type: ignore
-                scripts2.update(color_policy.scripts(js2))  # type: ignore
-
-            if "fold_math" in intents2 and fold_math:
-                style, fin = fold_preferences_from_message(message or "")
-                tips2 += fold_math.tips(js2, style=style, fold_in=fin)  # type: ignore
-                scripts2.update(fold_math.scripts(js2, style=style, fold_in=fin))  # type: ignore
-
-            if policy_enforcer:
-                tips2 += policy_enforcer.tips(js2, message or "")
-                scripts2.update(policy_enforcer.scripts(js2, message or ""))
-
-            if "wide_format" in intents2 and wide_format:
-                tips2 += wide_format.tips(js2)  # type: ignore
-                scripts2.update(wide_format.scripts(js2))  # type: ignore
-
-            seen = set()
-            tips2 = [normalize_ascii(t) for t in tips2]
-            tips2_dedup = []
-            for t in tips2:
-                if t not in seen:
-                    seen.add(t)
-                    tips2_dedup.append(t)
+            result2 = AdvisePipeline().run(js2, message, shop=SHOP_SNAP, ascii=True)
+            js2, intents2, scripts2 = result2.jobspec, result2.intents, result2.scripts
+            tips2_dedup = result2.tips + result2.nags
 
             fingerprint = _parse_key(js2, tips2_dedup, CHECK_HASH)
             if st.session_state.last_parse_key != fingerprint: